@@ -19,6 +19,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
 from models.user import User
 from models.trade import Trade
+from models.stats import StatsRollup, DataVersion
 from sqlmodel import SQLModel
 # Use SQLModel metadata for autogenerate
 target_metadata = SQLModel.metadata
@@ -0,0 +1,30 @@
+"""add data version table
+
+Revision ID: 3f38abc95931
+Revises: bf15fdec2796
+Create Date: 2026-10-18 13:20:07.449927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f38abc95931'
+down_revision: Union[str, None] = 'bf15fdec2796'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dataversion',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dataversion')
@@ -0,0 +1,46 @@
+"""add stats rollup table
+
+Revision ID: 6af17635648c
+Revises: 8b380ad20b58
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6af17635648c'
+down_revision: Union[str, None] = '8b380ad20b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('statsrollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_trades', sa.Integer(), nullable=False),
+    sa.Column('winning_trades', sa.Integer(), nullable=False),
+    sa.Column('losing_trades', sa.Integer(), nullable=False),
+    sa.Column('sum_risk_reward', sa.Float(), nullable=False),
+    sa.Column('total_profit', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Backfill the journal-wide row from the existing closed trades.
+    op.execute(
+        "INSERT INTO statsrollup (user_id, total_trades, winning_trades, losing_trades, "
+        "sum_risk_reward, total_profit, updated_at) "
+        "SELECT 0, COUNT(id), "
+        "COALESCE(SUM(CASE WHEN result_usd > 0 THEN 1 ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN result_usd < 0 THEN 1 ELSE 0 END), 0), "
+        "COALESCE(SUM(risk_reward), 0), COALESCE(SUM(result_usd), 0), CURRENT_TIMESTAMP "
+        "FROM trade WHERE status = 'CLOSED'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('statsrollup')
@@ -0,0 +1,69 @@
+"""add trade user_id and user-leading indexes
+
+Revision ID: 99e1ae4782ac
+Revises: 3f38abc95931
+Create Date: 2026-10-18 13:30:32.673431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99e1ae4782ac'
+down_revision: Union[str, None] = '3f38abc95931'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('trade') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_trade_user_id_user', 'user', ['user_id'], ['id'])
+        batch_op.drop_index('ix_trade_opened_at_id')
+        batch_op.drop_index('ix_trade_pair_opened_at_id')
+        batch_op.drop_index('ix_trade_status_closed_at_cover')
+        batch_op.drop_index('ix_trade_status_opened_at_id')
+        # Every query is scoped to one user, so each index leads with user_id
+        batch_op.create_index('ix_trade_user_opened_at_id', ['user_id', 'opened_at', 'id'], unique=False)
+        batch_op.create_index('ix_trade_user_pair_opened_at_id', ['user_id', 'pair', 'opened_at', 'id'], unique=False)
+        batch_op.create_index('ix_trade_user_status_opened_at_id', ['user_id', 'status', 'opened_at', 'id'], unique=False)
+        batch_op.create_index(
+            'ix_trade_user_status_closed_at_cover',
+            ['user_id', 'status', 'closed_at', 'id', 'result_usd', 'risk_reward', 'pair', 'direction'],
+            unique=False,
+        )
+    # Trades recorded before this revision have no owner. A single-account
+    # journal gives them to that account; with several accounts, pick the owner
+    # with `python -m app.utils.claim --owner USER_ID` after upgrading (which
+    # also rebuilds that user's rollup). Until then they are listed by nobody.
+    bind = op.get_bind()
+    user_ids = bind.execute(sa.text('SELECT id FROM "user"')).scalars().all()
+    if len(user_ids) == 1:
+        bind.execute(sa.text("UPDATE trade SET user_id = :owner WHERE user_id IS NULL"), {"owner": user_ids[0]})
+    # The journal-wide rollup (user_id 0) is kept and still covers every trade;
+    # the journal-wide data version no longer guards any response.
+    op.execute("DELETE FROM dataversion WHERE user_id = 0")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('trade') as batch_op:
+        batch_op.drop_index('ix_trade_user_status_closed_at_cover')
+        batch_op.drop_index('ix_trade_user_status_opened_at_id')
+        batch_op.drop_index('ix_trade_user_pair_opened_at_id')
+        batch_op.drop_index('ix_trade_user_opened_at_id')
+        batch_op.create_index('ix_trade_opened_at_id', ['opened_at', 'id'], unique=False)
+        batch_op.create_index('ix_trade_pair_opened_at_id', ['pair', 'opened_at', 'id'], unique=False)
+        batch_op.create_index('ix_trade_status_opened_at_id', ['status', 'opened_at', 'id'], unique=False)
+        batch_op.create_index(
+            'ix_trade_status_closed_at_cover',
+            ['status', 'closed_at', 'id', 'result_usd', 'risk_reward', 'pair', 'direction'],
+            unique=False,
+        )
+        batch_op.drop_constraint('fk_trade_user_id_user', type_='foreignkey')
+        batch_op.drop_column('user_id')
+    # Only the journal-wide rollup (user_id 0) is used again; versions restart on first write
+    op.execute("DELETE FROM statsrollup WHERE user_id != 0")
+    op.execute("DELETE FROM dataversion")
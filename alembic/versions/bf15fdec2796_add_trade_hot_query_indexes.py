@@ -0,0 +1,39 @@
+"""add trade hot query indexes
+
+Revision ID: bf15fdec2796
+Revises: 6af17635648c
+Create Date: 2026-10-18 10:03:27.540119
+
+"""
+from typing import Sequence, Union
+
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf15fdec2796'
+down_revision: Union[str, None] = '6af17635648c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # get_trades orders by (opened_at, id) and optionally filters by pair or status
+    op.create_index('ix_trade_opened_at_id', 'trade', ['opened_at', 'id'], unique=False)
+    op.create_index('ix_trade_pair_opened_at_id', 'trade', ['pair', 'opened_at', 'id'], unique=False)
+    op.create_index('ix_trade_status_opened_at_id', 'trade', ['status', 'opened_at', 'id'], unique=False)
+    # Covering index for the closed-trade stats queries (rollup, equity curve, breakdown)
+    op.create_index(
+        'ix_trade_status_closed_at_cover', 'trade',
+        ['status', 'closed_at', 'id', 'result_usd', 'risk_reward', 'pair', 'direction'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trade_status_closed_at_cover', table_name='trade')
+    op.drop_index('ix_trade_status_opened_at_id', table_name='trade')
+    op.drop_index('ix_trade_pair_opened_at_id', table_name='trade')
+    op.drop_index('ix_trade_opened_at_id', table_name='trade')
@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import os
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.security import OAuth2PasswordBearer
+from app.core.config import get_settings
+from app.crud.repository import Repository, get_repository, get_read_repository
+from app.utils.pricing import open_book
+from app.utils.security import STREAM_SCOPE
+from app.utils.token_cache import token_cache, UserSnapshot
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def authenticate(token: str, repository: Repository, scope: str = None) -> UserSnapshot:
+    """The user a token was issued to; raises 401 for an invalid token, unknown user or a token of another scope.
+
+    Access tokens carry no scope; a scoped token (see create_stream_token) is only
+    accepted where that scope is asked for.
+    """
+    cached = token_cache.get(token)
+    if cached:
+        if cached[0].get("scope") != scope:
+            raise credentials_exception()
+        return cached[1]
+    from jose import jwt, JWTError
+    try:
+        payload = jwt.decode(token, get_settings().SECRET_KEY, algorithms=[get_settings().ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None or payload.get("scope") != scope:
+            raise credentials_exception()
+    except JWTError:
+        raise credentials_exception()
+    user = await repository.get_user_by_email(email)
+    if user is None:
+        raise credentials_exception()
+    snapshot = UserSnapshot.from_user(user)
+    token_cache.put(token, payload, snapshot)
+    return snapshot
+
+async def get_current_user(token: str = Depends(oauth2_scheme), repository: Repository = Depends(get_repository)) -> UserSnapshot:
+    return await authenticate(token, repository)
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme), repository: Repository = Depends(get_repository)) -> Optional[UserSnapshot]:
+    return await authenticate(token, repository) if token else None
+
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    stream_token: Optional[str] = Query(None),
+    repository: Repository = Depends(get_repository),
+) -> UserSnapshot:
+    """`get_current_user` that also takes a stream token as ``?stream_token=``, since EventSource cannot set headers.
+
+    Access tokens are only read from the header, so they never end up in URLs and access logs.
+    """
+    if token:
+        return await authenticate(token, repository)
+    if stream_token:
+        return await authenticate(stream_token, repository, scope=STREAM_SCOPE)
+    raise credentials_exception()
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    """Guard for debug endpoints: 404 unless DEBUG_TOKEN is set, 403 unless X-Debug-Token matches it."""
+    if not get_settings().DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, get_settings().DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+def make_etag(version, mode: str, path: str, query: str) -> str:
+    """Strong ETag for one representation of `path` at a data version."""
+    params = "&".join(sorted(query.split("&"))) if query else ""
+    digest = hashlib.sha256(f"{version}|{mode}|{path}?{params}".encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so a W/ prefix is ignored."""
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _check_etag(request: Request, response: Response, version) -> str:
+    etag = make_etag(version, os.environ.get("DATA_MODE", "real"), request.url.path, request.url.query)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return etag
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_read_repository),
+) -> str:
+    """Set ETag/Cache-Control on a read endpoint and answer 304 when the client copy is current.
+
+    Only the user's data-version row is read. The version is read before the
+    endpoint queries anything, so a write racing with this request can only make
+    the ETag older than the body, which costs the client a refetch, never a stale hit.
+    """
+    version = await repository.get_data_version(current_user.id)
+    return _check_etag(request, response, f"{current_user.id}:{version}")
+
+async def conditional_get_priced(
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_read_repository),
+) -> str:
+    """`conditional_get` for responses that include unrealized P&L, which also change on ticks.
+
+    Only ticks on pairs the user holds open count (see OpenPositionBook.marks), so
+    a user with no open trades keeps getting 304s while the feed runs. A user the
+    book has not seen yet is loaded first, which the endpoint would do anyway.
+    """
+    version = await repository.get_data_version(current_user.id)
+    marks = open_book.marks(current_user.id)
+    if marks is None:
+        await repository.get_unrealized(current_user.id)
+        marks = open_book.marks(current_user.id)
+    return _check_etag(request, response, f"{current_user.id}:{version}.{marks}")
@@ -1,73 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from app.models.user import User as UserModel
 from app.schemas.user import UserRead
-from app.core.config import settings
-from sqlmodel import Session
-from app.db.session import get_session
 from app.schemas.user import UserCreate, UserLogin
 from app.schemas.auth import Token
-from app.crud.user import get_user_by_email, create_user
-from app.utils.security import verify_password, create_access_token
+from app.utils.token_cache import UserSnapshot
+from app.api.v1.deps import get_current_user
+from app.crud.repository import Repository, get_repository
+from app.utils.security import (
+    create_access_token, get_password_hash_async, verify_and_update_password_async, PasswordPoolBusy
+)
 
-router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = get_user_by_email(session, email)
-    if user is None:
-        raise credentials_exception
-    return user
+router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
 @router.get("/me", response_model=UserRead)
-async def read_users_me(current_user: UserModel = Depends(get_current_user)):
-    import os
-    mode = os.environ.get("DATA_MODE", "real")
-    if mode == "test":
-        return UserRead(
-            id=1,
-            email="testuser@example.com",
-            name="Test User",
-            is_active=True,
-            created_at="2025-01-01T00:00:00",
-            updated_at="2025-01-01T00:00:00"
-        )
-    elif mode == "seed":
-        return UserRead(
-            id=2,
-            email="seeduser@example.com",
-            name="Seed User",
-            is_active=True,
-            created_at="2025-01-01T00:00:00",
-            updated_at="2025-01-01T00:00:00"
-        )
+async def read_users_me(current_user: UserSnapshot = Depends(get_current_user)):
     return current_user
 
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/signup", response_model=Token)
-async def signup(user_in: UserCreate, session: Session = Depends(get_session)):
-    user = get_user_by_email(session, user_in.email)
+async def signup(user_in: UserCreate, repository: Repository = Depends(get_repository)):
+    user = await repository.get_user_by_email(user_in.email)
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = create_user(session, user_in)
+    try:
+        hashed_password = await get_password_hash_async(user_in.password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+    user = await repository.create_user(user_in, hashed_password)
     token = create_access_token({"sub": user.email})
     return Token(access_token=token)
 
 @router.post("/login", response_model=Token)
-async def login(user_in: UserLogin, session: Session = Depends(get_session)):
-    user = get_user_by_email(session, user_in.email)
-    if not user or not verify_password(user_in.password, user.hashed_password):
+async def login(user_in: UserLogin, repository: Repository = Depends(get_repository)):
+    user = await repository.get_user_by_email(user_in.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        valid, new_hash = await verify_and_update_password_async(user_in.password, user.hashed_password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # The CryptContext cost changed since this hash was stored; upgrade it transparently.
+        await repository.update_password_hash(user, new_hash)
     token = create_access_token({"sub": user.email})
     return Token(access_token=token)
@@ -1,45 +1,89 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
-import os
-from app.db.session import get_session
-from app.crud.stats import get_summary_stats, get_equity_curve
-
-router = APIRouter()
-
-@router.get("/summary")
-async def summary_stats(session: Session = Depends(get_session)):
-    mode = os.environ.get("DATA_MODE", "real")
-    if mode == "test":
-        return {
-            "total_profit": 9999.99,
-            "win_rate": 100.0,
-            "avg_risk_reward": 5.0,
-            "total_trades": 1,
-            "winning_trades": 1,
-            "losing_trades": 0
-        }
-    elif mode == "seed":
-        return {
-            "total_profit": 5000.00,
-            "win_rate": 80.0,
-            "avg_risk_reward": 3.0,
-            "total_trades": 10,
-            "winning_trades": 8,
-            "losing_trades": 2
-        }
-    return get_summary_stats(session)
-
-@router.get("/equity_curve")
-async def equity_curve(session: Session = Depends(get_session)):
-    mode = os.environ.get("DATA_MODE", "real")
-    if mode == "test":
-        return [
-            {"date": "2025-01-01", "balance": 10000},
-            {"date": "2025-01-02", "balance": 11000},
-        ]
-    elif mode == "seed":
-        return [
-            {"date": "2025-01-01", "balance": 5000},
-            {"date": "2025-01-02", "balance": 6000},
-        ]
-    return get_equity_curve(session)
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from datetime import datetime
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.api.v1.deps import conditional_get, conditional_get_priced, get_current_user
+from app.utils.token_cache import UserSnapshot
+from app.crud.repository import Repository, get_repository, get_read_repository
+from app.crud.stats import BREAKDOWN_DIMENSIONS, EQUITY_RESOLUTIONS
+from app.utils.montecarlo import simulate, simulation_pool
+
+MONTE_CARLO_BASES = ("usd", "r")
+
+router = APIRouter(prefix="/api/v1/stats", tags=["stats"])
+
+@router.get("/summary", dependencies=[Depends(conditional_get_priced)])
+async def summary_stats(current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    return await repository.get_summary_stats(current_user.id)
+
+@router.get("/equity_curve", dependencies=[Depends(conditional_get)])
+async def equity_curve(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: Optional[str] = Query(None),
+    max_points: Optional[int] = Query(None, ge=3),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_repository),
+):
+    if resolution and resolution not in EQUITY_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid resolution {resolution!r}. Choose from: {', '.join(EQUITY_RESOLUTIONS)}",
+        )
+    return await repository.get_equity_curve(current_user.id, start, end, resolution, max_points)
+
+@router.get("/breakdown", dependencies=[Depends(conditional_get)])
+async def breakdown_stats(by: str = Query("pair"), current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_read_repository)):
+    dimensions = [dim.strip() for dim in by.split(",") if dim.strip()]
+    unknown = [dim for dim in dimensions if dim not in BREAKDOWN_DIMENSIONS]
+    if not dimensions or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid breakdown dimension(s): {', '.join(unknown) or by!r}. "
+                   f"Choose from: {', '.join(BREAKDOWN_DIMENSIONS)}",
+        )
+    return await repository.get_breakdown(current_user.id, list(dict.fromkeys(dimensions)))
+
+@router.get("/advanced", dependencies=[Depends(conditional_get)])
+async def advanced_stats(current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    return await repository.get_advanced_stats(current_user.id)
+
+@router.get("/unrealized", dependencies=[Depends(conditional_get_priced)])
+async def unrealized_pnl(trades: bool = Query(False), current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    """Open trades marked to the latest feed price, totalled and per pair (and per trade with `trades`)."""
+    return await repository.get_unrealized(current_user.id, trades)
+
+@router.get("/monte_carlo")
+async def monte_carlo(
+    paths: int = Query(1000, ge=1, le=get_settings().MONTE_CARLO_MAX_PATHS),
+    horizon: int = Query(None, ge=1, le=get_settings().MONTE_CARLO_MAX_HORIZON),
+    seed: Optional[int] = Query(None, ge=0),
+    basis: str = Query("usd"),
+    risk_per_trade: Optional[float] = Query(None, gt=0),
+    starting_balance: float = Query(10000.0, ge=0),
+    ruin_fraction: float = Query(0.5, gt=0, le=1),
+    confidence: float = Query(0.95, gt=0, lt=1),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_repository),
+):
+    """Resample closed-trade outcomes into `paths` equity paths of `horizon` trades.
+
+    `horizon` defaults to the number of closed trades. Pass `seed` for reproducible
+    results; without one a seed is drawn and returned.
+    """
+    if basis not in MONTE_CARLO_BASES:
+        raise HTTPException(status_code=400, detail=f"Invalid basis {basis!r}. Choose from: {', '.join(MONTE_CARLO_BASES)}")
+    samples = await repository.get_trade_outcomes(current_user.id, basis, risk_per_trade)
+    if not len(samples):
+        raise HTTPException(status_code=400, detail="No closed trades to simulate")
+    horizon = min(horizon or len(samples), get_settings().MONTE_CARLO_MAX_HORIZON)
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    executor = simulation_pool.executor() if paths >= get_settings().MONTE_CARLO_PARALLEL_PATHS else None
+    result = await run_in_threadpool(
+        simulate, samples, paths, horizon, seed, starting_balance, ruin_fraction, confidence,
+        get_settings().MONTE_CARLO_CHUNK_ELEMENTS, executor,
+    )
+    return {"basis": basis, **result}
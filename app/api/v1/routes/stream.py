@@ -0,0 +1,55 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.core.config import get_settings
+from app.api.v1.deps import get_current_user, get_stream_user
+from app.schemas.auth import StreamToken
+from app.utils.events import event_hub, StreamFull
+from app.utils.security import create_stream_token
+from app.utils.token_cache import UserSnapshot
+
+router = APIRouter(prefix="/api/v1/stream", tags=["stream"])
+
+def format_event(event: dict) -> str:
+    """SSE frame for an event, encoded once and shared by every subscriber."""
+    if "frame" not in event:
+        data = json.dumps(jsonable_encoder(event["data"]), separators=(",", ":"))
+        event["frame"] = f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+    return event["frame"]
+
+@router.post("/token", response_model=StreamToken)
+async def issue_stream_token(current_user: UserSnapshot = Depends(get_current_user)):
+    """Token for ``GET /api/v1/stream?stream_token=``, valid for that endpoint only and for STREAM_TOKEN_EXPIRE_SECONDS."""
+    return StreamToken(stream_token=create_stream_token(current_user.email), expires_in=get_settings().STREAM_TOKEN_EXPIRE_SECONDS)
+
+@router.get("")
+async def stream_events(current_user: UserSnapshot = Depends(get_stream_user)):
+    """Server-Sent Events feed of the user's trade changes.
+
+    Each `trade` event carries the action, the changed trade, the new summary and,
+    for a close, the appended equity-curve point. A `resync` event means the client
+    missed events (bulk write or a full queue) and should refetch. Browsers'
+    EventSource cannot send headers, so it passes a token from
+    POST /api/v1/stream/token as ``?stream_token=`` instead.
+    """
+    try:
+        subscription = event_hub.subscribe(current_user.id)
+    except StreamFull:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+
+    async def body():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=get_settings().STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
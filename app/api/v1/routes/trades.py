@@ -1,107 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session
-from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from pydantic import confloat
+from typing import Dict, List, Optional, Union
 from datetime import datetime
-from app.db.session import get_session
+from fastapi.responses import StreamingResponse
+from app.api.v1.deps import conditional_get, get_current_user
+from app.utils.token_cache import UserSnapshot
 import os
-from app.schemas.trade import TradeRead
-from app.schemas.trade import TradeCreate, TradeRead, TradeUpdate
-from app.crud.trade import (
-    create_trade, get_trade, get_trades, update_trade, delete_trade, close_trade
+from app.schemas.trade import (
+    TradeCreate, TradeRead, TradeUpdate, TradeImportReport, TradeImportError,
+    TradeCloseItem, TradeBatchCloseReport,
 )
+from app.crud.repository import Repository, get_repository, get_read_repository
+from app.crud.trade import TRADE_COLUMNS
 from app.models.trade import TradeStatus
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.export import EXPORT_FORMATS, format_csv, format_ndjson
+from app.utils.serialization import LIST_FORMATS, rows_json, columnar_json
+from app.utils.importer import IMPORT_FORMATS, iter_lines, iter_csv_records, iter_ndjson_records
+from app.core.config import get_settings
 
-router = APIRouter()
-
-def mock_trade():
-    return TradeRead(
-        id=1,
-        pair="TEST/USD",
-        direction="BUY",
-        entry_price=1.0,
-        exit_price=1.1,
-        stop_loss=0.9,
-        take_profit=1.2,
-        position_size=1000,
-        status="OPEN",
-        opened_at=datetime.utcnow(),
-        closed_at=datetime.utcnow(),
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
-        risk_reward=1.5,
-        result_pips=10,
-        result_usd=100.0,
-        notes="Test trade",
-        screenshot=None
-    )
+router = APIRouter(prefix="/api/v1/trades", tags=["trades"])
 
 def get_data_mode():
     return os.environ.get("DATA_MODE", "real")
 
-def is_test_mode():
-    return get_data_mode() == "test"
-
 @router.post("/", response_model=TradeRead)
-async def create_trade_endpoint(trade_in: TradeCreate, session: Session = Depends(get_session)):
-    if is_test_mode():
-        return mock_trade()
-    trade = create_trade(session, trade_in)
+async def create_trade_endpoint(trade_in: TradeCreate, current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    trade = await repository.create_trade(current_user.id, trade_in)
     return trade
 
-@router.get("/", response_model=List[TradeRead])
+@router.post("/import", response_model=TradeImportReport)
+async def import_trades_endpoint(
+    request: Request,
+    format: Optional[str] = Query(None),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_repository)
+):
+    """Bulk-import trades from a CSV (with header row) or NDJSON request body.
+
+    The body is parsed as it streams in and written in IMPORT_BATCH_SIZE batches,
+    each in its own transaction; rows that fail validation are reported, not inserted.
+    """
+    content_type = request.headers.get("content-type", "")
+    format = format or ("ndjson" if "json" in content_type else "csv")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format {format!r}. Choose from: {', '.join(IMPORT_FORMATS)}")
+    parse = iter_ndjson_records if format == "ndjson" else iter_csv_records
+    report = TradeImportReport(imported=0, failed=0, errors=[])
+    batch = []
+
+    async def flush():
+        imported, errors = await repository.import_trade_batch(current_user.id, batch)
+        report.imported += imported
+        report.failed += len(errors)
+        room = get_settings().IMPORT_MAX_ERRORS - len(report.errors)
+        report.errors += [TradeImportError(row=row, errors=messages) for row, messages in errors[:max(room, 0)]]
+        report.errors_truncated = report.errors_truncated or len(errors) > room
+        batch.clear()
+
+    async for record in parse(iter_lines(request.stream())):
+        batch.append(record)
+        if len(batch) >= get_settings().IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return report
+
+@router.get("/", response_model=List[TradeRead], dependencies=[Depends(conditional_get)])
 async def list_trades(
+    response: Response,
     pair: Optional[str] = Query(None),
     status: Optional[TradeStatus] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    limit: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     offset: Optional[int] = Query(None),
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = Query(None),
+    format: str = Query("rows"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_read_repository)
 ):
+    """List trades as TradeRead objects, or with ``format=columnar`` as one array per field.
+
+    Rows are read as column tuples and encoded directly, skipping per-row model
+    validation; the JSON is the same as the TradeRead encoding.
+    """
+    if format not in LIST_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format {format!r}. Choose from: {', '.join(LIST_FORMATS)}")
+    columns = list(TRADE_COLUMNS)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Fetch one extra row to know whether another page exists.
+    trades = await repository.get_trade_rows(current_user.id, pair, status, start_date, end_date, limit + 1 if limit else None, offset, after, get_data_mode())
+    if limit and len(trades) > limit:
+        trades = trades[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(trades[-1].opened_at, trades[-1].id)
+    body = columnar_json(columns, trades) if format == "columnar" else rows_json(columns, trades)
+    # A returned Response replaces the injected one, so carry over its ETag and cursor headers.
+    return Response(body, media_type="application/json", headers=response.headers)
+
+@router.get("/export")
+async def export_trades_endpoint(
+    format: str = Query("csv"),
+    pair: Optional[str] = Query(None),
+    status: Optional[TradeStatus] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_read_repository),
+):
+    """Stream trades matching the list filters as CSV or NDJSON.
+
+    Rows come from a server-side cursor in EXPORT_BATCH_SIZE chunks and are
+    written out as they arrive, so memory use does not grow with the journal.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format {format!r}. Choose from: {', '.join(EXPORT_FORMATS)}")
     mode = get_data_mode()
-    if mode == "test":
-        return [mock_trade()]
-    trades = get_trades(session, pair, status, start_date, end_date, limit, offset)
-    if mode == "real":
-        # Exclude any trade whose pair contains 'TEST' or 'XAU' (case-insensitive, substring or exact match)
-        trades = [t for t in trades if all(x not in t.pair.upper() for x in ["TEST", "XAU"]) and t.pair.upper() not in ["TEST/USD", "XAU/USD"]]
-    elif mode == "seed":
-        # Only include trades whose pair contains 'XAU' (seed demo)
-        trades = [t for t in trades if "XAU" in t.pair]
-    return trades
-
-@router.get("/{trade_id}", response_model=TradeRead)
-async def get_trade_endpoint(trade_id: int, session: Session = Depends(get_session)):
-    if is_test_mode():
-        return mock_trade()
-    trade = get_trade(session, trade_id)
+    columns = list(TRADE_COLUMNS)
+
+    def render(rows):
+        return format_csv(columns, rows) if format == "csv" else format_ndjson(columns, rows)
+
+    async def body():
+        if format == "csv":
+            yield format_csv(columns, [], header=True)
+        # The request's session is gone once the response starts streaming; the repository streams on its own.
+        async for rows in repository.stream_trade_rows(current_user.id, pair, status, start_date, end_date, mode, batch_size=get_settings().EXPORT_BATCH_SIZE):
+            yield render(rows)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="trades.{format}"'},
+    )
+
+@router.patch("/close", response_model=TradeBatchCloseReport)
+async def close_trades_endpoint(
+    exits: Union[List[TradeCloseItem], Dict[str, confloat(gt=0)]] = Body(...),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: Repository = Depends(get_repository),
+):
+    """Close a basket of trades at once.
+
+    The body is either a list of ``{"id", "exit_price"}`` objects or a
+    ``{pair: exit_price}`` map that closes every open trade in those pairs.
+    """
+    if isinstance(exits, dict):
+        results, skipped = await repository.close_trades(current_user.id, prices=exits)
+    else:
+        results, skipped = await repository.close_trades(current_user.id, exits={item.id: item.exit_price for item in exits})
+    return TradeBatchCloseReport(closed=results, skipped=skipped)
+
+@router.get("/{trade_id}", response_model=TradeRead, dependencies=[Depends(conditional_get)])
+async def get_trade_endpoint(trade_id: int, current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_read_repository)):
+    trade = await repository.get_trade(current_user.id, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return trade
 
 @router.put("/{trade_id}", response_model=TradeRead)
-async def update_trade_endpoint(trade_id: int, trade_in: TradeUpdate, session: Session = Depends(get_session)):
-    if is_test_mode():
-        return mock_trade()
-    trade = update_trade(session, trade_id, trade_in)
+async def update_trade_endpoint(trade_id: int, trade_in: TradeUpdate, current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    trade = await repository.update_trade(current_user.id, trade_id, trade_in)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return trade
 
 @router.delete("/{trade_id}", response_model=TradeRead)
-async def delete_trade_endpoint(trade_id: int, session: Session = Depends(get_session)):
-    if is_test_mode():
-        return mock_trade()
-    trade = delete_trade(session, trade_id)
+async def delete_trade_endpoint(trade_id: int, current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    trade = await repository.delete_trade(current_user.id, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return trade
 
 @router.patch("/{trade_id}/close", response_model=TradeRead)
-async def close_trade_endpoint(trade_id: int, exit_price: float, session: Session = Depends(get_session)):
-    if is_test_mode():
-        return mock_trade()
-    trade = close_trade(session, trade_id, exit_price)
+async def close_trade_endpoint(trade_id: int, exit_price: float, current_user: UserSnapshot = Depends(get_current_user), repository: Repository = Depends(get_repository)):
+    trade = await repository.close_trade(current_user.id, trade_id, exit_price)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found or already closed")
     return trade
@@ -1,15 +1,83 @@
 import os
+from functools import lru_cache
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
+    """Configuration; every field is read from the environment variable of the same name."""
     API_V1_STR: str = "/api/v1"
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecret")
+    SECRET_KEY: str = "supersecret"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
     CORS_ORIGINS: list = ["*"]
-    SQLITE_DB: str = os.getenv("SQLITE_DB", "sqlite:///./trading_journal.db")
+    SQLITE_DB: str = "sqlite:///./trading_journal.db"
+    # Read-only queries (lists, breakdown, ETag checks) may go to a replica; empty uses SQLITE_DB
+    DB_READ_URL: str = ""
+    # SQLite pragmas applied to every connection: WAL lets readers run alongside the
+    # writer and writers wait up to the busy timeout for the lock instead of failing.
+    # SQLITE_BEGIN=IMMEDIATE takes the write lock at BEGIN (no failed read-to-write
+    # upgrades) but then every transaction, reads included, serializes on it
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BEGIN: str = "DEFERRED"
+    # Connection pool for server databases (ignored for SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
     ALEMBIC_INI: str = "alembic.ini"
+    # bcrypt cost; stored hashes with a different cost are rehashed on next login
+    BCRYPT_ROUNDS: int = 12
+    # Password hashing runs off the event loop on this many threads...
+    PASSWORD_HASH_WORKERS: int = 4
+    # ...with at most this many requests queued or running before new ones get a 503
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Verified-token cache used by get_current_user (0 disables it)
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    # Bulk trade import: rows per INSERT/transaction, and per-row errors reported
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    # Rows fetched from the streaming cursor per chunk of an export
+    EXPORT_BATCH_SIZE: int = 1000
+    # Live /stream: queued events per client before it is told to resync, client cap,
+    # and seconds between keep-alive comments on an idle stream
+    STREAM_QUEUE_SIZE: int = 64
+    STREAM_MAX_CLIENTS: int = 1000
+    STREAM_HEARTBEAT_SECONDS: float = 15
+    # Lifetime of the stream-scoped tokens EventSource clients pass as ?stream_token=
+    STREAM_TOKEN_EXPIRE_SECONDS: int = 60
+    # Memory-mapped closed-trade snapshots used by the analytics endpoints
+    SNAPSHOT_DIR: str = "./snapshots"
+    # Monte Carlo simulation: request limits, matrix cells per chunk, and the path
+    # count from which chunks are spread over a process pool of MONTE_CARLO_WORKERS
+    MONTE_CARLO_MAX_PATHS: int = 50000
+    MONTE_CARLO_MAX_HORIZON: int = 10000
+    MONTE_CARLO_CHUNK_ELEMENTS: int = 2000000
+    MONTE_CARLO_PARALLEL_PATHS: int = 10000
+    MONTE_CARLO_WORKERS: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    # Live prices for marking open trades: replay:///path/to/ticks.csv?rate=100&loop=1
+    # or tcp://host:port (one "PAIR,PRICE" or JSON tick per line); empty disables the feed
+    PRICE_FEED_URL: str = ""
+    # Per-route latency, response size and DB cost, served in Prometheus format at /metrics
+    METRICS_ENABLED: bool = True
+    # Query profiler: statements slower than SLOW_QUERY_MS are logged with their plan, and
+    # a statement repeated REPEATED_QUERY_THRESHOLD times in one request is flagged as N+1
+    QUERY_PROFILER_ENABLED: bool = True
+    SLOW_QUERY_MS: float = 100
+    REPEATED_QUERY_THRESHOLD: int = 10
+    QUERY_PROFILER_LOG_SIZE: int = 200
+    # Sent as X-Debug-Token to read /api/v1/system/queries and to enter or leave DATA_MODE=test; empty disables both
+    DEBUG_TOKEN: str = ""
 
+# DATA_MODE (test, real or seed) is read from os.environ on each request, since
+# POST /api/v1/system/mode switches it at runtime.
 
-DATA_MODE = os.getenv('DATA_MODE', 'real')  # Options: 'test', 'real', 'seed'
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """The process's Settings, read from the environment on first use."""
+    return Settings()
@@ -0,0 +1,42 @@
+"""Async counterparts of the app.crud functions.
+
+Each one runs the synchronous implementation through ``AsyncSession.run_sync``:
+statements are awaited on the async driver instead of blocking the event loop,
+and both paths share a single implementation.
+"""
+from functools import wraps
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.crud import stats, trade, user
+
+def _run_sync(fn):
+    @wraps(fn)
+    async def wrapper(session: AsyncSession, *args, **kwargs):
+        return await session.run_sync(fn, *args, **kwargs)
+    return wrapper
+
+# app.crud.trade
+create_trade = _run_sync(trade.create_trade)
+get_trade = _run_sync(trade.get_trade)
+get_trades = _run_sync(trade.get_trades)
+get_trade_rows = _run_sync(trade.get_trade_rows)
+update_trade = _run_sync(trade.update_trade)
+delete_trade = _run_sync(trade.delete_trade)
+close_trade = _run_sync(trade.close_trade)
+close_trades = _run_sync(trade.close_trades)
+import_trade_batch = _run_sync(trade.import_trade_batch)
+
+# app.crud.stats
+get_summary_stats = _run_sync(stats.get_summary_stats)
+get_equity_curve = _run_sync(stats.get_equity_curve)
+get_breakdown = _run_sync(stats.get_breakdown)
+get_advanced_stats = _run_sync(stats.get_advanced_stats)
+get_trade_outcomes = _run_sync(stats.get_trade_outcomes)
+get_unrealized = _run_sync(stats.get_unrealized)
+rebuild_rollup = _run_sync(stats.rebuild_rollup)
+get_data_version = _run_sync(stats.get_data_version)
+check_rollup = _run_sync(stats.check_rollup)
+
+# app.crud.user
+get_user_by_email = _run_sync(user.get_user_by_email)
+create_user = _run_sync(user.create_user)
+update_password_hash = _run_sync(user.update_password_hash)
@@ -0,0 +1,366 @@
+"""In-memory repository for DATA_MODE=test and load generation.
+
+Trades live in a dict by id, with two sorted indexes per user: ``(opened_at, id)``
+over all trades (lists, keyset pagination, date ranges) and ``(closed_at, id)``
+over closed trades (equity curve and the other closed-trade analytics). Rollup
+counters and data versions are kept per user exactly as app.crud keeps them in
+the database, and the stats come from the same functions, so responses match
+the SQL repository's.
+"""
+import itertools
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from datetime import datetime, timezone
+import numpy as np
+from app.crud.repository import Repository
+from app.crud.stats import ROLLUP_FIELDS, trade_contribution, batch_contribution, rollup_delta, snapshot_rows, summary_stats, equity_curve, trade_outcomes
+from app.crud.trade import TRADE_COLUMNS, pair_visible, prepare_import, trade_fields, trade_event, track_open_position
+from app.models.trade import Trade, TradeStatus
+from app.models.user import User
+from app.utils.analytics import advanced_stats
+from app.utils.events import event_hub
+from app.utils.pricing import open_book
+from app.utils.security import get_password_hash
+from app.utils.snapshot import SNAPSHOT_COLUMNS
+from app.utils.token_cache import token_cache
+from app.utils.trading import compute_risk_reward, compute_result_pips, compute_result_usd, compute_results_batch
+
+# A trade as get_trade_rows returns it: TRADE_COLUMNS order, readable by name.
+TradeRow = namedtuple("TradeRow", TRADE_COLUMNS)
+TRADE_ATTRIBUTES = [column.key for column in TRADE_COLUMNS.values()]
+
+def _naive_utc(value: datetime) -> datetime:
+    """`value` on the naive-UTC scale trades are stored in."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _closed_key(trade: Trade) -> tuple:
+    # A closed trade without a close time sorts first, as load_closed_trade_columns orders NULLs.
+    return (trade.closed_at or datetime.min, trade.id)
+
+def _remove(index: list, key: tuple):
+    position = bisect_left(index, key)
+    if position < len(index) and index[position] == key:
+        del index[position]
+
+def _breakdown_key(trade: Trade, dimension: str):
+    """BREAKDOWN_DIMENSIONS of app.crud.stats for one trade (weekday 0 = Sunday)."""
+    if dimension == "pair":
+        return trade.pair
+    if dimension == "direction":
+        return trade.direction
+    if trade.closed_at is None:
+        return None
+    if dimension == "weekday":
+        return trade.closed_at.isoweekday() % 7
+    if dimension == "hour":
+        return trade.closed_at.hour
+    return trade.closed_at.strftime("%Y-%m")
+
+def _mean(values: list):
+    return sum(values) / len(values) if values else None
+
+class MemoryRepository(Repository):
+    """Repository on dicts and sorted lists, with the SQL repository's semantics.
+
+    Methods never await, so each runs atomically on the event loop. Stream
+    events and the mark-to-market book are shared with the SQL repository.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Drop every user and trade."""
+        self._users = {}  # id -> User
+        self._user_ids = {}  # email -> id
+        self._trades = {}  # id -> Trade
+        self._trade_ids = itertools.count(1)
+        self._opened = {}  # user id -> sorted [(opened_at, id)]
+        self._closed = {}  # user id -> sorted [(closed_at, id)] of closed trades
+        self._rollups = {}  # user id -> {ROLLUP_FIELDS}
+        self._versions = {}  # user id -> data version
+        self._columns = {}  # user id -> (data version, closed-trade columns)
+
+    # Accounts
+
+    def add_user(self, user) -> User:
+        """Store a copy of `user` under its own id, e.g. to carry a signed-in account into test mode."""
+        copy = User(id=user.id, name=user.name, email=user.email, hashed_password=user.hashed_password, created_at=user.created_at)
+        self._users[copy.id] = copy
+        self._user_ids[copy.email] = copy.id
+        token_cache.invalidate_user(copy.email)
+        return copy
+
+    def load(self, users, trades):
+        """Copy `users` and their `trades` in under their own ids, e.g. a generated journal from the database."""
+        for user in users:
+            self.add_user(user)
+        by_user = {}
+        for trade in trades:
+            self._trades[trade.id] = trade
+            by_user.setdefault(trade.user_id, []).append(trade)
+        self._trade_ids = itertools.count(max(self._trades, default=0) + 1)
+        for user_id, owned in by_user.items():
+            self._opened[user_id] = sorted(self._opened.get(user_id, []) + [(t.opened_at, t.id) for t in owned])
+            closed = [t for t in owned if t.status == TradeStatus.CLOSED]
+            self._closed[user_id] = sorted(self._closed.get(user_id, []) + [_closed_key(t) for t in closed])
+            self._changed(user_id, batch_contribution(
+                [np.nan if t.result_usd is None else t.result_usd for t in closed],
+                [np.nan if t.risk_reward is None else t.risk_reward for t in closed],
+            ))
+            open_book.reset(user_id)
+
+    async def get_user_by_email(self, email: str):
+        user_id = self._user_ids.get(email)
+        return self._users[user_id] if user_id is not None else None
+
+    async def create_user(self, user_in, hashed_password: str = None):
+        user = User(
+            id=max(self._users, default=0) + 1,
+            name=user_in.name,
+            email=user_in.email,
+            hashed_password=hashed_password or get_password_hash(user_in.password),
+        )
+        return self.add_user(user)
+
+    async def update_password_hash(self, user, hashed_password: str):
+        user.hashed_password = hashed_password
+        token_cache.invalidate_user(user.email)
+        return user
+
+    # Indexes and counters
+
+    def _owned(self, user_id: int, trade_id: int):
+        trade = self._trades.get(trade_id)
+        return trade if trade is not None and trade.user_id == user_id else None
+
+    def _changed(self, user_id: int, delta: dict = None) -> int:
+        """Apply a rollup delta and advance the user's data version (the commit of app.crud); returns the new version."""
+        if delta:
+            rollup = self._rollups.setdefault(user_id, dict.fromkeys(ROLLUP_FIELDS, 0))
+            for key, value in delta.items():
+                rollup[key] += value
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        return self._versions[user_id]
+
+    def _insert(self, trade: Trade):
+        trade.id = next(self._trade_ids)
+        self._trades[trade.id] = trade
+        insort(self._opened.setdefault(trade.user_id, []), (trade.opened_at, trade.id))
+        if trade.status == TradeStatus.CLOSED:
+            insort(self._closed.setdefault(trade.user_id, []), _closed_key(trade))
+
+    def _select(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, after=None, mode=None):
+        """The user's trades matching the get_trades filters, in (opened_at, id) order."""
+        index = self._opened.get(user_id, [])
+        position = 0
+        if after:
+            position = bisect_right(index, (_naive_utc(after[0]), after[1]))
+        if start_date:
+            position = max(position, bisect_left(index, (_naive_utc(start_date),)))
+        end_date = _naive_utc(end_date)
+        for i in range(position, len(index)):
+            opened_at, trade_id = index[i]
+            if end_date and opened_at > end_date:
+                return
+            trade = self._trades[trade_id]
+            if (pair and trade.pair != pair) or (status and trade.status != status) or not pair_visible(trade.pair, mode):
+                continue
+            yield trade
+
+    def _closed_columns(self, user_id: int) -> dict:
+        """The user's closed trades as snapshot-layout columns, rebuilt after each change."""
+        version = self._versions.get(user_id, 0)
+        cached = self._columns.get(user_id)
+        if cached is None or cached[0] != version:
+            trades = [self._trades[trade_id] for _, trade_id in self._closed.get(user_id, [])]
+            rows = snapshot_rows(trades)
+            columns = {name: np.array(rows[name], dtype=SNAPSHOT_COLUMNS[name]) for name in ("id", "closed_at", "result_usd", "risk")}
+            cached = self._columns[user_id] = (version, columns)
+        return cached[1]
+
+    def _open_positions(self, user_id: int):
+        version = self._versions.get(user_id, 0)
+        if not open_book.is_current(user_id, version):
+            open_book.load(user_id, [
+                (trade.id, trade.pair, trade.direction, trade.entry_price, trade.position_size)
+                for trade in self._select(user_id, status=TradeStatus.OPEN)
+            ], version)
+        return open_book
+
+    def _publish(self, user_id: int, action: str, trade: Trade, closed: bool = False):
+        if event_hub.has_subscribers_for(user_id):
+            event_hub.publish("trade", trade_event(action, trade_fields(trade), self._summary(user_id), closed), user_id)
+
+    # Trades
+
+    async def create_trade(self, user_id: int, trade_in):
+        trade = Trade(**trade_in.dict(), user_id=user_id)
+        trade.risk_reward = compute_risk_reward(trade)
+        self._insert(trade)
+        track_open_position(trade, self._changed(user_id))
+        self._publish(user_id, "created", trade)
+        return trade
+
+    async def import_trade_batch(self, user_id: int, records: list):
+        rows, errors, closed, risk_reward, result_usd = prepare_import(user_id, records)
+        if not rows:
+            return 0, errors
+        for row in rows:
+            trade = Trade(**row)
+            self._insert(trade)
+            if trade.status == TradeStatus.OPEN:
+                track_open_position(trade)
+        open_book.advance(user_id, self._changed(user_id, batch_contribution(result_usd[closed], risk_reward[closed])))
+        event_hub.publish("resync", {"reason": "import"}, user_id)
+        return len(rows), errors
+
+    async def get_trade(self, user_id: int, trade_id: int):
+        return self._owned(user_id, trade_id)
+
+    async def get_trade_rows(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, limit=None, offset=None, after=None, mode=None):
+        trades = self._select(user_id, pair, status, start_date, end_date, after, mode)
+        start = offset or 0
+        return [
+            TradeRow(*(getattr(trade, name) for name in TRADE_ATTRIBUTES))
+            for trade in itertools.islice(trades, start, start + limit if limit else None)
+        ]
+
+    async def stream_trade_rows(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, mode=None, batch_size: int = 1000):
+        rows = await self.get_trade_rows(user_id, pair, status, start_date, end_date, mode=mode)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def update_trade(self, user_id: int, trade_id: int, trade_in):
+        trade = self._owned(user_id, trade_id)
+        if not trade:
+            return None
+        before = trade_contribution(trade)
+        _remove(self._closed.get(user_id, []), _closed_key(trade))
+        for key, value in trade_in.dict(exclude_unset=True).items():
+            setattr(trade, key, value)
+        trade.updated_at = datetime.utcnow()
+        if trade.status == TradeStatus.CLOSED:
+            insort(self._closed.setdefault(user_id, []), _closed_key(trade))
+        track_open_position(trade, self._changed(user_id, rollup_delta(before, trade_contribution(trade))))
+        self._publish(user_id, "updated", trade)
+        return trade
+
+    async def delete_trade(self, user_id: int, trade_id: int):
+        trade = self._owned(user_id, trade_id)
+        if not trade:
+            return None
+        del self._trades[trade_id]
+        _remove(self._opened[user_id], (trade.opened_at, trade.id))
+        _remove(self._closed.get(user_id, []), _closed_key(trade))
+        version = self._changed(user_id, rollup_delta(trade_contribution(trade), trade_contribution(None)))
+        open_book.close_trades(user_id, [trade_id], version)
+        self._publish(user_id, "deleted", trade)
+        return trade
+
+    async def close_trade(self, user_id: int, trade_id: int, exit_price: float):
+        trade = self._owned(user_id, trade_id)
+        if not trade or trade.status == TradeStatus.CLOSED:
+            return None
+        trade.exit_price = exit_price
+        trade.closed_at = datetime.utcnow()
+        trade.status = TradeStatus.CLOSED
+        trade.result_pips = compute_result_pips(trade)
+        trade.result_usd = compute_result_usd(trade)
+        trade.risk_reward = compute_risk_reward(trade)
+        trade.updated_at = datetime.utcnow()
+        insort(self._closed.setdefault(user_id, []), _closed_key(trade))
+        version = self._changed(user_id, trade_contribution(trade))
+        open_book.close_trades(user_id, [trade.id], version)
+        self._publish(user_id, "closed", trade, closed=True)
+        return trade
+
+    async def close_trades(self, user_id: int, exits: dict = None, prices: dict = None):
+        exits, prices = exits or {}, prices or {}
+        trades, skipped = [], []
+        for trade_id in exits:
+            trade = self._owned(user_id, trade_id)
+            if trade is None or trade.status != TradeStatus.OPEN:
+                skipped.append(trade_id)
+            else:
+                trades.append(trade)
+        if prices:
+            trades += [trade for trade in self._select(user_id, status=TradeStatus.OPEN) if trade.pair in prices and trade.id not in exits]
+        if not trades:
+            return [], skipped
+        exit_price = [exits[t.id] if t.id in exits else prices[t.pair] for t in trades]
+        risk_reward, result_pips, result_usd = compute_results_batch(
+            [t.direction.value for t in trades],
+            [t.entry_price for t in trades],
+            exit_price,
+            [t.stop_loss for t in trades],
+            [t.take_profit for t in trades],
+            [t.position_size for t in trades],
+        )
+        now = datetime.utcnow()
+        closed_index = self._closed.setdefault(user_id, [])
+        results = []
+        for trade, price, rr, pips, usd in zip(trades, exit_price, risk_reward.tolist(), result_pips.tolist(), result_usd.tolist()):
+            trade.exit_price, trade.status, trade.closed_at, trade.updated_at = price, TradeStatus.CLOSED, now, now
+            trade.risk_reward = None if rr != rr else rr
+            trade.result_pips = None if pips != pips else pips
+            trade.result_usd = None if usd != usd else usd
+            insort(closed_index, _closed_key(trade))
+            results.append({"id": trade.id, "exit_price": price, "risk_reward": trade.risk_reward, "result_pips": trade.result_pips, "result_usd": trade.result_usd})
+        version = self._changed(user_id, batch_contribution(result_usd, risk_reward))
+        open_book.close_trades(user_id, [t.id for t in trades], version)
+        event_hub.publish("resync", {"reason": "batch_close"}, user_id)
+        return results, skipped
+
+    # Stats
+
+    async def get_data_version(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def _summary(self, user_id: int) -> dict:
+        rollup = self._rollups.get(user_id) or dict.fromkeys(ROLLUP_FIELDS, 0)
+        return summary_stats(rollup, self._open_positions(user_id).snapshot(user_id))
+
+    async def get_summary_stats(self, user_id: int):
+        return self._summary(user_id)
+
+    async def get_equity_curve(self, user_id: int, start=None, end=None, resolution=None, max_points=None):
+        return equity_curve(self._closed_columns(user_id), start, end, resolution, max_points)
+
+    async def get_breakdown(self, user_id: int, by: list):
+        groups = {}
+        for _, trade_id in self._closed.get(user_id, []):
+            trade = self._trades[trade_id]
+            groups.setdefault(tuple(_breakdown_key(trade, dim) for dim in by), []).append(trade.result_usd)
+        rows = []
+        # ORDER BY the group keys, NULLs first as in SQLite.
+        for key in sorted(groups, key=lambda key: [(value is not None, value) for value in key]):
+            results = groups[key]
+            wins = [r for r in results if r is not None and r > 0]
+            losses = [r for r in results if r is not None and r < 0]
+            rows.append({
+                **dict(zip(by, key)),
+                "total_trades": len(results),
+                "winning_trades": len(wins),
+                "losing_trades": len(losses),
+                "win_rate": 100.0 * len(wins) / len(results),
+                "total_profit": float(sum(r for r in results if r is not None)),
+                "expectancy": sum(r or 0.0 for r in results) / len(results),
+                "avg_win": _mean(wins),
+                "avg_loss": _mean(losses),
+            })
+        return rows
+
+    async def get_advanced_stats(self, user_id: int):
+        columns = self._closed_columns(user_id)
+        return advanced_stats(columns["closed_at"], np.nan_to_num(columns["result_usd"]), columns["risk"])
+
+    async def get_trade_outcomes(self, user_id: int, basis: str = "usd", risk_per_trade: float = None):
+        return trade_outcomes(self._closed_columns(user_id), basis, risk_per_trade)
+
+    async def get_unrealized(self, user_id: int, include_trades: bool = False):
+        return self._open_positions(user_id).snapshot(user_id, include_trades)
+
+memory_repository = MemoryRepository()
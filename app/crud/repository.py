@@ -0,0 +1,157 @@
+"""Storage behind the API routes.
+
+Routes talk to a `Repository`. `SQLRepository` runs the app.crud functions on
+one request's AsyncSession; `app.crud.memory.MemoryRepository` keeps the same
+data in process memory and serves DATA_MODE=test, so load tests and the test
+suite exercise the real endpoint code without database I/O.
+"""
+import os
+from abc import ABC, abstractmethod
+from app.crud import aio
+from app.crud.trade import trade_rows_query
+from app.db.session import init_engines
+
+class Repository(ABC):
+    """Per-user trade, stats and account storage; every method is scoped to `user_id`."""
+
+    # Accounts
+    @abstractmethod
+    async def get_user_by_email(self, email: str):
+        ...
+
+    @abstractmethod
+    async def create_user(self, user_in, hashed_password: str = None):
+        ...
+
+    @abstractmethod
+    async def update_password_hash(self, user, hashed_password: str):
+        ...
+
+    # Trades (see app.crud.trade for the semantics)
+    @abstractmethod
+    async def create_trade(self, user_id: int, trade_in):
+        ...
+
+    @abstractmethod
+    async def import_trade_batch(self, user_id: int, records: list):
+        ...
+
+    @abstractmethod
+    async def get_trade(self, user_id: int, trade_id: int):
+        ...
+
+    @abstractmethod
+    async def get_trade_rows(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, limit=None, offset=None, after=None, mode=None):
+        ...
+
+    @abstractmethod
+    def stream_trade_rows(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, mode=None, batch_size: int = 1000):
+        """Async iterator of get_trade_rows in batches; usable after the request's session is closed."""
+
+    @abstractmethod
+    async def update_trade(self, user_id: int, trade_id: int, trade_in):
+        ...
+
+    @abstractmethod
+    async def delete_trade(self, user_id: int, trade_id: int):
+        ...
+
+    @abstractmethod
+    async def close_trade(self, user_id: int, trade_id: int, exit_price: float):
+        ...
+
+    @abstractmethod
+    async def close_trades(self, user_id: int, exits: dict = None, prices: dict = None):
+        ...
+
+    # Stats (see app.crud.stats)
+    @abstractmethod
+    async def get_data_version(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def get_summary_stats(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def get_equity_curve(self, user_id: int, start=None, end=None, resolution=None, max_points=None):
+        ...
+
+    @abstractmethod
+    async def get_breakdown(self, user_id: int, by: list):
+        ...
+
+    @abstractmethod
+    async def get_advanced_stats(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def get_trade_outcomes(self, user_id: int, basis: str = "usd", risk_per_trade: float = None):
+        ...
+
+    @abstractmethod
+    async def get_unrealized(self, user_id: int, include_trades: bool = False):
+        ...
+
+def _on_session(fn):
+    async def method(self, *args, **kwargs):
+        return await fn(self.session, *args, **kwargs)
+    method.__name__, method.__doc__ = fn.__name__, fn.__doc__
+    return method
+
+class SQLRepository(Repository):
+    """Repository over the app.crud functions, run on one AsyncSession."""
+
+    def __init__(self, session):
+        self.session = session
+
+    get_user_by_email = _on_session(aio.get_user_by_email)
+    create_user = _on_session(aio.create_user)
+    update_password_hash = _on_session(aio.update_password_hash)
+
+    create_trade = _on_session(aio.create_trade)
+    import_trade_batch = _on_session(aio.import_trade_batch)
+    get_trade = _on_session(aio.get_trade)
+    get_trade_rows = _on_session(aio.get_trade_rows)
+    update_trade = _on_session(aio.update_trade)
+    delete_trade = _on_session(aio.delete_trade)
+    close_trade = _on_session(aio.close_trade)
+    close_trades = _on_session(aio.close_trades)
+
+    get_data_version = _on_session(aio.get_data_version)
+    get_summary_stats = _on_session(aio.get_summary_stats)
+    get_equity_curve = _on_session(aio.get_equity_curve)
+    get_breakdown = _on_session(aio.get_breakdown)
+    get_advanced_stats = _on_session(aio.get_advanced_stats)
+    get_trade_outcomes = _on_session(aio.get_trade_outcomes)
+    get_unrealized = _on_session(aio.get_unrealized)
+
+    async def stream_trade_rows(self, user_id: int, pair=None, status=None, start_date=None, end_date=None, mode=None, batch_size: int = 1000):
+        """Rows from a server-side cursor on a session of its own, `batch_size` at a time."""
+        query = trade_rows_query(user_id, pair, status, start_date, end_date, mode).execution_options(yield_per=batch_size)
+        async with init_engines()["async_read_session_maker"]() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+def uses_memory() -> bool:
+    """DATA_MODE=test serves every request from the in-memory repository."""
+    return os.environ.get("DATA_MODE", "real") == "test"
+
+async def get_repository():
+    """Repository for a request that may write."""
+    if uses_memory():
+        from app.crud.memory import memory_repository
+        yield memory_repository
+        return
+    async with init_engines()["async_session_maker"]() as session:
+        yield SQLRepository(session)
+
+async def get_read_repository():
+    """Repository for a request whose queries never write (the read-only pool under SQL)."""
+    if uses_memory():
+        from app.crud.memory import memory_repository
+        yield memory_repository
+        return
+    async with init_engines()["async_read_session_maker"]() as session:
+        yield SQLRepository(session)
@@ -1,28 +1,349 @@
-from sqlmodel import Session, select, func
+import math
+import numpy as np
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, extract
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlmodel import Session, select, update, func, case, cast
 from app.models.trade import Trade, TradeStatus
+from app.models.stats import StatsRollup, DataVersion
+from app.utils.timeseries import bucket_starts, lttb_indices, running_drawdown
+from app.utils.analytics import advanced_stats
+from app.utils.snapshot import trade_snapshot
+from app.utils.pricing import open_book
 
-def get_summary_stats(session: Session):
-    trades = session.exec(select(Trade).where(Trade.status == TradeStatus.CLOSED)).all()
-    total = len(trades)
-    wins = [t for t in trades if t.result_usd and t.result_usd > 0]
-    losses = [t for t in trades if t.result_usd and t.result_usd <= 0]
-    win_rate = (len(wins) / total * 100) if total else 0
-    avg_rr = sum([t.risk_reward for t in trades if t.risk_reward]) / total if total else 0
-    total_profit = sum([t.result_usd for t in trades if t.result_usd])
+class year_month(FunctionElement):
+    """'YYYY-MM' of a datetime expression, compiled for each database."""
+    type = String()
+    inherit_cache = True
+
+@compiles(year_month)
+def _year_month(element, compiler, **kw):
+    return compiler.process(func.strftime("%Y-%m", *element.clauses), **kw)
+
+@compiles(year_month, "postgresql")
+def _year_month_postgresql(element, compiler, **kw):
+    return compiler.process(func.to_char(*element.clauses, "YYYY-MM"), **kw)
+
+# Grouping expressions for get_breakdown; time buckets use the close time.
+# weekday is EXTRACT(dow), 0 = Sunday on every supported database.
+BREAKDOWN_DIMENSIONS = {
+    "pair": Trade.pair,
+    "direction": Trade.direction,
+    "weekday": cast(extract("dow", Trade.closed_at), Integer),
+    "hour": cast(extract("hour", Trade.closed_at), Integer),
+    "month": year_month(Trade.closed_at),
+}
+
+# INSERT constructs that support ON CONFLICT DO UPDATE, by dialect name.
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+def upsert(session: Session, model, values: dict, set_: dict):
+    """INSERT `values` into `model`'s table, or apply `set_` to the row with the same user_id (a statement to execute)."""
+    insert = UPSERT_INSERTS[session.get_bind().dialect.name](model).values(**values)
+    return insert.on_conflict_do_update(index_elements=["user_id"], set_=set_)
+
+EQUITY_RESOLUTIONS = ("day", "week", "month")
+
+ROLLUP_FIELDS = ("total_trades", "winning_trades", "losing_trades", "sum_risk_reward", "total_profit")
+
+# StatsRollup.user_id of the journal-wide row, which aggregates every user's trades (no account has id 0).
+OVERALL_ROLLUP = 0
+
+def trade_contribution(trade: Trade) -> dict:
+    """Counters a single trade adds to the rollup (all zero unless it is closed)."""
+    if trade is None or trade.status != TradeStatus.CLOSED:
+        return dict.fromkeys(ROLLUP_FIELDS, 0)
+    result_usd = trade.result_usd or 0
+    return {
+        "total_trades": 1,
+        "winning_trades": 1 if result_usd > 0 else 0,
+        "losing_trades": 1 if result_usd < 0 else 0,
+        "sum_risk_reward": trade.risk_reward or 0,
+        "total_profit": result_usd,
+    }
+
+def batch_contribution(result_usd, risk_reward) -> dict:
+    """Summed trade_contribution of a batch of closed trades given as arrays (NaN for None)."""
+    result_usd = np.nan_to_num(np.asarray(result_usd, dtype=float))
+    return {
+        "total_trades": len(result_usd),
+        "winning_trades": int((result_usd > 0).sum()),
+        "losing_trades": int((result_usd < 0).sum()),
+        "sum_risk_reward": float(np.nansum(np.asarray(risk_reward, dtype=float))),
+        "total_profit": float(result_usd.sum()),
+    }
+
+def rollup_delta(before: dict, after: dict) -> dict:
+    return {key: after[key] - before[key] for key in ROLLUP_FIELDS}
+
+def apply_rollup_delta(session: Session, user_id: int, delta: dict):
+    """Add `delta` to the user's and the journal-wide rollup inside the caller's transaction.
+
+    Uses an in-place UPDATE so concurrent writers never lose increments. A rollup
+    row that does not exist yet is left alone; it is rebuilt on first read.
+    """
+    if not any(delta.values()):
+        return
+    values = {key: getattr(StatsRollup, key) + value for key, value in delta.items() if value}
+    values["updated_at"] = datetime.utcnow()
+    session.exec(update(StatsRollup).where(StatsRollup.user_id.in_((user_id, OVERALL_ROLLUP))).values(**values))
+
+def bump_data_version(session: Session, user_id: int) -> int:
+    """Advance the user's data version inside the caller's transaction (a single upsert) and return it."""
+    statement = upsert(session, DataVersion, {"user_id": user_id, "version": 1}, {"version": DataVersion.version + 1})
+    return session.exec(statement.returning(DataVersion.version)).scalar_one()
+
+def get_data_version(session: Session, user_id: int) -> int:
+    return session.exec(select(DataVersion.version).where(DataVersion.user_id == user_id)).first() or 0
+
+def compute_rollup(session: Session, user_id: int) -> dict:
+    """Full recompute of the user's (or with OVERALL_ROLLUP, the whole journal's) rollup counters."""
+    query = select(
+        func.count(Trade.id),
+        func.sum(case((Trade.result_usd > 0, 1), else_=0)),
+        func.sum(case((Trade.result_usd < 0, 1), else_=0)),
+        func.sum(Trade.risk_reward),
+        func.sum(Trade.result_usd),
+    ).where(Trade.status == TradeStatus.CLOSED)
+    if user_id != OVERALL_ROLLUP:
+        query = query.where(Trade.user_id == user_id)
+    total, wins, losses, sum_rr, profit = session.exec(query).one()
+    return {
+        "total_trades": total,
+        "winning_trades": wins or 0,
+        "losing_trades": losses or 0,
+        "sum_risk_reward": sum_rr or 0.0,
+        "total_profit": profit or 0.0,
+    }
+
+def rebuild_rollup(session: Session, user_id: int) -> StatsRollup:
+    """Recompute the user's rollup and store it with an upsert, so concurrent first reads cannot collide."""
+    values = dict(compute_rollup(session, user_id), updated_at=datetime.utcnow())
+    session.exec(upsert(session, StatsRollup, dict(values, user_id=user_id), values))
+    session.commit()
+    return session.get(StatsRollup, user_id, populate_existing=True)
+
+def get_overall_rollup(session: Session) -> StatsRollup:
+    """The journal-wide rollup, rebuilt when it has not been stored yet."""
+    return session.get(StatsRollup, OVERALL_ROLLUP) or rebuild_rollup(session, OVERALL_ROLLUP)
+
+def check_rollup(session: Session, user_id: int) -> dict:
+    """Compare the user's (or the journal-wide) stored rollup with a full recompute.
+
+    Returns the mismatching fields as ``{field: (stored, expected)}``; an empty
+    dict means the rollup is consistent.
+    """
+    expected = compute_rollup(session, user_id)
+    rollup = session.get(StatsRollup, user_id)
+    if rollup is None:
+        return {key: (None, value) for key, value in expected.items()}
+    mismatches = {}
+    for key, value in expected.items():
+        stored = getattr(rollup, key)
+        if not math.isclose(stored, value, rel_tol=1e-9, abs_tol=1e-6):
+            mismatches[key] = (stored, value)
+    return mismatches
+
+def open_positions(session: Session, user_id: int):
+    """The mark-to-market book, with the user's open trades (re)loaded when their data version moved."""
+    # Read the version first: a write committed while the SELECT runs leaves the
+    # book one version behind, so the next call reloads it.
+    version = get_data_version(session, user_id)
+    if not open_book.is_current(user_id, version):
+        open_book.load(user_id, session.exec(
+            select(Trade.id, Trade.pair, Trade.direction, Trade.entry_price, Trade.position_size)
+            .where(Trade.user_id == user_id, Trade.status == TradeStatus.OPEN)
+        ).all(), version)
+    return open_book
+
+def get_unrealized(session: Session, user_id: int, include_trades: bool = False):
+    return open_positions(session, user_id).snapshot(user_id, include_trades)
+
+def summary_stats(rollup: dict, unrealized: dict) -> dict:
+    """The summary response from rollup counters and the open-position snapshot."""
+    total = rollup["total_trades"]
     return {
         "total_trades": total,
-        "winning_trades": len(wins),
-        "losing_trades": len(losses),
-        "win_rate": win_rate,
-        "avg_risk_reward": avg_rr,
-        "total_profit": total_profit,
+        "winning_trades": rollup["winning_trades"],
+        "losing_trades": rollup["losing_trades"],
+        "win_rate": (rollup["winning_trades"] / total * 100) if total else 0,
+        "avg_risk_reward": rollup["sum_risk_reward"] / total if total else 0,
+        "total_profit": rollup["total_profit"],
+        "open_trades": unrealized["open_trades"],
+        "unrealized_usd": unrealized["unrealized_usd"],
+        "unrealized_pips": unrealized["unrealized_pips"],
+    }
+
+def get_summary_stats(session: Session, user_id: int):
+    rollup = session.get(StatsRollup, user_id)
+    if rollup is None:
+        rollup = rebuild_rollup(session, user_id)
+    counters = {key: getattr(rollup, key) for key in ROLLUP_FIELDS}
+    return summary_stats(counters, open_positions(session, user_id).snapshot(user_id))
+
+def get_breakdown(session: Session, user_id: int, by: list):
+    """P&L, win rate and expectancy of closed trades grouped by `by` dimensions.
+
+    Grouping and aggregation run as a single GROUP BY in the database; only one
+    row per group is returned to Python.
+    """
+    keys = [BREAKDOWN_DIMENSIONS[dim].label(dim) for dim in by]
+    total = func.count(Trade.id)
+    wins = func.sum(case((Trade.result_usd > 0, 1), else_=0))
+    losses = func.sum(case((Trade.result_usd < 0, 1), else_=0))
+    query = (
+        select(
+            *keys,
+            total.label("total_trades"),
+            wins.label("winning_trades"),
+            losses.label("losing_trades"),
+            (100.0 * wins / total).label("win_rate"),
+            func.coalesce(func.sum(Trade.result_usd), 0.0).label("total_profit"),
+            func.avg(func.coalesce(Trade.result_usd, 0.0)).label("expectancy"),
+            func.avg(case((Trade.result_usd > 0, Trade.result_usd))).label("avg_win"),
+            func.avg(case((Trade.result_usd < 0, Trade.result_usd))).label("avg_loss"),
+        )
+        .where(Trade.user_id == user_id, Trade.status == TradeStatus.CLOSED)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    return [dict(row._mapping) for row in session.exec(query)]
+
+def load_closed_trade_columns(session: Session, user_id: int):
+    """The user's closed trades as NumPy columns in the snapshot layout, read in one query without ORM objects.
+
+    Returns ``(columns, pairs, directions)``; the pair and direction columns hold
+    indexes into those name lists.
+    """
+    rows = session.exec(
+        select(
+            Trade.id, Trade.closed_at, Trade.pair, Trade.direction, Trade.result_usd, Trade.result_pips,
+            Trade.risk_reward, Trade.position_size, Trade.entry_price, Trade.stop_loss,
+        )
+        .where(Trade.user_id == user_id, Trade.status == TradeStatus.CLOSED)
+        # NULL placement differs by dialect (first on SQLite, last on PostgreSQL); equity_curve needs them first.
+        .order_by(Trade.closed_at.asc().nulls_first(), Trade.id)
+    ).all()
+    ids, closed_at, pair, direction, result_usd, result_pips, risk_reward, position_size, entry_price, stop_loss = zip(*rows) if rows else ((),) * 10
+    pairs, directions = {}, {}
+    position_size = np.array(position_size, dtype=float)
+    columns = {
+        "id": np.array(ids, dtype=np.int64),
+        "closed_at": np.array(closed_at, dtype="datetime64[us]"),
+        "pair": np.array([pairs.setdefault(name, len(pairs)) for name in pair], dtype=np.int32),
+        "direction": np.array([directions.setdefault(getattr(name, "value", name), len(directions)) for name in direction], dtype=np.int8),
+        "result_usd": np.array(result_usd, dtype=float),
+        "result_pips": np.array(result_pips, dtype=float),
+        "risk_reward": np.array(risk_reward, dtype=float),
+        "position_size": position_size,
+        "risk": np.abs(np.array(entry_price, dtype=float) - np.array(stop_loss, dtype=float)) * position_size,
     }
+    return columns, list(pairs), list(directions)
+
+def snapshot_rows(trades: list) -> dict:
+    """Closed trades as snapshot columns (see load_closed_trade_columns), pairs and directions by name."""
+    return {
+        "id": [t.id for t in trades],
+        "closed_at": [t.closed_at for t in trades],
+        "pair": [t.pair for t in trades],
+        "direction": [t.direction.value for t in trades],
+        "result_usd": [t.result_usd for t in trades],
+        "result_pips": [t.result_pips for t in trades],
+        "risk_reward": [t.risk_reward for t in trades],
+        "position_size": [t.position_size for t in trades],
+        "risk": [abs(t.entry_price - t.stop_loss) * t.position_size if t.stop_loss is not None else None for t in trades],
+    }
+
+def closed_trade_columns(session: Session, user_id: int) -> dict:
+    """The user's closed-trade columns from the memory-mapped snapshot.
+
+    The snapshot is rebuilt from the database when it is missing or was written
+    for a different DataVersion than the current one.
+    """
+    version = get_data_version(session, user_id)
+    snapshot = trade_snapshot.read(user_id)
+    if snapshot is None or snapshot[1]["data_version"] != version:
+        columns, pairs, directions = load_closed_trade_columns(session, user_id)
+        if get_data_version(session, user_id) != version:
+            # A write committed during the load, so the columns match no single version; serve them uncached.
+            return columns
+        trade_snapshot.write(user_id, columns, pairs, directions, version)
+        snapshot = trade_snapshot.read(user_id)
+    return snapshot[0]
+
+def _utc_micros(value: datetime) -> int:
+    """`value` as microseconds since the epoch on the naive-UTC scale trades are stored in."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, "us").view(np.int64))
+
+def get_equity_curve(session: Session, user_id: int, start: datetime = None, end: datetime = None, resolution: str = None, max_points: int = None):
+    return equity_curve(closed_trade_columns(session, user_id), start, end, resolution, max_points)
+
+def equity_curve(columns: dict, start: datetime = None, end: datetime = None, resolution: str = None, max_points: int = None):
+    """Equity curve of closed trades with its running peak and drawdown.
+
+    The running balance is a cumulative sum over the snapshot columns, optionally
+    over day/week/month buckets. Trades closed before `start` seed the opening
+    balance and peak. With `max_points` the curve is reduced with LTTB, which keeps its shape.
+    """
+    closed_at, pnl = columns["closed_at"], np.nan_to_num(columns["result_usd"])
+    # Rows are sorted with NaT (no close time) first; a date range excludes them.
+    stamps = closed_at.view(np.int64)
+    lo, hi = 0, len(stamps)
+    if start or end:
+        lo = int(np.searchsorted(stamps, np.iinfo(np.int64).min, "right"))
+    opening, initial_peak = 0.0, 0.0
+    if start:
+        first = max(lo, int(np.searchsorted(stamps, _utc_micros(start), "left")))
+        prior = np.cumsum(pnl[lo:first])
+        if len(prior):
+            opening, initial_peak = float(prior[-1]), max(float(prior.max()), 0.0)
+        lo = first
+    if end:
+        hi = int(np.searchsorted(stamps, _utc_micros(end), "right"))
+    if hi <= lo:
+        return []
+    dates, balance = closed_at[lo:hi], np.cumsum(pnl[lo:hi]) + opening
+    if resolution:
+        dates = bucket_starts(dates, resolution)
+        keys = dates.view(np.int64)
+        # Balance at the last trade of each bucket.
+        last = np.flatnonzero(np.concatenate((keys[1:] != keys[:-1], [True])))
+        dates, balance = dates[last], balance[last]
+    peak, drawdown = running_drawdown(balance, initial_peak)
+    keep = np.arange(len(balance))
+    if max_points and max_points < len(balance):
+        keep = lttb_indices(dates.astype("datetime64[s]").astype(float), balance, max_points)
+    # Buckets are reported as "YYYY-MM-DD" strings and trades by their close time.
+    dates = dates[keep].astype(str if resolution else object)
+    return [
+        {"date": None if date in (None, "NaT") else date, "balance": float(balance[i]), "peak": float(peak[i]), "drawdown": float(drawdown[i])}
+        for date, i in zip(dates, keep)
+    ]
+
+def get_advanced_stats(session: Session, user_id: int):
+    columns = closed_trade_columns(session, user_id)
+    return advanced_stats(columns["closed_at"], np.nan_to_num(columns["result_usd"]), columns["risk"])
+
+def get_trade_outcomes(session: Session, user_id: int, basis: str = "usd", risk_per_trade: float = None) -> np.ndarray:
+    return trade_outcomes(closed_trade_columns(session, user_id), basis, risk_per_trade)
+
+def trade_outcomes(columns: dict, basis: str = "usd", risk_per_trade: float = None) -> np.ndarray:
+    """Closed-trade outcomes in USD to resample.
 
-def get_equity_curve(session: Session):
-    trades = session.exec(select(Trade).where(Trade.status == TradeStatus.CLOSED).order_by(Trade.closed_at)).all()
-    curve = []
-    balance = 0
-    for t in trades:
-        balance += t.result_usd or 0
-        curve.append({"date": t.closed_at, "balance": balance})
-    return curve
+    With basis "r" the R-multiples are resampled instead, scaled to `risk_per_trade`
+    (default: the median historical risk), so the result reflects a fixed risk per trade.
+    """
+    result_usd = np.nan_to_num(columns["result_usd"])
+    if basis == "usd":
+        return result_usd
+    risk = columns["risk"]
+    valid = np.isfinite(risk) & (risk > 0)
+    if not valid.any():
+        return np.zeros(0)
+    risk_per_trade = risk_per_trade or float(np.median(risk[valid]))
+    return result_usd[valid] / risk[valid] * risk_per_trade
@@ -1,22 +1,141 @@
-from sqlmodel import Session, select
+from pydantic import ValidationError
+from sqlalchemy import Column, Float, Integer, MetaData, Table
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, select, func, insert, update, delete, tuple_
 from app.models.trade import Trade, TradeStatus
-from app.schemas.trade import TradeCreate, TradeUpdate
-from app.utils.trading import compute_risk_reward, compute_result_pips, compute_result_usd
+from app.schemas.trade import TradeCreate, TradeImport, TradeUpdate
+from app.crud.stats import trade_contribution, batch_contribution, rollup_delta, apply_rollup_delta, bump_data_version, snapshot_rows, get_summary_stats
+from app.utils.trading import compute_risk_reward, compute_result_pips, compute_result_usd, compute_results_batch
+from app.utils.snapshot import trade_snapshot
+from app.utils.events import event_hub
+from app.utils.pricing import open_book
 from datetime import datetime
+import numpy as np
 
-def create_trade(session: Session, trade_in: TradeCreate):
-    trade = Trade(**trade_in.dict())
+def create_trade(session: Session, user_id: int, trade_in: TradeCreate):
+    trade = Trade(**trade_in.dict(), user_id=user_id)
     trade.risk_reward = compute_risk_reward(trade)
     session.add(trade)
+    version = bump_data_version(session, user_id)
     session.commit()
+    trade_snapshot.advance(user_id, version)
     session.refresh(trade)
+    track_open_position(trade, version)
+    publish_trade_event(session, user_id, "created", trade_fields(trade))
     return trade
 
-def get_trade(session: Session, trade_id: int):
-    return session.get(Trade, trade_id)
+def prepare_import(user_id: int, records: list):
+    """Validate one batch of imported records and build the trade rows to insert.
 
-def get_trades(session: Session, pair: str = None, status: TradeStatus = None, start_date: datetime = None, end_date: datetime = None, limit: int = None, offset: int = None):
-    query = select(Trade)
+    `records` holds ``(row_number, dict)`` pairs (or an exception in place of the
+    dict for rows that failed to parse). Valid rows get risk_reward/result_* from
+    one vectorized pass. Returns ``(rows, errors, closed, risk_reward, result_usd)``,
+    the last three as arrays aligned with `rows`.
+    """
+    errors, trades = [], []
+    for row_number, record in records:
+        if isinstance(record, Exception):
+            errors.append((row_number, [str(record)]))
+            continue
+        try:
+            trades.append(TradeImport(**record))
+        except ValidationError as exc:
+            errors.append((row_number, [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()]))
+    if not trades:
+        return [], errors, np.zeros(0, dtype=bool), np.zeros(0), np.zeros(0)
+    risk_reward, result_pips, result_usd = compute_results_batch(
+        [t.direction.value for t in trades],
+        [t.entry_price for t in trades],
+        [t.exit_price for t in trades],
+        [t.stop_loss for t in trades],
+        [t.take_profit for t in trades],
+        [t.position_size for t in trades],
+    )
+    now = datetime.utcnow()
+    rows = []
+    for t, rr, pips, usd in zip(trades, risk_reward.tolist(), result_pips.tolist(), result_usd.tolist()):
+        closed = t.exit_price is not None
+        # A closed row without an open time opened when it closed, so it never opens after it closes.
+        opened_at = t.opened_at or t.closed_at or now
+        rows.append({
+            "user_id": user_id,
+            "pair": t.pair,
+            "direction": t.direction,
+            "entry_price": t.entry_price,
+            "exit_price": t.exit_price,
+            "stop_loss": t.stop_loss,
+            "take_profit": t.take_profit,
+            "position_size": t.position_size,
+            "risk_reward": None if rr != rr else rr,
+            "result_pips": None if pips != pips else pips,
+            "result_usd": None if usd != usd else usd,
+            "notes": t.notes,
+            "screenshot_url": t.screenshot,
+            "status": TradeStatus.CLOSED if closed else TradeStatus.OPEN,
+            "opened_at": opened_at,
+            "closed_at": (t.closed_at or max(now, opened_at)) if closed else None,
+            "created_at": now,
+            "updated_at": now,
+        })
+    closed = np.array([t.exit_price is not None for t in trades])
+    return rows, errors, closed, risk_reward, result_usd
+
+def import_trade_batch(session: Session, user_id: int, records: list):
+    """Validate and insert one batch of the user's imported trades in a single transaction.
+
+    Rows are prepared by prepare_import and written with a single executemany
+    INSERT. Returns ``(imported_count, [(row_number, [messages]), ...])``.
+    """
+    rows, errors, closed, risk_reward, result_usd = prepare_import(user_id, records)
+    if not rows:
+        return 0, errors
+    session.exec(insert(Trade.__table__), params=rows)
+    apply_rollup_delta(session, user_id, batch_contribution(result_usd[closed], risk_reward[closed]))
+    version = bump_data_version(session, user_id)
+    session.commit()
+    if closed.any():
+        trade_snapshot.invalidate(user_id)
+    else:
+        trade_snapshot.advance(user_id, version)
+    if not closed.all():
+        # Inserted ids are not returned by executemany; reload the open trades on next use.
+        open_book.reset(user_id)
+    else:
+        open_book.advance(user_id, version)
+    event_hub.publish("resync", {"reason": "import"}, user_id)
+    return len(rows), errors
+
+def get_trade(session: Session, user_id: int, trade_id: int):
+    """The trade with `trade_id` if it belongs to the user."""
+    trade = session.get(Trade, trade_id)
+    return trade if trade is not None and trade.user_id == user_id else None
+
+def pair_visible(pair: str, mode: str = None) -> bool:
+    """filter_data_mode for one trade's pair, for callers that filter in Python."""
+    if mode == "real":
+        return "TEST" not in pair.upper() and "XAU" not in pair.upper()
+    if mode == "seed":
+        return "XAU" in pair.upper()
+    return True
+
+def filter_data_mode(query, mode: str = None):
+    """Restrict a trade query to the pairs visible in the given DATA_MODE."""
+    if mode == "real":
+        # Exclude any trade whose pair contains 'TEST' or 'XAU' (case-insensitive)
+        pair = func.upper(Trade.pair)
+        query = query.where(~pair.contains("TEST"), ~pair.contains("XAU"))
+    elif mode == "seed":
+        # Only include trades whose pair contains 'XAU' (seed demo, case-insensitive)
+        query = query.where(func.upper(Trade.pair).contains("XAU"))
+    return query
+
+def trades_query(query, user_id: int, pair: str = None, status: TradeStatus = None, start_date: datetime = None, end_date: datetime = None, after: tuple = None, mode: str = None):
+    """Apply the get_trades filters and (opened_at, id) ordering to a select over the user's trades.
+
+    `after` is an (opened_at, id) keyset position; only rows past it are returned,
+    so every page costs the same as the first one.
+    """
+    query = filter_data_mode(query.where(Trade.user_id == user_id), mode)
     if pair:
         query = query.where(Trade.pair == pair)
     if status:
@@ -25,33 +144,118 @@ def get_trades(session: Session, pair: str = None, status: TradeStatus = None, s
         query = query.where(Trade.opened_at >= start_date)
     if end_date:
         query = query.where(Trade.opened_at <= end_date)
+    if after:
+        query = query.where(tuple_(Trade.opened_at, Trade.id) > tuple_(*after))
+    return query.order_by(Trade.opened_at, Trade.id)
+
+def get_trades(session: Session, user_id: int, pair: str = None, status: TradeStatus = None, start_date: datetime = None, end_date: datetime = None, limit: int = None, offset: int = None, after: tuple = None, mode: str = None):
+    query = trades_query(select(Trade), user_id, pair, status, start_date, end_date, after, mode)
     if limit:
         query = query.limit(limit)
     if offset:
         query = query.offset(offset)
     return session.exec(query).all()
 
-def update_trade(session: Session, trade_id: int, trade_in: TradeUpdate):
-    trade = get_trade(session, trade_id)
+# Columns of a trade as returned by the API (TradeRead field names).
+TRADE_COLUMNS = {
+    "id": Trade.id,
+    "pair": Trade.pair,
+    "direction": Trade.direction,
+    "entry_price": Trade.entry_price,
+    "exit_price": Trade.exit_price,
+    "stop_loss": Trade.stop_loss,
+    "take_profit": Trade.take_profit,
+    "position_size": Trade.position_size,
+    "risk_reward": Trade.risk_reward,
+    "result_pips": Trade.result_pips,
+    "result_usd": Trade.result_usd,
+    "notes": Trade.notes,
+    "screenshot": Trade.screenshot_url,
+    "status": Trade.status,
+    "opened_at": Trade.opened_at,
+    "closed_at": Trade.closed_at,
+    "created_at": Trade.created_at,
+    "updated_at": Trade.updated_at,
+}
+
+def trade_rows_query(user_id: int, pair: str = None, status: TradeStatus = None, start_date: datetime = None, end_date: datetime = None, mode: str = None, after: tuple = None):
+    """Same rows as get_trades, as plain column tuples in TRADE_COLUMNS order."""
+    return trades_query(select(*TRADE_COLUMNS.values()), user_id, pair, status, start_date, end_date, after, mode)
+
+def get_trade_rows(session: Session, user_id: int, pair: str = None, status: TradeStatus = None, start_date: datetime = None, end_date: datetime = None, limit: int = None, offset: int = None, after: tuple = None, mode: str = None):
+    """get_trades as column tuples, skipping ORM instances for responses that only serialize them."""
+    query = trade_rows_query(user_id, pair, status, start_date, end_date, mode, after)
+    if limit:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+    return session.exec(query).all()
+
+def trade_fields(trade: Trade) -> dict:
+    """A trade keyed by API field name (TradeRead), read from the loaded instance."""
+    return {name: getattr(trade, column.key) for name, column in TRADE_COLUMNS.items()}
+
+def track_open_position(trade: Trade, version: int = None):
+    """Keep the mark-to-market book in step with a trade that was just written at data `version`."""
+    if trade.status == TradeStatus.OPEN:
+        open_book.open_trade(trade.user_id, trade.id, trade.pair, trade.direction, trade.entry_price, trade.position_size, version)
+    else:
+        open_book.close_trades(trade.user_id, [trade.id], version)
+
+def publish_trade_event(session: Session, user_id: int, action: str, fields: dict, closed: bool = False):
+    """Push a committed trade change to the user's live streams; a no-op when there are none."""
+    if not event_hub.has_subscribers_for(user_id):
+        return
+    event_hub.publish("trade", trade_event(action, fields, get_summary_stats(session, user_id), closed), user_id)
+
+def trade_event(action: str, fields: dict, summary: dict, closed: bool = False) -> dict:
+    """Payload of a `trade` stream event."""
+    data = {"action": action, "trade": fields, "summary": summary}
+    if closed:
+        # The close is the newest point of the equity curve, so its balance is the new total.
+        data["equity_point"] = {"date": fields["closed_at"], "balance": summary["total_profit"]}
+    return data
+
+def update_trade(session: Session, user_id: int, trade_id: int, trade_in: TradeUpdate):
+    trade = get_trade(session, user_id, trade_id)
     if not trade:
         return None
+    before = trade_contribution(trade)
     for key, value in trade_in.dict(exclude_unset=True).items():
         setattr(trade, key, value)
     trade.updated_at = datetime.utcnow()
+    after = trade_contribution(trade)
+    apply_rollup_delta(session, user_id, rollup_delta(before, after))
+    version = bump_data_version(session, user_id)
     session.commit()
+    if before["total_trades"] or after["total_trades"]:
+        trade_snapshot.invalidate(user_id)
+    else:
+        trade_snapshot.advance(user_id, version)
     session.refresh(trade)
+    track_open_position(trade, version)
+    publish_trade_event(session, user_id, "updated", trade_fields(trade))
     return trade
 
-def delete_trade(session: Session, trade_id: int):
-    trade = get_trade(session, trade_id)
+def delete_trade(session: Session, user_id: int, trade_id: int):
+    trade = get_trade(session, user_id, trade_id)
     if not trade:
         return None
+    contribution, fields = trade_contribution(trade), trade_fields(trade)
+    apply_rollup_delta(session, user_id, rollup_delta(contribution, trade_contribution(None)))
     session.delete(trade)
+    version = bump_data_version(session, user_id)
     session.commit()
+    if contribution["total_trades"]:
+        trade_snapshot.invalidate(user_id)
+    else:
+        trade_snapshot.advance(user_id, version)
+    open_book.close_trades(user_id, [trade_id], version)
+    publish_trade_event(session, user_id, "deleted", fields)
     return trade
 
-def close_trade(session: Session, trade_id: int, exit_price: float):
-    trade = get_trade(session, trade_id)
+def close_trade(session: Session, user_id: int, trade_id: int, exit_price: float):
+    trade = get_trade(session, user_id, trade_id)
     if not trade or trade.status == TradeStatus.CLOSED:
         return None
     trade.exit_price = exit_price
@@ -61,6 +265,106 @@ def close_trade(session: Session, trade_id: int, exit_price: float):
     trade.result_usd = compute_result_usd(trade)
     trade.risk_reward = compute_risk_reward(trade)
     trade.updated_at = datetime.utcnow()
+    apply_rollup_delta(session, user_id, trade_contribution(trade))
+    version = bump_data_version(session, user_id)
     session.commit()
     session.refresh(trade)
+    trade_snapshot.append(user_id, snapshot_rows([trade]), version)
+    open_book.close_trades(user_id, [trade.id], version)
+    publish_trade_event(session, user_id, "closed", trade_fields(trade), closed=True)
     return trade
+
+# Ids per IN (...) lookup, well under SQLite's bound-parameter limit.
+ID_LOOKUP_CHUNK = 10000
+
+# Connection-local staging table for close_trades: the batch's results are inserted
+# here and joined by one UPDATE. Kept out of SQLModel.metadata so migrations ignore it.
+closing_trades = Table(
+    "closing_trade",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("exit_price", Float),
+    Column("risk_reward", Float),
+    Column("result_pips", Float),
+    Column("result_usd", Float),
+    prefixes=["TEMPORARY"],
+)
+
+def close_trades(session: Session, user_id: int, exits: dict = None, prices: dict = None):
+    """Close many of the user's open trades in one transaction.
+
+    `exits` maps trade id -> exit price and `prices` maps pair -> exit price for
+    every open trade in that pair; an explicit exit wins. Results for the whole
+    batch come from one compute_results_batch pass, are staged in a temporary
+    table and written by a single UPDATE that returns the ids it closed.
+    Only those ids count: a trade another request closed after the lookup is
+    left out of the results, the rollup and the snapshot.
+    Returns ``(results, skipped_ids)``; skipped ids are missing, another user's or already closed.
+    """
+    exits, prices = exits or {}, prices or {}
+    columns = (Trade.id, Trade.pair, Trade.direction, Trade.entry_price, Trade.stop_loss, Trade.take_profit, Trade.position_size)
+    owned_open = (Trade.user_id == user_id, Trade.status == TradeStatus.OPEN)
+    ids = list(exits)
+    rows = []
+    for start in range(0, len(ids), ID_LOOKUP_CHUNK):
+        rows += session.exec(select(*columns).where(*owned_open, Trade.id.in_(ids[start:start + ID_LOOKUP_CHUNK]))).all()
+    if prices:
+        rows += [row for row in session.exec(select(*columns).where(*owned_open, Trade.pair.in_(list(prices)))) if row.id not in exits]
+    found = {row.id for row in rows}
+    skipped = [trade_id for trade_id in ids if trade_id not in found]
+    if not rows:
+        return [], skipped
+    trade_ids, pairs, direction, entry_price, stop_loss, take_profit, position_size = zip(*rows)
+    exit_price = [exits[trade_id] if trade_id in exits else prices[pair] for trade_id, pair in zip(trade_ids, pairs)]
+    direction = [d.value for d in direction]
+    risk_reward, result_pips, result_usd = compute_results_batch(direction, entry_price, exit_price, stop_loss, take_profit, position_size)
+    results = [
+        {"id": trade_id, "exit_price": price, "risk_reward": None if rr != rr else rr, "result_pips": None if pips != pips else pips, "result_usd": None if usd != usd else usd}
+        for trade_id, price, rr, pips, usd in zip(trade_ids, exit_price, risk_reward.tolist(), result_pips.tolist(), result_usd.tolist())
+    ]
+
+    now = datetime.utcnow()
+    table = Trade.__table__
+    session.connection().execute(CreateTable(closing_trades, if_not_exists=True))
+    session.exec(insert(closing_trades), params=results)
+    staged = {
+        name: select(closing_trades.c[name]).where(closing_trades.c.id == table.c.id).scalar_subquery()
+        for name in ("exit_price", "risk_reward", "result_pips", "result_usd")
+    }
+    closed_ids = set(session.exec(
+        update(table)
+        # Driven by the staged ids, so each closing row is a primary-key lookup however many trades are open.
+        .where(table.c.id.in_(select(closing_trades.c.id)), table.c.status == TradeStatus.OPEN)
+        .values(**staged, status=TradeStatus.CLOSED, closed_at=now, updated_at=now)
+        .returning(table.c.id)
+    ).scalars())
+    session.exec(delete(closing_trades))
+    if len(closed_ids) < len(results):
+        keep = np.array([trade_id in closed_ids for trade_id in trade_ids], dtype=bool)
+        skipped += [trade_id for trade_id, kept in zip(trade_ids, keep) if not kept and trade_id in exits]
+        results, trade_ids, pairs, direction, entry_price, stop_loss, position_size = (
+            [value for value, kept in zip(column, keep) if kept]
+            for column in (results, trade_ids, pairs, direction, entry_price, stop_loss, position_size)
+        )
+        risk_reward, result_pips, result_usd = risk_reward[keep], result_pips[keep], result_usd[keep]
+        if not results:
+            session.commit()
+            return [], skipped
+    apply_rollup_delta(session, user_id, batch_contribution(result_usd, risk_reward))
+    version = bump_data_version(session, user_id)
+    session.commit()
+    position_size = np.asarray(position_size, dtype=float)
+    trade_snapshot.append(user_id, {
+        "id": trade_ids,
+        "closed_at": [now] * len(trade_ids),
+        "pair": pairs,
+        "direction": direction,
+        "result_usd": result_usd,
+        "result_pips": result_pips,
+        "risk_reward": risk_reward,
+        "position_size": position_size,
+        "risk": np.abs(np.asarray(entry_price, dtype=float) - np.asarray(stop_loss, dtype=float)) * position_size,
+    }, version)
+    open_book.close_trades(user_id, trade_ids, version)
+    event_hub.publish("resync", {"reason": "batch_close"}, user_id)
+    return results, skipped
@@ -2,17 +2,26 @@ from sqlmodel import Session, select
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.utils.security import get_password_hash
+from app.utils.token_cache import token_cache
 
 def get_user_by_email(session: Session, email: str):
     return session.exec(select(User).where(User.email == email)).first()
 
-def create_user(session: Session, user_in: UserCreate):
+def create_user(session: Session, user_in: UserCreate, hashed_password: str = None):
     user = User(
         name=user_in.name,
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password)
+        hashed_password=hashed_password or get_password_hash(user_in.password)
     )
     session.add(user)
     session.commit()
     session.refresh(user)
+    token_cache.invalidate_user(user.email)
+    return user
+
+def update_password_hash(session: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    session.add(user)
+    session.commit()
+    token_cache.invalidate_user(user.email)
     return user
@@ -1,8 +1,140 @@
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
-from app.core.config import settings
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.core.config import get_settings
 
-engine = create_engine(settings.SQLITE_DB, echo=False, connect_args={"check_same_thread": False})
+# Async drivers used for each sync database URL scheme.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """PRAGMA statements run on every new SQLite connection, from Settings."""
+    settings = get_settings()
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        # Negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def _configure_sqlite(sync_engine, read_only: bool):
+    """Apply the pragmas to every new connection of `sync_engine`.
+
+    pysqlite only opens a transaction at the first write, always DEFERRED. With
+    SQLITE_BEGIN=IMMEDIATE (or EXCLUSIVE) writers take over the BEGIN so the
+    write lock is taken, or waited for on busy_timeout, at the start of the
+    session transaction rather than failing on a read-to-write upgrade.
+    """
+    pragmas = sqlite_pragmas(read_only)
+    begin = get_settings().SQLITE_BEGIN.upper()
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+        if not read_only and begin != "DEFERRED":
+            dbapi_connection.isolation_level = None
+
+    if not read_only and begin != "DEFERRED":
+        @event.listens_for(sync_engine, "begin")
+        def on_begin(connection):
+            connection.exec_driver_sql(f"BEGIN {begin}")
+
+def engine_options(url: str, read_only: bool = False, is_async: bool = False) -> dict:
+    """create_engine keyword arguments for `url`: driver connect args and pool settings."""
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    settings = get_settings()
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if read_only and url.startswith("postgresql"):
+        setting = {"default_transaction_read_only": "on"}
+        options["connect_args"] = {"server_settings": setting} if is_async else {"options": "-c default_transaction_read_only=on"}
+    return options
+
+def create_db_engine(url: str, read_only: bool = False):
+    """Sync engine for `url` configured from Settings; `read_only` engines refuse writes."""
+    db_engine = create_engine(url, echo=False, **engine_options(url, read_only))
+    if is_sqlite(url):
+        _configure_sqlite(db_engine, read_only)
+    return db_engine
+
+def create_async_db_engine(url: str, read_only: bool = False):
+    """Async counterpart of create_db_engine, on the driver from ASYNC_DRIVERS."""
+    db_engine = create_async_engine(async_database_url(url), echo=False, **engine_options(url, read_only, is_async=True))
+    if is_sqlite(url):
+        _configure_sqlite(db_engine.sync_engine, read_only)
+    return db_engine
+
+# Engines are created on first use (or by init_engines in the app's lifespan), not at
+# import, so importing the app stays cheap and reads settings only when it starts.
+ENGINE_NAMES = ("engine", "async_engine", "async_read_engine", "async_session_maker", "async_read_session_maker")
+_engine_hooks = []
+
+def init_engines() -> dict:
+    """Create the engines and session makers once and publish them as module attributes."""
+    if "engine" in globals():
+        return {name: globals()[name] for name in ENGINE_NAMES}
+    settings = get_settings()
+    engine = create_db_engine(settings.SQLITE_DB)
+    async_engine = create_async_db_engine(settings.SQLITE_DB)
+    # Stats and list queries that never write run on their own read-only pool (a
+    # replica when DB_READ_URL is set), so they cannot hold a write lock.
+    async_read_engine = create_async_db_engine(settings.DB_READ_URL or settings.SQLITE_DB, read_only=True)
+    # expire_on_commit=False: attributes cannot be lazily reloaded outside the event loop.
+    async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    async_read_session_maker = async_sessionmaker(async_read_engine, class_=AsyncSession, expire_on_commit=False)
+    for db_engine in (engine, async_engine.sync_engine, async_read_engine.sync_engine):
+        for hook in _engine_hooks:
+            hook(db_engine)
+    created = {name: value for name, value in locals().items() if name in ENGINE_NAMES}
+    globals().update(created)
+    return created
+
+def on_engine_created(hook):
+    """Call `hook(sync_engine)` for each engine, now if they already exist, else when they are created."""
+    _engine_hooks.append(hook)
+    if "engine" in globals():
+        for db_engine in (engine, async_engine.sync_engine, async_read_engine.sync_engine):
+            hook(db_engine)
+
+def __getattr__(name):
+    if name in ENGINE_NAMES:
+        return init_engines()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_session():
-    with Session(engine) as session:
+    with Session(init_engines()["engine"]) as session:
+        yield session
+
+async def get_async_session():
+    async with init_engines()["async_session_maker"]() as session:
+        yield session
+
+async def get_read_session():
+    """Session on the read-only engine, for endpoints whose queries never write."""
+    async with init_engines()["async_read_session_maker"]() as session:
         yield session
@@ -1,43 +1,141 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.v1.routes import auth, trades, stats
-from app.core.config import settings, DATA_MODE
-from fastapi import Request
-from fastapi.responses import JSONResponse
+from app.api.v1.routes import auth, trades, stats, stream
+from app.core.config import get_settings
+from fastapi import Depends, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import os
-from app.utils.seed import seed_trades
+from typing import Optional
+from app.utils.security import password_pool
+from app.utils.token_cache import token_cache, UserSnapshot
+from app.utils.events import event_hub
+from app.utils.pricing import open_book
+from app.utils.pricefeed import feed_from_url, run_feed
+from app.api.v1.deps import get_optional_user, require_debug_token
+from app.crud.repository import Repository, get_repository, uses_memory
+from app.db.session import init_engines, on_engine_created
+from app.utils.metrics import metrics, instrument_engine, MetricsMiddleware
+from app.utils.profiler import query_profiler, QueryProfilerMiddleware
 
-app = FastAPI(title="Trading Journal API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+async def _consume_price_feed(feed):
+    try:
+        await run_feed(feed, open_book)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Price feed stopped")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines are created here rather than at import; code run without the
+    # lifespan (tests, CLI tools) creates them on first use instead.
+    init_engines()
+    feed = feed_from_url(get_settings().PRICE_FEED_URL)
+    task = asyncio.create_task(_consume_price_feed(feed)) if feed else None
+    yield
+    if task:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+app = FastAPI(title="Trading Journal API", version="1.0.0", lifespan=lifespan)
 
 # System mode endpoint
 @app.get("/api/v1/system/mode")
 async def get_mode():
-    return {"mode": DATA_MODE}
+    return {"mode": os.environ.get("DATA_MODE", "real")}
 
 @app.post("/api/v1/system/mode")
-async def set_mode(request: Request):
+async def set_mode(
+    request: Request,
+    current_user: Optional[UserSnapshot] = Depends(get_optional_user),
+    repository: Repository = Depends(get_repository),
+    x_debug_token: Optional[str] = Header(None),
+):
     body = await request.json()
     mode = body.get("mode")
     if mode not in ["test", "real", "seed"]:
         return JSONResponse(status_code=400, content={"error": "Invalid mode"})
+    if mode == "seed" and current_user is None:
+        # Seeding replaces the signed-in user's trades with the demo set.
+        return JSONResponse(status_code=401, content={"error": "Sign in to seed demo trades"}, headers={"WWW-Authenticate": "Bearer"})
+    switching_backend = (mode == "test") != uses_memory()
+    if switching_backend:
+        # Test mode moves every account to the in-memory repository, so only an operator may enter or leave it.
+        require_debug_token(x_debug_token)
+    if mode == "test" and switching_backend and current_user is not None:
+        # Carry the signed-in account into the in-memory repository so its token keeps working.
+        from app.crud.memory import memory_repository
+        memory_repository.add_user(await repository.get_user_by_email(current_user.email))
     os.environ["DATA_MODE"] = mode
-    global DATA_MODE
-    DATA_MODE = mode
+    if switching_backend:
+        # Cached users and loaded open positions belong to the previous repository.
+        token_cache.clear()
+        open_book.reset()
     if mode == "seed":
-        seed_trades()
-    return {"mode": DATA_MODE}
+        from app.utils.seed import seed_trades
+        await run_in_threadpool(seed_trades, current_user.id)
+    return {"mode": mode}
+
+@app.get("/api/v1/system/password_pool", dependencies=[Depends(require_debug_token)])
+async def get_password_pool_stats():
+    return password_pool.stats()
+
+@app.get("/api/v1/system/token_cache", dependencies=[Depends(require_debug_token)])
+async def get_token_cache_stats():
+    return token_cache.stats()
+
+@app.get("/api/v1/system/stream", dependencies=[Depends(require_debug_token)])
+async def get_stream_stats():
+    return event_hub.stats()
+
+@app.get("/api/v1/system/prices", dependencies=[Depends(require_debug_token)])
+async def get_price_feed_stats():
+    return {"feed": bool(get_settings().PRICE_FEED_URL), "ticks": open_book.ticks, "users": open_book.users}
+
+@app.get("/api/v1/system/queries", dependencies=[Depends(require_debug_token)])
+async def get_query_profile():
+    """Recent slow statements (with plans) and statements repeated within one request."""
+    return query_profiler.report()
+
+@app.delete("/api/v1/system/queries", dependencies=[Depends(require_debug_token)])
+async def clear_query_profile():
+    query_profiler.clear()
+    return query_profiler.report()
+
+if get_settings().QUERY_PROFILER_ENABLED:
+    on_engine_created(query_profiler.instrument)
+
+if get_settings().METRICS_ENABLED:
+    on_engine_created(instrument_engine)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
+    allow_origins=get_settings().CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+if get_settings().QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+# Added last so it is outermost and times the whole stack, CORS included.
+if get_settings().METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-# Include API routers
-app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
-app.include_router(trades.router, prefix="/api/v1/trades", tags=["trades"])
-app.include_router(stats.router, prefix="/api/v1/stats", tags=["stats"])
+# Include API routers (each carries its prefix, so route.path is the full template)
+app.include_router(auth.router)
+app.include_router(trades.router)
+app.include_router(stats.router)
+app.include_router(stream.router)
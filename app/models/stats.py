@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+class StatsRollup(SQLModel, table=True):
+    """Aggregates over one user's closed trades."""
+    user_id: int = Field(primary_key=True)
+    total_trades: int = 0
+    winning_trades: int = 0
+    losing_trades: int = 0
+    sum_risk_reward: float = 0.0
+    total_profit: float = 0.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DataVersion(SQLModel, table=True):
+    """Per-user counter bumped in the same transaction as every trade write.
+
+    Read endpoints derive their ETag from it, so a client can revalidate a cached
+    response without the trade table being queried.
+    """
+    user_id: int = Field(primary_key=True)
+    version: int = 0
@@ -1,4 +1,4 @@
-from sqlmodel import SQLModel, Field, Enum
+from sqlmodel import SQLModel, Field, Enum, Index
 from datetime import datetime
 from typing import Optional
 import enum
@@ -12,7 +12,20 @@ class TradeStatus(str, enum.Enum):
     CLOSED = "CLOSED"
 
 class Trade(SQLModel, table=True):
+    # Every query is scoped to one user, so each index leads with user_id and a
+    # query's cost follows the size of that user's journal, not of the table.
+    __table_args__ = (
+        # get_trades: keyset order on (opened_at, id), optionally narrowed by pair or status
+        Index("ix_trade_user_opened_at_id", "user_id", "opened_at", "id"),
+        Index("ix_trade_user_pair_opened_at_id", "user_id", "pair", "opened_at", "id"),
+        Index("ix_trade_user_status_opened_at_id", "user_id", "status", "opened_at", "id"),
+        # Closed-trade analytics (rollup, equity curve, breakdown) read only these columns
+        Index("ix_trade_user_status_closed_at_cover", "user_id", "status", "closed_at", "id", "result_usd", "risk_reward", "pair", "direction"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    # NULL only for trades recorded before journals were per user; no account sees those.
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     pair: str
     direction: TradeDirection
     entry_price: float
@@ -3,3 +3,7 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+
+class StreamToken(BaseModel):
+    stream_token: str
+    expires_in: int
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timezone
 from app.models.trade import TradeDirection, TradeStatus
 
 class TradeBase(BaseModel):
@@ -16,6 +16,55 @@ class TradeBase(BaseModel):
 class TradeCreate(TradeBase):
     pass
 
+class TradeImport(TradeCreate):
+    """One row of a bulk import; rows with an exit price are imported as closed."""
+    exit_price: Optional[float] = Field(None, gt=0)
+    opened_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+
+    @validator("opened_at", "closed_at")
+    def naive_utc(cls, v):
+        # Trades are stored as naive UTC; an explicit offset is converted rather than dropped.
+        if v is not None and v.tzinfo is not None:
+            return v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+    @validator("closed_at")
+    def closed_after_opened(cls, v, values):
+        if v is None:
+            return v
+        if "exit_price" in values and values["exit_price"] is None:
+            raise ValueError("closed_at requires exit_price")
+        if values.get("opened_at") is not None and v < values["opened_at"]:
+            raise ValueError("closed_at is before opened_at")
+        return v
+
+class TradeImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class TradeImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TradeImportError]
+    errors_truncated: bool = False
+
+class TradeCloseItem(BaseModel):
+    id: int
+    exit_price: float = Field(..., gt=0)
+
+class TradeCloseResult(BaseModel):
+    id: int
+    exit_price: float
+    risk_reward: Optional[float]
+    result_pips: Optional[float]
+    result_usd: Optional[float]
+
+class TradeBatchCloseReport(BaseModel):
+    closed: List[TradeCloseResult]
+    # Requested ids that do not exist or were already closed
+    skipped: List[int] = []
+
 class TradeUpdate(BaseModel):
     entry_price: Optional[float] = Field(None, gt=0)
     exit_price: Optional[float] = Field(None, gt=0)
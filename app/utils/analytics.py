@@ -0,0 +1,94 @@
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+# Histogram edges for R-multiples; values outside are counted in the outermost bins.
+R_MULTIPLE_EDGES = np.arange(-3.0, 5.5, 0.5)
+
+def _ratio(numerator, denominator):
+    return float(numerator / denominator) if denominator else None
+
+def _runs(mask: np.ndarray):
+    """(start, stop) index arrays of the runs of True in a boolean array."""
+    if not len(mask):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    edges = np.flatnonzero(np.concatenate(([mask[0]], mask[1:] != mask[:-1], [mask[-1]])))
+    return edges[::2], edges[1::2]
+
+def _longest_run(mask: np.ndarray) -> int:
+    starts, stops = _runs(mask)
+    return int((stops - starts).max()) if len(starts) else 0
+
+def advanced_stats(closed_at: np.ndarray, pnl: np.ndarray, risk: np.ndarray) -> dict:
+    """Performance statistics of closed trades given as columns ordered by close time.
+
+    `closed_at` is datetime64, `pnl` the result in USD and `risk` the amount at risk
+    (|entry - stop_loss| * position_size, NaN when unknown). Every statistic is a
+    vectorized pass over the arrays.
+    """
+    n = len(pnl)
+    wins, losses = pnl > 0, pnl < 0
+    win_count, loss_count = int(np.count_nonzero(wins)), int(np.count_nonzero(losses))
+    gross_profit = float(np.maximum(pnl, 0.0).sum())
+    gross_loss = abs(float(np.minimum(pnl, 0.0).sum()))
+
+    # Daily P&L; Sharpe/Sortino are annualized over trading days with a zero target.
+    # closed_at is sorted, so each day is a contiguous slice.
+    days = closed_at.astype("datetime64[D]")
+    day_starts = np.flatnonzero(np.concatenate(([n > 0], days[1:] != days[:-1])))
+    daily = np.add.reduceat(pnl, day_starts) if n else np.zeros(0)
+    daily_std = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(daily, 0.0) ** 2)) if len(daily) else 0.0
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    # Drawdown of the trade-by-trade equity curve, measured from the opening balance.
+    equity = np.cumsum(pnl)
+    peak = np.maximum(np.maximum.accumulate(equity), 0.0)
+    drawdown = np.subtract(equity, peak, out=peak)
+    starts, stops = _runs(drawdown < 0)
+    duration_days, duration_trades = 0.0, 0
+    if len(starts):
+        began = closed_at[np.maximum(starts - 1, 0)]
+        ended = closed_at[np.minimum(stops, n - 1)]
+        duration_days = float(((ended - began) / np.timedelta64(1, "s")).max() / 86400)
+        duration_trades = int((stops - starts).max())
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_multiple = pnl / risk
+    r_multiple = r_multiple[np.isfinite(r_multiple) & (risk > 0)]
+    bins = len(R_MULTIPLE_EDGES) - 1
+    width = R_MULTIPLE_EDGES[1] - R_MULTIPLE_EDGES[0]
+    position = (r_multiple - R_MULTIPLE_EDGES[0]) / width
+    # Clipping before truncating makes astype() a floor for every kept value.
+    counts = np.bincount(np.clip(position, 0, bins - 0.5, out=position).astype(np.int64), minlength=bins)
+    median = None
+    if len(r_multiple):
+        # One partition in place of np.median; the lower middle of an even count is
+        # the largest value left of the pivot.
+        middle = len(r_multiple) // 2
+        picks = np.partition(r_multiple, middle)
+        median = float(picks[middle] if len(r_multiple) % 2 else (picks[:middle].max() + picks[middle]) / 2)
+
+    return {
+        "total_trades": n,
+        "expectancy": float(pnl.mean()) if n else 0.0,
+        "profit_factor": _ratio(gross_profit, gross_loss),
+        "gross_profit": gross_profit,
+        "gross_loss": gross_loss,
+        "avg_win": gross_profit / win_count if win_count else None,
+        "avg_loss": -gross_loss / loss_count if loss_count else None,
+        "trading_days": len(day_starts),
+        "sharpe_ratio": _ratio(daily.mean() * annualize, daily_std) if len(daily) else None,
+        "sortino_ratio": _ratio(daily.mean() * annualize, downside) if len(daily) else None,
+        "max_drawdown": float(drawdown.min()) if n else 0.0,
+        "max_drawdown_duration_days": duration_days,
+        "max_drawdown_duration_trades": duration_trades,
+        "longest_win_streak": _longest_run(wins),
+        "longest_loss_streak": _longest_run(losses),
+        "r_multiple": {
+            "count": len(r_multiple),
+            "mean": float(r_multiple.mean()) if len(r_multiple) else None,
+            "median": median,
+            "bin_edges": R_MULTIPLE_EDGES.tolist(),
+            "counts": counts.tolist(),
+        },
+    }
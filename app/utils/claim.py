@@ -0,0 +1,40 @@
+import argparse
+import sys
+from sqlmodel import Session, select, func, update
+from app.db.session import engine
+from app.crud.stats import rebuild_rollup, bump_data_version
+from app.models.trade import Trade
+from app.models.user import User
+from app.utils.snapshot import trade_snapshot
+
+def orphan_count(session: Session) -> int:
+    """Trades without an owner (recorded before trades were partitioned by user)."""
+    return session.exec(select(func.count()).select_from(Trade).where(Trade.user_id.is_(None))).one()
+
+def claim_orphans(session: Session, owner_id: int) -> int:
+    """Give every ownerless trade to `owner_id` and bring that user's rollup, version and snapshot up to date."""
+    claimed = session.exec(update(Trade).where(Trade.user_id.is_(None)).values(user_id=owner_id)).rowcount
+    if claimed:
+        bump_data_version(session, owner_id)
+        session.commit()
+        rebuild_rollup(session, owner_id)
+        trade_snapshot.invalidate(owner_id)
+    return claimed
+
+def main(argv=None) -> int:
+    """Assign trades recorded before the per-user migration to an account."""
+    parser = argparse.ArgumentParser(description="Assign ownerless trades to a user.")
+    parser.add_argument("--owner", type=int, help="user id to receive the trades (omit to only count them)")
+    args = parser.parse_args(argv)
+    with Session(engine) as session:
+        if args.owner is None:
+            print(f"{orphan_count(session)} trades have no owner; pass --owner USER_ID to claim them.")
+            return 0
+        if session.get(User, args.owner) is None:
+            print(f"No user with id {args.owner}.")
+            return 1
+        print(f"Assigned {claim_orphans(session, args.owner)} trades to user {args.owner}.")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import asyncio
+import itertools
+import threading
+from app.core.config import get_settings
+
+class StreamFull(Exception):
+    """Raised when the hub already has its maximum number of subscribers."""
+
+class Subscription:
+    """One client's bounded event queue, consumed on the event loop that created it."""
+
+    def __init__(self, hub, max_queue: int, user_id: int = None):
+        self.hub = hub
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflows = 0
+
+    def offer(self, event: dict):
+        """Queue `event`; a client that fell `max_queue` events behind gets a single resync instead."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflows += 1
+            self.hub._count("overflows")
+            event = {"id": event["id"], "type": "resync", "data": {"reason": "overflow"}}
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+class EventHub:
+    """In-process fan-out of change events to live stream subscribers.
+
+    Subscribers are grouped by user; an event published for a user reaches only
+    that user's streams, and one published without a user reaches every stream.
+
+    `publish` may be called from any thread. It never blocks on a slow client,
+    because each subscriber has a bounded queue and one that overflows has its
+    backlog replaced by a resync event telling it to refetch.
+    """
+
+    def __init__(self, max_queue: int, max_subscribers: int):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # user id -> set of Subscription
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._metrics = {"published": 0, "delivered": 0, "overflows": 0, "rejected": 0}
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._metrics[key] += amount
+
+    def _count_subscribers(self) -> int:
+        return sum(len(group) for group in self._subscribers.values())
+
+    def has_subscribers_for(self, user_id: int) -> bool:
+        return bool(self._subscribers.get(user_id))
+
+    def subscribe(self, user_id: int = None) -> Subscription:
+        with self._lock:
+            if self._count_subscribers() >= self.max_subscribers:
+                self._metrics["rejected"] += 1
+                raise StreamFull()
+            subscription = Subscription(self, self.max_queue, user_id)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            group = self._subscribers.get(subscription.user_id, set())
+            group.discard(subscription)
+            if not group:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def publish(self, type: str, data: dict, user_id: int = None):
+        with self._lock:
+            if user_id is None:
+                subscribers = [subscription for group in self._subscribers.values() for subscription in group]
+            else:
+                subscribers = list(self._subscribers.get(user_id, ()))
+            event = {"id": next(self._ids), "type": type, "data": data}
+            self._metrics["published"] += 1
+            self._metrics["delivered"] += len(subscribers)
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for subscription in subscribers:
+            if subscription.loop is current:
+                subscription.offer(event)
+            elif not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscribers": self._count_subscribers(), "users": len(self._subscribers), "max_subscribers": self.max_subscribers, "max_queue": self.max_queue, **self._metrics}
+
+event_hub = EventHub(get_settings().STREAM_QUEUE_SIZE, get_settings().STREAM_MAX_CLIENTS)
@@ -0,0 +1,28 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def format_csv(columns, rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_plain(v) for v in row] for row in rows)
+    return buffer.getvalue()
+
+def format_ndjson(columns, rows) -> str:
+    return "".join(json.dumps(dict(zip(columns, map(_plain, row)))) + "\n" for row in rows)
@@ -0,0 +1,212 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import SQLModel, Session, insert, select
+from app.db.session import engine
+from app.models.user import User
+from app.models.trade import Trade
+from app.crud.stats import OVERALL_ROLLUP, rebuild_rollup, bump_data_version
+from app.utils.security import get_password_hash
+from app.utils.snapshot import trade_snapshot
+from app.utils.events import event_hub
+from app.utils.pricing import open_book
+from app.utils.trading import compute_results_batch
+
+# Typical price level of each pair the generator knows; other pairs trade around 1.0.
+PAIR_PRICES = {
+    "EUR/USD": 1.09, "GBP/USD": 1.27, "USD/JPY": 148.0, "AUD/USD": 0.66, "USD/CAD": 1.36,
+    "USD/CHF": 0.89, "NZD/USD": 0.61, "EUR/JPY": 161.0, "XAU/USD": 1950.0, "BTC/USD": 30000.0,
+}
+DEFAULT_PAIRS = list(PAIR_PRICES)
+DEFAULT_EMAIL_PATTERN = "trader{n}@example.com"
+
+def ensure_users(n_users: int, email_pattern: str = DEFAULT_EMAIL_PATTERN) -> list:
+    """Ids of the users `email_pattern.format(n=1..n_users)`, creating the missing ones in one bulk insert."""
+    SQLModel.metadata.create_all(engine)
+    emails = [email_pattern.format(n=n) for n in range(1, n_users + 1)]
+    with Session(engine) as session:
+        existing = dict(session.exec(select(User.email, User.id)).all())
+    missing = [email for email in emails if email not in existing]
+    if missing:
+        hashed = get_password_hash("password123")
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(insert(User), [
+                {"name": email.split("@")[0], "email": email, "hashed_password": hashed, "created_at": now} for email in missing
+            ])
+        with Session(engine) as session:
+            existing = dict(session.exec(select(User.email, User.id)).all())
+    return [existing[email] for email in emails]
+
+WEEK_START = np.datetime64("1970-01-05T00:00:00", "s")  # a Monday
+TRADING_WEEK = 5 * 86400
+
+def weekday_seconds(moment: datetime) -> int:
+    """Seconds of Monday-to-Friday time from WEEK_START to `moment`."""
+    weeks, rest = divmod(int((np.datetime64(moment, "s") - WEEK_START).astype(np.int64)), 7 * 86400)
+    return weeks * TRADING_WEEK + min(rest, TRADING_WEEK)
+
+def from_weekday_seconds(seconds):
+    weeks, rest = np.divmod(seconds.astype(np.int64), TRADING_WEEK)
+    return WEEK_START + (weeks * 7 * 86400 + rest).astype("timedelta64[s]")
+
+def generate_columns(rng, n: int, user_ids, pairs, start: datetime, end: datetime, win_rate: float, open_ratio: float, user_skew: float) -> dict:
+    """`n` trades opened between `start` and `end`, in opening order, as NumPy columns.
+
+    Stops sit a lognormal distance (median 0.5%) from entry and targets a
+    lognormal multiple of it (median 2R); positions are sized to risk about
+    $100. Winners exit between halfway to and at the target, losers between
+    halfway to and at the stop. Nothing opens on weekends, holds have a
+    median of six hours, and trades still open all opened in the last trading week.
+    """
+    users = np.asarray(user_ids)
+    if user_skew > 0:
+        weights = 1.0 / np.arange(1, len(users) + 1) ** user_skew
+        owner = rng.choice(users, size=n, p=weights / weights.sum())
+    else:
+        owner = users[rng.permutation(n) % len(users)]
+    pair = rng.choice(np.asarray(pairs), size=n)
+    is_buy = rng.random(n) < 0.5
+    sign = np.where(is_buy, 1.0, -1.0)
+
+    # Opening times are uniform over weekday time between start and end.
+    first, last = weekday_seconds(start), weekday_seconds(end)
+    opened = rng.uniform(first, last, n)
+    is_open = rng.random(n) < open_ratio
+    recent = rng.uniform(max(first, last - TRADING_WEEK), last, n)
+    opened = from_weekday_seconds(np.where(is_open, recent, opened))
+    order = np.argsort(opened, kind="stable")
+    opened, is_open = opened[order], is_open[order]
+
+    base = np.array([PAIR_PRICES.get(name, 1.0) for name in pair])
+    entry = base * np.exp(rng.normal(0, 0.05, n))
+    risk = entry * rng.lognormal(np.log(0.005), 0.5, n)
+    reward = risk * rng.lognormal(np.log(2.0), 0.4, n)
+    stop = entry - sign * risk
+    target = entry + sign * reward
+    size = np.round(rng.lognormal(np.log(100.0), 0.5, n) / risk, 4)
+
+    wins = rng.random(n) < win_rate
+    move = np.where(wins, reward, -risk) * rng.uniform(0.5, 1.0, n)
+    exit_price = np.where(is_open, np.nan, entry + sign * move)
+    hold = rng.lognormal(np.log(6 * 3600), 1.0, n).astype("timedelta64[s]")
+    closed = np.where(is_open, np.datetime64("NaT"), opened + hold)
+
+    direction = np.where(is_buy, "BUY", "SELL")
+    risk_reward, result_pips, result_usd = compute_results_batch(direction, entry, exit_price, stop, target, size)
+    return {
+        "user_id": owner, "pair": pair, "direction": direction,
+        "entry_price": entry, "stop_loss": stop, "take_profit": target, "position_size": size,
+        "exit_price": exit_price, "risk_reward": risk_reward, "result_pips": result_pips, "result_usd": result_usd,
+        "status": np.where(is_open, "OPEN", "CLOSED"), "opened_at": opened, "closed_at": closed,
+    }
+
+def insert_columns(conn, columns: dict):
+    """Insert `generate_columns` output with one driver-level executemany, NaN/NaT as NULL.
+
+    Values go through each column type's bind processor a whole column at a
+    time, which is about twice as fast as an ORM or Core insert of row dicts.
+    """
+    table = Trade.__table__
+    columns = dict(columns, created_at=columns["opened_at"], updated_at=columns["opened_at"])
+    statement = insert(table).compile(dialect=conn.dialect, column_keys=list(columns))
+    processed = {}
+    for name, column in columns.items():
+        if id(column) in processed:
+            continue
+        if column.dtype.kind == "M":
+            values = column.astype("datetime64[us]").astype(object).tolist()  # NaT becomes None
+        elif column.dtype.kind == "f":
+            values = [None if value != value else value for value in column.tolist()]
+        else:
+            values = column.tolist()
+        process = table.c[name].type.dialect_impl(conn.dialect).bind_processor(conn.dialect)
+        processed[id(column)] = [process(value) for value in values] if process else values
+    names = statement.positiontup or list(columns)
+    rows = zip(*(processed[id(columns[name])] for name in names))
+    params = list(rows) if statement.positiontup else [dict(zip(names, row)) for row in rows]
+    conn.exec_driver_sql(statement.string, params)
+
+def generate_trades(
+    n_trades: int,
+    user_ids,
+    pairs=DEFAULT_PAIRS,
+    start: datetime = None,
+    days: int = 365,
+    win_rate: float = 0.45,
+    open_ratio: float = 0.02,
+    user_skew: float = 0.0,
+    seed: int = 0,
+    batch_size: int = 50_000,
+) -> int:
+    """Bulk-insert `n_trades` synthetic trades for `user_ids`; returns the number inserted.
+
+    The span is cut into one time slice per batch so every batch is generated,
+    sorted and inserted on its own: memory stays at one batch and ids follow
+    opening time. Rollups, data versions and snapshots are not touched; call
+    `refresh_users` afterwards.
+    """
+    start = start or datetime.utcnow().replace(microsecond=0) - timedelta(days=days)
+    end = start + timedelta(days=days)
+    rng = np.random.default_rng(seed)
+    n_batches = max(1, -(-n_trades // batch_size))
+    step = (end - start) / n_batches
+    inserted = 0
+    with engine.begin() as conn:
+        for batch in range(n_batches):
+            n = min(batch_size, n_trades - inserted)
+            columns = generate_columns(
+                rng, n, user_ids, pairs, start + step * batch, start + step * (batch + 1),
+                # Open trades are recent, so all of them land in the last slice.
+                win_rate, min(1.0, open_ratio * n_trades / n) if batch == n_batches - 1 else 0.0, user_skew,
+            )
+            insert_columns(conn, columns)
+            inserted += n
+    return inserted
+
+def refresh_users(user_ids):
+    """Bring the rollups, data versions, snapshots and open positions of `user_ids` up to date after a bulk load."""
+    with Session(engine) as session:
+        for user_id in user_ids:
+            bump_data_version(session, user_id)
+        session.commit()
+        for user_id in user_ids:
+            rebuild_rollup(session, user_id)
+            trade_snapshot.invalidate(user_id)
+            open_book.reset(user_id)
+            event_hub.publish("resync", {"reason": "seed"}, user_id)
+        # Bulk inserts bypass the rollup deltas, so the journal-wide row is recomputed too.
+        rebuild_rollup(session, OVERALL_ROLLUP)
+
+def main(argv=None) -> int:
+    """Generate a synthetic journal of any size for load testing."""
+    parser = argparse.ArgumentParser(description="Bulk-generate realistic synthetic trades.")
+    parser.add_argument("--trades", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1, help="owners of the trades, created when missing")
+    parser.add_argument("--email-pattern", default=DEFAULT_EMAIL_PATTERN, help="email of user n (default: %(default)s)")
+    parser.add_argument("--user-skew", type=float, default=0.0, help="Zipf exponent of trades per user; 0 spreads them evenly")
+    parser.add_argument("--pairs", default=",".join(DEFAULT_PAIRS), help="comma-separated pairs")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="first opening date (default: --days ago)")
+    parser.add_argument("--days", type=int, default=365, help="span of opening dates")
+    parser.add_argument("--win-rate", type=float, default=0.45)
+    parser.add_argument("--open-ratio", type=float, default=0.02, help="share of trades left open")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    user_ids = ensure_users(args.users, args.email_pattern)
+    pairs = [pair.strip() for pair in args.pairs.split(",") if pair.strip()]
+    inserted = generate_trades(
+        args.trades, user_ids, pairs, args.start, args.days, args.win_rate, args.open_ratio,
+        args.user_skew, args.seed, args.batch_size,
+    )
+    refresh_users(user_ids)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {inserted} trades for {len(user_ids)} users in {elapsed:.1f}s ({inserted / elapsed:,.0f} trades/s).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import codecs
+import csv
+import json
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+async def iter_lines(chunks):
+    """Decode an async stream of byte chunks into text lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def iter_csv_records(lines):
+    """Yield ``(row_number, dict)`` for each CSV data row; the first row is the header.
+
+    Physical lines are joined until their quotes balance, so quoted fields may
+    contain newlines. Empty cells become None.
+    """
+    header, record, row_number = None, "", 0
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record]), []), ""
+        if not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        yield row_number, {name: (value.strip() or None) for name, value in zip(header, values)}
+    if record:
+        row_number += 1
+        yield row_number, ValueError("Unterminated quoted field")
+
+async def iter_ndjson_records(lines):
+    """Yield ``(row_number, dict)`` for each non-blank NDJSON line, or an exception for bad lines."""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row_number, exc
+            continue
+        yield row_number, record if isinstance(record, dict) else ValueError("Expected a JSON object")
@@ -0,0 +1,152 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Upper bounds of the histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Histogram:
+    """Prometheus histogram with one series per label tuple.
+
+    Observations only bump one bucket; buckets are made cumulative when rendered.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = []
+        for values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), values + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        return [f"{self.name}{_labels(self.labels, values)} {value}" for values, value in self._values.items()]
+
+class Counter(Gauge):
+    kind = "counter"
+
+class MetricsRegistry:
+    """The HTTP and database metrics, rendered in the Prometheus text format.
+
+    Updates run on the event loop thread (the middleware, and the cursor events
+    of the async engines, which fire in the request's greenlet) and take no
+    lock. Sync-engine queries from worker threads may rarely lose an increment,
+    which is cheaper than locking every observation.
+    """
+
+    def __init__(self):
+        labels = ("method", "route", "status")
+        self.request_seconds = Histogram("http_request_duration_seconds", "Request latency, to the end of the response body.", labels)
+        self.response_bytes = Histogram("http_response_size_bytes", "Response body size.", labels, SIZE_BUCKETS)
+        self.db_queries = Histogram("http_request_db_queries", "Database queries run by one request.", labels, QUERY_BUCKETS)
+        self.db_seconds = Histogram("http_request_db_seconds", "Time one request spent in database queries.", labels)
+        self.in_flight = Gauge("http_requests_in_flight", "Requests being served, including open streams.", ("method",))
+        self.db_queries_total = Counter("db_queries_total", "Database queries run outside any request.")
+        self.metrics = [self.request_seconds, self.response_bytes, self.db_queries, self.db_seconds, self.in_flight, self.db_queries_total]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# [queries, seconds] of the request being served, shared with the cursor events.
+_db_cost: ContextVar = ContextVar("db_cost", default=None)
+
+def instrument_engine(sync_engine):
+    """Count the queries and time spent on `sync_engine` against the current request."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        cost = _db_cost.get()
+        if cost is None:
+            metrics.db_queries_total.inc()
+            return
+        cost[0] += 1
+        cost[1] += time.perf_counter() - context._metrics_started
+
+def route_template(scope) -> str:
+    """The matched route's path template, so `/trades/1` and `/trades/2` share a series."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, in-flight requests, response size and DB cost per route."""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        registry = self.registry
+        method = scope["method"]
+        state = [500, 0]  # status, body bytes
+        cost = [0, 0.0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                state[1] += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight.inc(1, method)
+        token = _db_cost.set(cost)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _db_cost.reset(token)
+            registry.in_flight.inc(-1, method)
+            labels = (method, route_template(scope), state[0])
+            registry.request_seconds.observe(elapsed, *labels)
+            registry.response_bytes.observe(state[1], *labels)
+            registry.db_queries.observe(cost[0], *labels)
+            registry.db_seconds.observe(cost[1], *labels)
@@ -0,0 +1,100 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.core.config import get_settings
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Trade counts at which the percentile bands are sampled (plus the start and the end).
+BAND_POINTS = 50
+
+def _simulate_chunk(samples, paths, horizon, seed, starting_balance, ruin_level, checkpoints):
+    """Simulate `paths` equity paths as one paths x horizon matrix.
+
+    Returns each path's final balance, max drawdown (<= 0), whether it touched
+    `ruin_level`, and its balance at `checkpoints`.
+    """
+    rng = np.random.default_rng(seed)
+    equity = samples[rng.integers(0, len(samples), size=(paths, horizon), dtype=np.int32)]
+    np.cumsum(equity, axis=1, out=equity)
+    equity += starting_balance
+    at_checkpoints = np.column_stack((np.full(paths, starting_balance), equity[:, checkpoints - 1]))
+    ruined = equity.min(axis=1) <= ruin_level
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), starting_balance)
+    drawdown = np.subtract(equity, peak, out=peak).min(axis=1)
+    return equity[:, -1].copy(), drawdown, ruined, at_checkpoints
+
+def simulate(samples, paths: int, horizon: int, seed: int, starting_balance: float = 0.0,
+             ruin_fraction: float = 0.5, confidence: float = 0.95, chunk_elements: int = 2_000_000,
+             executor=None) -> dict:
+    """Monte Carlo equity paths drawn with replacement from historical trade outcomes.
+
+    Paths are simulated in chunks of at most `chunk_elements` matrix cells so memory
+    stays bounded. Every chunk gets its own stream spawned from `seed`, so a given
+    seed gives the same result whether chunks run inline or on `executor`.
+    A path is ruined when its balance falls to ``starting_balance * (1 - ruin_fraction)``.
+    """
+    samples = np.asarray(samples, dtype=float)
+    chunk_paths = max(1, chunk_elements // horizon)
+    sizes = [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    checkpoints = np.unique(np.linspace(1, horizon, min(horizon, BAND_POINTS)).astype(int))
+    ruin_level = starting_balance * (1 - ruin_fraction)
+    args = [(samples, size, horizon, chunk_seed, starting_balance, ruin_level, checkpoints) for size, chunk_seed in zip(sizes, seeds)]
+    if executor is None:
+        chunks = [_simulate_chunk(*chunk_args) for chunk_args in args]
+    else:
+        chunks = list(executor.map(_simulate_chunk, *zip(*args)))
+    final, drawdown, ruined, bands = (np.concatenate(parts) for parts in zip(*chunks))
+
+    band_values = np.percentile(bands, PERCENTILES, axis=0)
+    return {
+        "paths": paths,
+        "horizon": horizon,
+        "seed": seed,
+        "starting_balance": starting_balance,
+        "final_balance": {
+            "mean": float(final.mean()),
+            **{f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(final, PERCENTILES))},
+        },
+        "bands": [
+            {"trade": int(trade), **{f"p{p}": float(v) for p, v in zip(PERCENTILES, band_values[:, i])}}
+            for i, trade in enumerate(np.concatenate(([0], checkpoints)))
+        ],
+        "risk_of_ruin": float(ruined.mean()),
+        "ruin_level": ruin_level,
+        "drawdown_at_confidence": {
+            "confidence": confidence,
+            # `confidence` of the paths never draw down further than this.
+            "max_drawdown": float(np.quantile(drawdown, 1 - confidence)),
+        },
+        "median_max_drawdown": float(np.median(drawdown)),
+    }
+
+class SimulationPool:
+    """Lazily started process pool for large simulations.
+
+    Workers are spawned rather than forked so they never inherit the server's
+    threads or open database connections.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        if self.workers <= 1:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+simulation_pool = SimulationPool(get_settings().MONTE_CARLO_WORKERS)
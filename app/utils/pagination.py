@@ -0,0 +1,17 @@
+import base64
+import json
+from datetime import datetime
+
+def encode_cursor(opened_at: datetime, trade_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given (opened_at, id) row."""
+    raw = json.dumps([opened_at.isoformat(), trade_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        opened_at, trade_id = json.loads(raw)
+        return datetime.fromisoformat(opened_at), int(trade_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,107 @@
+"""Price feeds for the mark-to-market book.
+
+A feed is any object with an async ``ticks()`` iterator of `Tick`. Ticks are
+text lines, either ``PAIR,PRICE`` or an NDJSON object ``{"pair": ..., "price": ...}``.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Tick:
+    pair: str
+    price: float
+
+def parse_tick(line: str):
+    """The Tick on a feed line, or None for blank, comment or malformed lines."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    try:
+        if line.startswith("{"):
+            record = json.loads(line)
+            pair, price = record["pair"], record["price"]
+        else:
+            pair, price = line.split(",")[:2]
+        price = float(price)
+    except (ValueError, KeyError, TypeError):
+        return None
+    return Tick(pair.strip(), price) if price > 0 else None
+
+class PriceFeed(ABC):
+    """Source of ticks; subclasses implement `ticks`."""
+
+    @abstractmethod
+    def ticks(self):
+        """Async iterator of `Tick`."""
+
+class ReplayFeed(PriceFeed):
+    """Replays ticks from a local file, at `rate` ticks per second (0 = as fast as possible)."""
+
+    def __init__(self, path: str, rate: float = 0, loop: bool = False):
+        self.path = path
+        self.rate = rate
+        self.loop = loop
+
+    async def ticks(self):
+        interval = 1 / self.rate if self.rate else 0
+        while True:
+            with open(self.path) as fh:
+                for n, line in enumerate(fh):
+                    tick = parse_tick(line)
+                    if tick:
+                        yield tick
+                    if interval:
+                        await asyncio.sleep(interval)
+                    elif n % 1000 == 0:
+                        # Let the rest of the app run during a full-speed replay.
+                        await asyncio.sleep(0)
+            if not self.loop:
+                return
+
+class SocketFeed(PriceFeed):
+    """Reads tick lines from a TCP socket and reconnects after `retry` seconds when it drops."""
+
+    def __init__(self, host: str, port: int, retry: float = 5.0):
+        self.host = host
+        self.port = port
+        self.retry = retry
+
+    async def ticks(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as exc:
+                logger.warning("Price feed %s:%s unavailable: %s", self.host, self.port, exc)
+                await asyncio.sleep(self.retry)
+                continue
+            try:
+                while line := await reader.readline():
+                    tick = parse_tick(line.decode(errors="replace"))
+                    if tick:
+                        yield tick
+            finally:
+                writer.close()
+            await asyncio.sleep(self.retry)
+
+def feed_from_url(url: str):
+    """Build a feed from PRICE_FEED_URL: ``replay:///path?rate=100&loop=1`` or ``tcp://host:port``."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    if parsed.scheme == "replay":
+        return ReplayFeed(parsed.path, float(query.get("rate", 0)), query.get("loop") in ("1", "true"))
+    if parsed.scheme == "tcp":
+        return SocketFeed(parsed.hostname, parsed.port, float(query.get("retry", 5)))
+    raise ValueError(f"Unsupported price feed {url!r}")
+
+async def run_feed(feed: PriceFeed, book):
+    """Apply every tick from `feed` to `book` until the feed ends or the task is cancelled."""
+    async for tick in feed.ticks():
+        book.on_tick(tick.pair, tick.price)
@@ -0,0 +1,157 @@
+import threading
+import time
+from typing import Optional
+from app.utils.trading import PIP_SIZE
+
+class OpenPositionBook:
+    """Last price per pair and unrealized P&L of each user's open trades, marked to market.
+
+    Prices are shared by every user. For each user and pair the book keeps running
+    sums over the open trades (sign = +1 for BUY, -1 for SELL)::
+
+        usd  = price * sum(sign * size) - sum(sign * size * entry)
+        pips = (price * sum(sign) - sum(sign * entry)) / PIP_SIZE
+
+    A tick only stores a price, opening or closing a trade adjusts one pair's
+    sums, and a user's totals are a sum over their pairs, never over trades.
+    Users are loaded on first use and remember the data version they were loaded
+    at. Each write passes the version it committed, which the book takes only
+    when it directly follows the stored one; readers reload a user whose version
+    has moved otherwise, so writes made by another worker, or committed while a
+    load was in flight, are picked up. Pairs are matched case-insensitively.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self._prices = {}  # pair -> (price, received_at)
+        self._pair_ticks = {}  # pair -> ticks received for it
+        self._trades = {}  # user id -> {trade id -> (pair, sign, entry, size)}
+        self._sums = {}  # user id -> {pair -> [open_trades, sum(sign), sum(sign*entry), sum(sign*size), sum(sign*size*entry)]}
+        self._versions = {}  # user id -> data version the open trades were loaded at
+
+    def marks(self, user_id) -> Optional[str]:
+        """Tick counts of the pairs the user holds open, e.g. ``"EUR/USD=3,GBP/USD=0"``.
+
+        Changes whenever a tick may have moved this user's marks and never for
+        ticks on other pairs; empty with no open trades, None if the user is not loaded.
+        """
+        with self._lock:
+            if user_id not in self._trades:
+                return None
+            return ",".join(f"{pair}={self._pair_ticks.get(pair, 0)}" for pair in sorted(self._sums[user_id]))
+
+    @property
+    def users(self) -> int:
+        return len(self._trades)
+
+    def _add(self, user_id, trade_id, pair, direction, entry, size):
+        pair, sign = pair.upper(), 1.0 if direction == "BUY" else -1.0
+        sums = self._sums[user_id].setdefault(pair, [0, 0.0, 0.0, 0.0, 0.0])
+        for i, value in enumerate((1, sign, sign * entry, sign * size, sign * size * entry)):
+            sums[i] += value
+        self._trades[user_id][trade_id] = (pair, sign, entry, size)
+
+    def _remove(self, user_id, trade_id):
+        position = self._trades[user_id].pop(trade_id, None)
+        if position is None:
+            return
+        pair, sign, entry, size = position
+        sums = self._sums[user_id][pair]
+        for i, value in enumerate((1, sign, sign * entry, sign * size, sign * size * entry)):
+            sums[i] -= value
+        if not sums[0]:
+            del self._sums[user_id][pair]
+
+    def is_current(self, user_id, version) -> bool:
+        """Whether the user is loaded at data version `version`."""
+        return user_id in self._trades and self._versions.get(user_id) == version
+
+    def load(self, user_id, rows, version=None):
+        """Replace the user's open trades with ``(id, pair, direction, entry_price, position_size)`` rows.
+
+        `version` is the user's data version read before the rows were selected.
+        """
+        with self._lock:
+            self._trades[user_id], self._sums[user_id], self._versions[user_id] = {}, {}, version
+            for trade_id, pair, direction, entry, size in rows:
+                self._add(user_id, trade_id, pair, getattr(direction, "value", direction), entry, size)
+
+    def reset(self, user_id=None):
+        """Forget the user's (default: every user's) open trades; they are loaded again on next use."""
+        with self._lock:
+            if user_id is None:
+                self._trades, self._sums, self._versions = {}, {}, {}
+            else:
+                self._trades.pop(user_id, None)
+                self._sums.pop(user_id, None)
+                self._versions.pop(user_id, None)
+
+    def _advance(self, user_id, version):
+        # A skipped version is a write this book never saw; leave the user stale so the next read reloads.
+        if version is not None and self._versions.get(user_id) == version - 1:
+            self._versions[user_id] = version
+
+    def advance(self, user_id, version):
+        """Record a write at data `version` that left the user's open trades unchanged."""
+        with self._lock:
+            if user_id in self._trades:
+                self._advance(user_id, version)
+
+    def open_trade(self, user_id, trade_id, pair, direction, entry, size, version=None):
+        """Add or replace an open trade written at data `version`."""
+        with self._lock:
+            if user_id in self._trades:
+                self._remove(user_id, trade_id)
+                self._add(user_id, trade_id, pair, getattr(direction, "value", direction), entry, size)
+                self._advance(user_id, version)
+
+    def close_trades(self, user_id, trade_ids, version=None):
+        """Drop trades closed or deleted at data `version`."""
+        with self._lock:
+            if user_id in self._trades:
+                for trade_id in trade_ids:
+                    self._remove(user_id, trade_id)
+                self._advance(user_id, version)
+
+    def on_tick(self, pair: str, price: float):
+        with self._lock:
+            pair = pair.upper()
+            self._prices[pair] = (price, time.time())
+            self._pair_ticks[pair] = self._pair_ticks.get(pair, 0) + 1
+            self.ticks += 1
+
+    def snapshot(self, user_id, include_trades: bool = False) -> dict:
+        with self._lock:
+            trades = self._trades.get(user_id, {})
+            pairs, total_usd, total_pips, priced, ticks = [], 0.0, 0.0, 0, 0
+            for pair, (count, s, se, ss, sse) in sorted(self._sums.get(user_id, {}).items()):
+                ticks += self._pair_ticks.get(pair, 0)
+                price, received_at = self._prices.get(pair, (None, None))
+                usd = pips = None
+                if price is not None:
+                    usd, pips = price * ss - sse, (price * s - se) / PIP_SIZE
+                    total_usd, total_pips, priced = total_usd + usd, total_pips + pips, priced + count
+                pairs.append({"pair": pair, "price": price, "received_at": received_at, "open_trades": count, "unrealized_usd": usd, "unrealized_pips": pips})
+            result = {
+                "open_trades": len(trades),
+                "priced_trades": priced,
+                "unrealized_usd": total_usd,
+                "unrealized_pips": total_pips,
+                # Ticks on the user's pairs only, so other users' pairs never change this response.
+                "ticks": ticks,
+                "pairs": pairs,
+            }
+            if include_trades:
+                result["trades"] = []
+                for trade_id, (pair, sign, entry, size) in trades.items():
+                    price = self._prices.get(pair, (None,))[0]
+                    move = None if price is None else (price - entry) * sign
+                    result["trades"].append({
+                        "id": trade_id, "pair": pair, "price": price,
+                        "unrealized_usd": None if move is None else move * size,
+                        "unrealized_pips": None if move is None else move / PIP_SIZE,
+                    })
+        return result
+
+open_book = OpenPositionBook()
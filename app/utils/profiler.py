@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from datetime import datetime
+from sqlalchemy import event
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CRUD_DIR = os.path.join("app", "crud") + os.sep
+# Expanded IN lists and literals vary between otherwise identical statements.
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+@lru_cache(maxsize=1024)
+def normalize(statement: str) -> str:
+    """`statement` with placeholder lists and numbers collapsed, so repeats of one query compare equal."""
+    return _NUMBER.sub("N", _PLACEHOLDER_LIST.sub("(?)", " ".join(statement.split())))
+
+def crud_caller() -> str:
+    """``module.function:line`` of the innermost app/crud frame on the stack (aio wrappers skipped)."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if CRUD_DIR in filename and not filename.endswith("aio.py"):
+            module = os.path.splitext(filename[filename.index(CRUD_DIR):])[0].replace(os.sep, ".")
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+def _short(parameters, limit: int = 500) -> str:
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+# Statement counts of the request being served; None outside requests.
+_trace: ContextVar = ContextVar("query_trace", default=None)
+
+class QueryProfiler:
+    """Slow-statement log and repeated-statement (N+1) detector over SQLAlchemy cursor events.
+
+    A statement slower than `slow_ms` is logged with its parameters, the crud
+    function that issued it and its query plan. Within one request, a
+    statement (after `normalize`) issued `repeat_threshold` times or more is
+    reported once the request ends. Both keep their latest `log_size` entries.
+    """
+
+    def __init__(self, slow_ms: float, repeat_threshold: int, log_size: int):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.slow_queries = deque(maxlen=log_size)
+        self.repeated_statements = deque(maxlen=log_size)
+
+    def instrument(self, sync_engine):
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._profiler_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed_ms = (time.perf_counter() - context._profiler_started) * 1000
+            trace = _trace.get()
+            if trace is not None:
+                key = normalize(statement)
+                count = trace["counts"][key] = trace["counts"].get(key, 0) + 1
+                if count == self.repeat_threshold:
+                    trace["callers"][key] = crud_caller()
+            if elapsed_ms >= self.slow_ms:
+                self._record_slow(conn, statement, parameters, executemany, elapsed_ms, trace)
+
+    def _record_slow(self, conn, statement, parameters, executemany, elapsed_ms, trace):
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "duration_ms": round(elapsed_ms, 2),
+            "statement": statement,
+            "parameters": _short(parameters),
+            "caller": crud_caller(),
+            "request": trace["request"] if trace else None,
+            "plan": self.explain(conn, statement, parameters[0] if executemany and parameters else parameters),
+        }
+        self.slow_queries.append(entry)
+        logger.warning("Slow query %.1f ms in %s: %s params=%s plan=%s", elapsed_ms, entry["caller"], statement, entry["parameters"], entry["plan"])
+
+    @staticmethod
+    def explain(conn, statement: str, parameters) -> list:
+        """The statement's query plan, read on a raw DBAPI cursor so no SQLAlchemy events fire."""
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters or ())
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as exc:
+            return [f"unavailable: {exc}"]
+        # SQLite rows are (id, parent, notused, detail); other databases return one text column.
+        return [row[-1] for row in rows]
+
+    @contextmanager
+    def request(self, description: str):
+        """Track the statements run inside the block (one HTTP request) and report repeated ones at exit."""
+        trace = {"request": description, "counts": {}, "callers": {}}
+        token = _trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _trace.reset(token)
+            for key, caller in trace["callers"].items():
+                entry = {
+                    "at": datetime.utcnow().isoformat(),
+                    "request": description,
+                    "count": trace["counts"][key],
+                    "statement": key,
+                    "caller": caller,
+                }
+                self.repeated_statements.append(entry)
+                logger.warning("Statement repeated %d times in %s (from %s): %s", entry["count"], description, caller, key)
+
+    def report(self) -> dict:
+        return {
+            "slow_query_ms": self.slow_ms,
+            "repeat_threshold": self.repeat_threshold,
+            "slow_queries": list(self.slow_queries),
+            "repeated_statements": list(self.repeated_statements),
+        }
+
+    def clear(self):
+        self.slow_queries.clear()
+        self.repeated_statements.clear()
+
+query_profiler = QueryProfiler(get_settings().SLOW_QUERY_MS, get_settings().REPEATED_QUERY_THRESHOLD, get_settings().QUERY_PROFILER_LOG_SIZE)
+
+class QueryProfilerMiddleware:
+    """Pure ASGI middleware running each HTTP request inside `QueryProfiler.request`."""
+
+    def __init__(self, app, profiler: QueryProfiler = query_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with self.profiler.request(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+@contextmanager
+def capture_queries(engines):
+    """Collect every statement run on `engines` (sync engines) inside the block into the yielded list."""
+    statements = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,43 @@
+import argparse
+import sys
+from sqlmodel import Session, select
+from app.db.session import engine
+from app.crud.stats import OVERALL_ROLLUP, rebuild_rollup, check_rollup
+from app.models.stats import StatsRollup
+from app.models.trade import Trade
+
+def rollup_user_ids(session: Session) -> list:
+    """OVERALL_ROLLUP (the journal-wide row) and the users that own trades or have a stored rollup."""
+    owners = session.exec(select(Trade.user_id).where(Trade.user_id.is_not(None)).distinct()).all()
+    stored = session.exec(select(StatsRollup.user_id)).all()
+    return sorted(set(owners) | set(stored) | {OVERALL_ROLLUP})
+
+def label(user_id: int) -> str:
+    return "overall" if user_id == OVERALL_ROLLUP else f"user {user_id}"
+
+def main(argv=None) -> int:
+    """Rebuild the stats rollups from the trade table, or verify them against a full recompute."""
+    parser = argparse.ArgumentParser(description="Maintain the per-user and journal-wide stats rollup table.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", type=int, action="append", help=f"user id, {OVERALL_ROLLUP} for the journal-wide row (repeatable; default: all)")
+    args = parser.parse_args(argv)
+    with Session(engine) as session:
+        user_ids = args.user or rollup_user_ids(session)
+        if args.command == "rebuild":
+            users = [user_id for user_id in user_ids if user_id != OVERALL_ROLLUP]
+            total = sum(rebuild_rollup(session, user_id).total_trades for user_id in users)
+            print(f"Rebuilt stats rollups of {len(users)} users from {total} closed trades.")
+            if OVERALL_ROLLUP in user_ids:
+                print(f"Rebuilt the journal-wide rollup from {rebuild_rollup(session, OVERALL_ROLLUP).total_trades} closed trades.")
+            return 0
+        stale = 0
+        for user_id in user_ids:
+            mismatches = check_rollup(session, user_id)
+            for field, (stored, expected) in mismatches.items():
+                print(f"{label(user_id)} {field}: stored={stored} expected={expected}")
+            stale += bool(mismatches)
+        print("Stats rollups are consistent." if not stale else f"{stale} stats rollups are out of date; run `rebuild`.")
+        return 1 if stale else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
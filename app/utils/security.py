@@ -1,19 +1,99 @@
-from passlib.context import CryptContext
-from jose import jwt
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timedelta
-from app.core.config import settings
+from app.core.config import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib and python-jose are imported on first use, not at startup: most
+# requests never hash a password, and cached tokens skip JWT decoding.
+@lru_cache(maxsize=None)
+def pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=get_settings().BCRYPT_ROUNDS)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify a password; also return a fresh hash if the stored one uses outdated parameters."""
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already queued."""
+
+class PasswordWorkerPool:
+    """Bounded thread pool for bcrypt work, which would otherwise stall the event loop.
+
+    bcrypt releases the GIL, so threads give real parallelism. At most `workers`
+    hashes run at once; beyond `max_pending` queued or running jobs callers get
+    PasswordPoolBusy instead of waiting unboundedly.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._metrics = {"completed": 0, "rejected": 0, "queue_seconds_total": 0.0, "queue_seconds_max": 0.0, "run_seconds_total": 0.0}
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            with self._lock:
+                self._metrics["rejected"] += 1
+            raise PasswordPoolBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        enqueued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                waited, ran = started - enqueued, time.perf_counter() - started
+                with self._lock:
+                    self._metrics["completed"] += 1
+                    self._metrics["queue_seconds_total"] += waited
+                    self._metrics["queue_seconds_max"] = max(self._metrics["queue_seconds_max"], waited)
+                    self._metrics["run_seconds_total"] += ran
+
+        self.pending += 1
+        try:
+            return await asyncio.wrap_future(self._executor.submit(job))
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        completed = metrics["completed"]
+        metrics["queue_seconds_avg"] = metrics["queue_seconds_total"] / completed if completed else 0.0
+        return {"workers": self.workers, "max_pending": self.max_pending, "pending": self.pending, **metrics}
+
+password_pool = PasswordWorkerPool(get_settings().PASSWORD_HASH_WORKERS, get_settings().PASSWORD_HASH_MAX_PENDING)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    return await password_pool.run(verify_and_update_password, plain_password, hashed_password)
+
+STREAM_SCOPE = "stream"
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    from jose import jwt
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    encoded_jwt = jwt.encode(to_encode, get_settings().SECRET_KEY, algorithm="HS256")
     return encoded_jwt
+
+def create_stream_token(email: str) -> str:
+    """Short-lived token that only authenticates GET /api/v1/stream, safe to put in its URL."""
+    return create_access_token({"sub": email, "scope": STREAM_SCOPE}, timedelta(seconds=get_settings().STREAM_TOKEN_EXPIRE_SECONDS))
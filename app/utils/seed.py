@@ -1,9 +1,16 @@
+import sys
 from app.db.session import engine
-from sqlmodel import Session
+from sqlmodel import Session, select, delete
+from app.models.user import User
 from app.models.trade import Trade, TradeDirection, TradeStatus
+from app.crud.stats import OVERALL_ROLLUP, rebuild_rollup, bump_data_version
+from app.utils.snapshot import trade_snapshot
+from app.utils.events import event_hub
+from app.utils.pricing import open_book
 from datetime import datetime, timedelta
 
-def seed_trades():
+def seed_trades(user_id: int):
+    """Replace the user's trades with the demo trades."""
     from app.models.trade import Trade
     demo_trades = [
         Trade(
@@ -34,11 +41,24 @@ def seed_trades():
         ),
     ]
     with Session(engine) as session:
-        session.query(Trade).delete()  # Clear existing trades
+        session.exec(delete(Trade).where(Trade.user_id == user_id))  # Clear the user's existing trades
         for trade in demo_trades:
+            trade.user_id = user_id
             session.add(trade)
+        bump_data_version(session, user_id)
         session.commit()
+        rebuild_rollup(session, user_id)
+        rebuild_rollup(session, OVERALL_ROLLUP)
+        trade_snapshot.invalidate(user_id)
+        open_book.reset(user_id)
+        event_hub.publish("resync", {"reason": "seed"}, user_id)
         print("Seeded demo trades.")
 
 if __name__ == "__main__":
-    seed_trades()
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.utils.seed <user email>")
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == sys.argv[1])).first()
+    if user is None:
+        sys.exit(f"No user with email {sys.argv[1]!r}")
+    seed_trades(user.id)
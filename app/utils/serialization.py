@@ -0,0 +1,17 @@
+import orjson
+
+# Response layouts of the trade list: one object per row, or one array per field.
+LIST_FORMATS = ("rows", "columnar")
+
+def rows_json(columns, rows) -> bytes:
+    """`rows` (tuples in `columns` order) as a JSON array of objects.
+
+    orjson writes datetimes in ISO format and enums as their values, so the
+    output matches the TradeRead encoding without validating each row.
+    """
+    return orjson.dumps([dict(zip(columns, row)) for row in rows])
+
+def columnar_json(columns, rows) -> bytes:
+    """`rows` as a JSON object holding one array per column."""
+    values = zip(*rows) if rows else ([] for _ in columns)
+    return orjson.dumps(dict(zip(columns, values)))
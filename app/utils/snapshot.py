@@ -0,0 +1,164 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+import numpy as np
+from app.core.config import get_settings
+
+# On-disk layout of a snapshot: one raw little-endian file per column, rows ordered
+# by (closed_at, id). NULL floats are NaN and a NULL closed_at is NaT.
+SNAPSHOT_COLUMNS = {
+    "id": np.dtype("<i8"),
+    "closed_at": np.dtype("<M8[us]"),
+    "pair": np.dtype("<i4"),          # index into meta["pairs"]
+    "direction": np.dtype("<i1"),     # index into meta["directions"]
+    "result_usd": np.dtype("<f8"),
+    "result_pips": np.dtype("<f8"),
+    "risk_reward": np.dtype("<f8"),
+    "position_size": np.dtype("<f8"),
+    "risk": np.dtype("<f8"),          # |entry_price - stop_loss| * position_size
+}
+SNAPSHOT_VERSION = 2
+
+class ColumnarSnapshot:
+    """Memory-mapped columnar copies of each user's closed trades.
+
+    Readers map the column files read-only, so every worker process serving the
+    same snapshot shares its pages through the OS page cache. ``meta.json`` holds
+    the row count and the user's DataVersion the columns reflect, and is replaced
+    atomically after the column files are written; a snapshot without it is
+    treated as missing and rebuilt by the caller. Every change after a write
+    must advance the stored version by exactly one (append or advance), or the
+    snapshot is dropped. An flock on the snapshot directory serializes writers
+    across processes.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, user_id: int) -> str:
+        return os.path.join(self.root, str(user_id))
+
+    @contextmanager
+    def _lock(self, user_id: int, exclusive: bool):
+        directory = self._dir(user_id)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield directory
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_meta(directory: str):
+        try:
+            with open(os.path.join(directory, "meta.json")) as handle:
+                meta = json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta if meta.get("version") == SNAPSHOT_VERSION else None
+
+    @staticmethod
+    def _write_meta(directory: str, meta: dict):
+        tmp = os.path.join(directory, "meta.json.tmp")
+        with open(tmp, "w") as handle:
+            json.dump(meta, handle)
+        os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    def read(self, user_id: int):
+        """``(columns, meta)`` with read-only memmapped columns, or None if there is no valid snapshot."""
+        with self._lock(user_id, exclusive=False) as directory:
+            meta = self._read_meta(directory)
+            if meta is None:
+                return None
+            count = meta["count"]
+            columns = {
+                name: np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode="r", shape=(count,))
+                if count else np.empty(0, dtype=dtype)
+                for name, dtype in SNAPSHOT_COLUMNS.items()
+            }
+        return columns, meta
+
+    @staticmethod
+    def _follows(directory: str, meta: dict, data_version: int) -> bool:
+        """True if `data_version` is the next version after the snapshot's; otherwise drop the snapshot.
+
+        A gap means another write (or one from outside app.crud) was never applied.
+        """
+        if meta is not None and meta["data_version"] == data_version - 1:
+            return True
+        if meta is not None:
+            os.remove(os.path.join(directory, "meta.json"))
+        return False
+
+    def write(self, user_id: int, columns: dict, pairs: list, directions: list, data_version: int):
+        """Replace the snapshot with `columns` (arrays keyed like SNAPSHOT_COLUMNS) as of `data_version`."""
+        with self._lock(user_id, exclusive=True) as directory:
+            count = len(columns["id"])
+            for name, dtype in SNAPSHOT_COLUMNS.items():
+                path = os.path.join(directory, f"{name}.bin")
+                np.ascontiguousarray(columns[name], dtype=dtype).tofile(path + ".tmp")
+                # Existing readers keep their mapping of the replaced file.
+                os.replace(path + ".tmp", path)
+            self._write_meta(directory, {
+                "version": SNAPSHOT_VERSION, "data_version": data_version, "count": count,
+                "pairs": list(pairs), "directions": list(directions),
+            })
+
+    def advance(self, user_id: int, data_version: int) -> bool:
+        """Record a write that left the closed trades unchanged as `data_version`."""
+        with self._lock(user_id, exclusive=True) as directory:
+            meta = self._read_meta(directory)
+            if not self._follows(directory, meta, data_version):
+                return False
+            self._write_meta(directory, {**meta, "data_version": data_version})
+        return True
+
+    def append(self, user_id: int, rows: dict, data_version: int) -> bool:
+        """Append closed trades given as ``{column: sequence}``, with pair/direction as names, as of `data_version`.
+
+        Rows closed before the last stored one would break the ordering, so they
+        drop the snapshot instead. Returns False when nothing was appended.
+        """
+        order = np.lexsort((np.asarray(rows["id"]), np.asarray(rows["closed_at"], dtype="datetime64[us]")))
+        with self._lock(user_id, exclusive=True) as directory:
+            meta = self._read_meta(directory)
+            if not self._follows(directory, meta, data_version):
+                return False
+            if not len(order):
+                self._write_meta(directory, {**meta, "data_version": data_version})
+                return False
+            count = meta["count"]
+            closed_at = np.asarray(rows["closed_at"], dtype="datetime64[us]")[order]
+            last = None
+            if count:
+                last = np.memmap(os.path.join(directory, "closed_at.bin"), dtype=SNAPSHOT_COLUMNS["closed_at"], mode="r", shape=(count,))[-1]
+            if np.isnat(closed_at).any() or (last is not None and closed_at[0] < last):
+                os.remove(os.path.join(directory, "meta.json"))
+                return False
+            values = dict(rows, closed_at=closed_at)
+            for key in ("pair", "direction"):
+                codes = {name: i for i, name in enumerate(meta[f"{key}s"])}
+                values[key] = [codes.setdefault(name, len(codes)) for name in rows[key]]
+                meta[f"{key}s"] = list(codes)
+            for name, dtype in SNAPSHOT_COLUMNS.items():
+                column = np.asarray(values[name], dtype=float if dtype.kind == "f" else None)
+                if name != "closed_at":
+                    column = column[order]
+                with open(os.path.join(directory, f"{name}.bin"), "r+b" if count else "wb") as handle:
+                    # Write at the committed end so a torn earlier append is overwritten.
+                    handle.seek(count * dtype.itemsize)
+                    handle.write(column.astype(dtype).tobytes())
+                    handle.truncate()
+            self._write_meta(directory, {**meta, "data_version": data_version, "count": count + len(order)})
+        return True
+
+    def invalidate(self, user_id: int):
+        with self._lock(user_id, exclusive=True) as directory:
+            try:
+                os.remove(os.path.join(directory, "meta.json"))
+            except FileNotFoundError:
+                pass
+
+trade_snapshot = ColumnarSnapshot(get_settings().SNAPSHOT_DIR)
@@ -0,0 +1,45 @@
+import numpy as np
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Always keeps the first and last point and, for every bucket in between, the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+def running_drawdown(balance: np.ndarray, initial_peak: float = 0.0):
+    """Running peak and drawdown (balance - peak, always <= 0) of an equity series."""
+    peak = np.maximum.accumulate(np.maximum(balance, initial_peak)) if len(balance) else balance
+    return peak, balance - peak
+
+def bucket_starts(timestamps: np.ndarray, resolution: str) -> np.ndarray:
+    """Start date (datetime64[D]) of the day, week or month of each timestamp; weeks start on Monday."""
+    days = timestamps.astype("datetime64[D]")
+    if resolution == "week":
+        # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday counted from Monday.
+        return days - (days.view("i8") + 3) % 7
+    if resolution == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    return days
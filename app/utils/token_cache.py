@@ -0,0 +1,98 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from app.core.config import get_settings
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The user fields authenticated requests need, detached from any session."""
+    id: int
+    name: str
+    email: str
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, name=user.name, email=user.email, created_at=user.created_at)
+
+class TokenCache:
+    """Bounded LRU of verified JWTs keyed on their signature.
+
+    An entry holds the decoded claims and a UserSnapshot and lives until the
+    token's `exp` or `ttl` seconds, whichever comes first. Entries for a user are
+    dropped by `invalidate_user` whenever that user changes.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # signature -> (token, expires_at, claims, snapshot)
+        self._by_email = {}  # email -> set of signatures
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, token: str):
+        signature = token.rpartition(".")[2]
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is None or not hmac.compare_digest(entry[0], token):
+                self.misses += 1
+                return None
+            if entry[1] <= time.time():
+                self._remove(signature)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(signature)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def put(self, token: str, claims: dict, snapshot: UserSnapshot):
+        if self.max_size <= 0:
+            return
+        signature = token.rpartition(".")[2]
+        expires_at = min(float(claims.get("exp", 0)), time.time() + self.ttl)
+        with self._lock:
+            self._remove(signature)
+            self._entries[signature] = (token, expires_at, claims, snapshot)
+            self._by_email.setdefault(snapshot.email, set()).add(signature)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, email: str):
+        with self._lock:
+            for signature in list(self._by_email.get(email, ())):
+                self._remove(signature)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_email.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, signature: str):
+        entry = self._entries.pop(signature, None)
+        if entry is not None:
+            signatures = self._by_email.get(entry[3].email)
+            if signatures is not None:
+                signatures.discard(signature)
+                if not signatures:
+                    del self._by_email[entry[3].email]
+
+token_cache = TokenCache(get_settings().TOKEN_CACHE_SIZE, get_settings().TOKEN_CACHE_TTL_SECONDS)
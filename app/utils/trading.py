@@ -1,24 +1,65 @@
+import numpy as np
 from app.models.trade import Trade
 
+# Price move of one pip, as used by compute_result_pips.
+PIP_SIZE = 0.01
+
+# Relative nudge that lifts a half cent past its binary representation error
+# (665.175 is stored as 665.17499999...): thousands of ulps, yet under a hundredth
+# of a cent for any amount below 1e8.
+ROUND_EPSILON = 1e-12
+
+def round_cents(values):
+    """Round to 2 decimals, halves away from zero, for a float or an array.
+
+    Both the scalar helpers and compute_results_batch round through here, so a
+    single close and a batch close of the same trade always agree.
+    """
+    scaled = np.asarray(values, dtype=float) * 100
+    return np.round(scaled + np.copysign(np.abs(scaled) * ROUND_EPSILON, scaled)) / 100
+
 def compute_risk_reward(trade: Trade) -> float:
     """Calculate risk/reward ratio."""
     if not trade.stop_loss or not trade.take_profit:
         return None
     risk = abs(trade.entry_price - trade.stop_loss)
     reward = abs(trade.take_profit - trade.entry_price)
-    return round(reward / risk, 2) if risk > 0 else None
+    return float(round_cents(reward / risk)) if risk > 0 else None
 
 def compute_result_pips(trade: Trade) -> float:
     """Calculate result in pips (for Forex, XAU/USD, BTC/USD)."""
     if not trade.exit_price:
         return None
-    pip_factor = 0.01 if "JPY" not in trade.pair else 0.01
     direction = 1 if trade.direction == "BUY" else -1
-    return round((trade.exit_price - trade.entry_price) * direction / pip_factor, 2)
+    return float(round_cents((trade.exit_price - trade.entry_price) * direction / PIP_SIZE))
 
 def compute_result_usd(trade: Trade) -> float:
     """Calculate result in USD."""
     if not trade.exit_price or not trade.position_size:
         return None
     direction = 1 if trade.direction == "BUY" else -1
-    return round((trade.exit_price - trade.entry_price) * direction * trade.position_size, 2)
+    return float(round_cents((trade.exit_price - trade.entry_price) * direction * trade.position_size))
+
+def compute_results_batch(direction, entry_price, exit_price, stop_loss, take_profit, position_size):
+    """Vectorized compute_risk_reward / compute_result_pips / compute_result_usd.
+
+    Takes equal-length sequences (None for missing values) and returns three
+    float arrays (risk_reward, result_pips, result_usd) with NaN wherever the
+    scalar helpers would return None.
+    """
+    sign = np.where(np.asarray(direction) == "BUY", 1.0, -1.0)
+    entry = np.asarray(entry_price, dtype=float)
+    exit_ = np.asarray(exit_price, dtype=float)
+    stop = np.asarray(stop_loss, dtype=float)
+    target = np.asarray(take_profit, dtype=float)
+    size = np.asarray(position_size, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk = np.abs(entry - stop)
+        reward = np.abs(target - entry)
+        has_levels = (np.nan_to_num(stop) != 0) & (np.nan_to_num(target) != 0) & (risk > 0)
+        risk_reward = np.where(has_levels, round_cents(reward / risk), np.nan)
+    has_exit = np.nan_to_num(exit_) != 0
+    move = (exit_ - entry) * sign
+    result_pips = np.where(has_exit, round_cents(move / PIP_SIZE), np.nan)
+    result_usd = np.where(has_exit & (np.nan_to_num(size) != 0), round_cents(move * size), np.nan)
+    return risk_reward, result_pips, result_usd
@@ -0,0 +1,52 @@
+"""Latency of cheap requests while slow stats queries run concurrently.
+
+Every request goes through the ASGI app on a single event loop, the same as one
+uvicorn worker, so any endpoint that blocks the loop shows up in the p99 of the
+cheap requests.
+
+    python -m benchmarks.bench_concurrency --trades 200000 --output results.json
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, latency_summary, emit
+
+async def run(duration: float, fast_clients: int, slow_clients: int) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    latencies = {"fast": [], "slow": []}
+    deadline = time.perf_counter() + duration
+
+    async def worker(kind: str, client: httpx.AsyncClient, path: str):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+        await client.get("/api/v1/trades/1")
+        workers = [worker("fast", client, "/api/v1/trades/1") for _ in range(fast_clients)]
+        workers += [worker("slow", client, "/api/v1/stats/breakdown?by=pair,direction,month") for _ in range(slow_clients)]
+        await asyncio.gather(*workers)
+    return {kind: latency_summary(samples) for kind, samples in latencies.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--fast-clients", type=int, default=20)
+    parser.add_argument("--slow-clients", type=int, default=2)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    use_temp_database()
+    populate(args.trades)
+    results = asyncio.run(run(args.duration, args.fast_clients, args.slow_clients))
+    emit({"benchmark": "concurrency", "trades": args.trades, **results}, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Per-request and per-query cost of the metrics instrumentation.
+
+The middleware is timed around a trivial ASGI app (so its own cost is not lost
+in endpoint noise), once bare and once wrapped, and the cursor events are timed
+on `SELECT 1` against an in-memory SQLite engine with and without
+`instrument_engine`. An end-to-end pass then serves a real route through the
+full app with METRICS_ENABLED on and off, each in a fresh interpreter.
+
+    python -m benchmarks.bench_metrics --requests 200000 --queries 100000 --output metrics.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, latency_summary, emit
+
+async def plain_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def time_asgi(app, n: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+def time_queries(instrumented: bool, n: int) -> float:
+    from sqlalchemy import create_engine, text
+    from app.utils.metrics import instrument_engine
+
+    engine = create_engine("sqlite://")
+    if instrumented:
+        instrument_engine(engine)
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        started = time.perf_counter()
+        for _ in range(n):
+            conn.execute(statement)
+        return time.perf_counter() - started
+
+def end_to_end(requests: int) -> dict:
+    """Latency of GET /api/v1/trades/{id} through the app, in this process."""
+    import httpx
+    from app.main import app
+
+    async def run():
+        latencies = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+            await client.get("/api/v1/trades/1")
+            for _ in range(requests):
+                started = time.perf_counter()
+                (await client.get("/api/v1/trades/1")).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+        return latency_summary(latencies)
+
+    return asyncio.run(run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000, help="middleware calls")
+    parser.add_argument("--queries", type=int, default=50_000)
+    parser.add_argument("--e2e-requests", type=int, default=2000)
+    parser.add_argument("--e2e-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    if args.e2e_only:
+        print(json.dumps(end_to_end(args.e2e_requests)))
+        return
+
+    path = use_temp_database()
+    populate(1000)
+    from app.utils.metrics import MetricsMiddleware, MetricsRegistry
+
+    bare = asyncio.run(time_asgi(plain_app, args.requests))
+    wrapped = asyncio.run(time_asgi(MetricsMiddleware(plain_app, MetricsRegistry()), args.requests))
+    plain_queries = time_queries(False, args.queries)
+    counted_queries = time_queries(True, args.queries)
+
+    e2e = {}
+    for enabled in ("false", "true"):
+        env = {**os.environ, "SQLITE_DB": f"sqlite:///{path}", "METRICS_ENABLED": enabled}
+        command = [sys.executable, "-m", "benchmarks.bench_metrics", "--e2e-only", "--e2e-requests", str(args.e2e_requests)]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        e2e["metrics_on" if enabled == "true" else "metrics_off"] = json.loads(output.strip().splitlines()[-1])
+
+    emit({
+        "benchmark": "metrics",
+        "middleware_overhead_us": round((wrapped - bare) / args.requests * 1e6, 2),
+        "query_overhead_us": round((counted_queries - plain_queries) / args.queries * 1e6, 2),
+        "end_to_end": e2e,
+    }, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Throughput and p50/p99 latency of every API route as the trade table grows.
+
+For each scale the database is grown to that many synthetic trades (see
+`app.utils.generate`) spread over `--users` accounts, and every route under
+app/api/v1/routes is requested `--requests` times by `--clients` concurrent
+clients through the ASGI app, each request as one of the users in turn. Read
+routes get one untimed request per user first, so cold caches are not counted.
+Write routes act on rows made for them (trades created by the POST route are
+updated, closed and deleted by the later ones), so every request does real work.
+
+A route with no entry in ROUTES or SKIPPED fails the run, so new routes cannot
+go unmeasured. With `--baseline` (an earlier `--output`), routes whose p99
+grew by more than `--max-regression` are listed and the exit status is 1.
+With `--backend memory` the generated journal is copied into the in-memory
+repository and the API is run in DATA_MODE=test, measuring the endpoint code
+without database I/O.
+
+    python -m benchmarks.bench_routes --scales 10000 1000000 10000000 --output routes.json
+    python -m benchmarks.bench_routes --scales 10000 --baseline routes.json
+    python -m benchmarks.bench_routes --scales 100000 --backend memory
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import use_temp_database, populate, create_users, auth_headers, bench_email, latency_summary, emit
+
+PAIRS = ["EUR/USD", "GBP/USD", "USD/JPY", "XAU/USD", "BTC/USD"]
+NEW_TRADE = {"pair": "EUR/USD", "direction": "BUY", "entry_price": 1.1, "stop_loss": 1.09, "take_profit": 1.12, "position_size": 1000.0}
+
+class RouteContext:
+    """Users, their tokens and the rows the write routes act on, for one scale."""
+
+    def __init__(self, user_ids, trades, scale: int):
+        self.user_ids = user_ids
+        self.headers = {user_id: auth_headers(user_id) for user_id in user_ids}
+        self.trades = trades  # existing (user_id, trade_id) pairs
+        self.created = []  # (user_id, trade_id) from the POST route, in order
+        self.scale = scale
+
+    def user(self, i: int) -> int:
+        return self.user_ids[i % len(self.user_ids)]
+
+def existing_trade(ctx: RouteContext, i: int):
+    user_id, trade_id = ctx.trades[i % len(ctx.trades)]
+    return user_id, f"/api/v1/trades/{trade_id}", {}
+
+def import_body(rows: int = 20) -> str:
+    return "".join(json.dumps({**NEW_TRADE, "pair": PAIRS[n % len(PAIRS)], "exit_price": 1.11}) + "\n" for n in range(rows))
+
+# Method and path template -> request(ctx, i) returning (user_id or None, url, httpx keyword arguments).
+# Reads come first so they see the generated data; writes then run in dependency order.
+ROUTES = {
+    "GET /api/v1/trades/": lambda ctx, i: (ctx.user(i), "/api/v1/trades/?limit=50", {}),
+    "GET /api/v1/trades/{trade_id}": existing_trade,
+    "GET /api/v1/trades/export": lambda ctx, i: (ctx.user(i), "/api/v1/trades/export?format=csv", {}),
+    "GET /api/v1/stats/summary": lambda ctx, i: (ctx.user(i), "/api/v1/stats/summary", {}),
+    "GET /api/v1/stats/equity_curve": lambda ctx, i: (ctx.user(i), "/api/v1/stats/equity_curve?resolution=day", {}),
+    "GET /api/v1/stats/breakdown": lambda ctx, i: (ctx.user(i), "/api/v1/stats/breakdown?by=pair,direction", {}),
+    "GET /api/v1/stats/advanced": lambda ctx, i: (ctx.user(i), "/api/v1/stats/advanced", {}),
+    "GET /api/v1/stats/unrealized": lambda ctx, i: (ctx.user(i), "/api/v1/stats/unrealized", {}),
+    "GET /api/v1/stats/monte_carlo": lambda ctx, i: (ctx.user(i), "/api/v1/stats/monte_carlo?paths=1000&horizon=250&seed=1", {}),
+    "GET /api/v1/auth/me": lambda ctx, i: (ctx.user(i), "/api/v1/auth/me", {}),
+    "POST /api/v1/auth/login": lambda ctx, i: (None, "/api/v1/auth/login", {"json": {"email": bench_email(ctx.user(i)), "password": "password123"}}),
+    "POST /api/v1/auth/signup": lambda ctx, i: (None, "/api/v1/auth/signup", {"json": {"name": "bench", "email": f"signup{ctx.scale}-{i}@example.com", "password": "password123"}}),
+    "POST /api/v1/trades/": lambda ctx, i: (ctx.user(i), "/api/v1/trades/", {"json": NEW_TRADE}),
+    "POST /api/v1/trades/import": lambda ctx, i: (ctx.user(i), "/api/v1/trades/import", {"content": import_body(), "headers": {"Content-Type": "application/x-ndjson"}}),
+    "PUT /api/v1/trades/{trade_id}": lambda ctx, i: (ctx.created[i][0], f"/api/v1/trades/{ctx.created[i][1]}", {"json": {"notes": "bench"}}),
+    "PATCH /api/v1/trades/{trade_id}/close": lambda ctx, i: (ctx.created[i][0], f"/api/v1/trades/{ctx.created[i][1]}/close?exit_price=1.11", {}),
+    # Each (user, pair) closes that user's open generated trades in the pair once.
+    "PATCH /api/v1/trades/close": lambda ctx, i: (ctx.user(i), "/api/v1/trades/close", {"json": {PAIRS[i // len(ctx.user_ids) % len(PAIRS)]: 1.1}}),
+    "DELETE /api/v1/trades/{trade_id}": lambda ctx, i: (ctx.created[i][0], f"/api/v1/trades/{ctx.created[i][1]}", {}),
+}
+# Routes measured elsewhere.
+SKIPPED = {
+    "GET /api/v1/stream": "long-lived SSE connection; see benchmarks.bench_stream",
+}
+# Requests per scale for routes too slow to run --requests times (bcrypt, full exports).
+REQUEST_CAPS = {
+    "GET /api/v1/trades/export": 5,
+    "POST /api/v1/auth/login": 20,
+    "POST /api/v1/auth/signup": 20,
+}
+
+def api_routes(app) -> list:
+    """``"METHOD path"`` for every route of the routers in app/api/v1/routes, from the OpenAPI schema."""
+    return [
+        f"{method.upper()} {path}"
+        for path, operations in app.openapi()["paths"].items()
+        for method, operation in operations.items()
+        if set(operation.get("tags", [])) & {"auth", "trades", "stats", "stream"}
+    ]
+
+def sample_trades(user_ids, n: int) -> list:
+    """Up to `n` existing (user_id, trade_id) pairs owned by `user_ids`, spread over the id range."""
+    from sqlmodel import Session, select, func
+    from app.db.session import engine
+    from app.models.trade import Trade
+
+    with Session(engine) as session:
+        top = session.exec(select(func.max(Trade.id))).one() or 0
+        ids = sorted({1 + top * k // n for k in range(n)}) if top else []
+        rows = session.exec(select(Trade.user_id, Trade.id).where(Trade.id.in_(ids), Trade.user_id.in_(user_ids))).all()
+    return [tuple(row) for row in rows]
+
+def load_memory_backend():
+    """Copy every user and trade in the database into the in-memory repository and serve from it."""
+    from sqlmodel import Session, select
+    from app.crud.memory import memory_repository
+    from app.db.session import engine
+    from app.models.trade import Trade
+    from app.models.user import User
+
+    memory_repository.clear()
+    with Session(engine) as session:
+        memory_repository.load(session.exec(select(User)).all(), session.exec(select(Trade)).all())
+        session.expunge_all()
+    os.environ["DATA_MODE"] = "test"
+
+async def measure(client, ctx: RouteContext, name: str, requests: int, clients: int) -> dict:
+    method = name.split(" ", 1)[0]
+    build = ROUTES[name]
+    latencies, cursor = [], iter(range(requests))
+
+    async def call(i: int):
+        user_id, url, kwargs = build(ctx, i)
+        headers = {**(ctx.headers[user_id] if user_id else {}), **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        response = await client.request(method, url, headers=headers, **kwargs)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} -> {response.status_code}: {response.text[:200]}")
+        if name == "POST /api/v1/trades/":
+            ctx.created.append((user_id, response.json()["id"]))
+        return elapsed
+
+    async def worker():
+        for i in cursor:
+            latencies.append(await call(i))
+
+    if method == "GET":
+        for i in range(len(ctx.user_ids)):
+            await call(i)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {"requests_per_second": round(len(latencies) / elapsed, 1), **latency_summary(latencies)}
+
+async def run(scales, n_users: int, requests: int, clients: int, backend: str = "sql") -> list:
+    import httpx
+    from app.main import app
+    from app.utils.generate import refresh_users
+
+    routes = api_routes(app)
+    unknown = [name for name in routes if name not in ROUTES and name not in SKIPPED]
+    if unknown:
+        sys.exit(f"No benchmark request for: {', '.join(unknown)}; add them to ROUTES or SKIPPED.")
+    user_ids = create_users(n_users)
+    results, existing = [], 0
+    for scale in scales:
+        started = time.perf_counter()
+        if scale > existing:
+            populate(scale - existing, seed=scale, user_ids=user_ids)
+            existing = scale
+        refresh_users(user_ids)
+        if backend == "memory":
+            load_memory_backend()
+        load_seconds = round(time.perf_counter() - started, 1)
+
+        ctx = RouteContext(user_ids, sample_trades(user_ids, requests), scale)
+        timings = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in ROUTES:
+                if name in routes:
+                    count = min(requests, REQUEST_CAPS.get(name, requests))
+                    timings[name] = await measure(client, ctx, name, count, clients)
+        results.append({"trades": scale, "load_seconds": load_seconds, "routes": timings})
+    return results
+
+def regressions(results: list, baseline: dict, max_regression: float) -> list:
+    """Routes whose p99 at a scale grew by more than `max_regression` (a fraction) and 1 ms over `baseline`."""
+    before = {(level["trades"], name): timing for level in baseline.get("scales", []) for name, timing in level["routes"].items()}
+    found = []
+    for level in results:
+        for name, timing in level["routes"].items():
+            old = before.get((level["trades"], name))
+            if old and timing["p99_ms"] > old["p99_ms"] * (1 + max_regression) and timing["p99_ms"] - old["p99_ms"] > 1:
+                found.append({"trades": level["trades"], "route": name, "baseline_p99_ms": old["p99_ms"], "p99_ms": timing["p99_ms"]})
+    return found
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="total trades per level")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and scale")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--backend", choices=("sql", "memory"), default="sql", help="repository the API serves from")
+    parser.add_argument("--baseline", help="earlier --output to compare p99 against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p99 growth over the baseline, as a fraction")
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    use_temp_database()
+    results = asyncio.run(run(sorted(args.scales), args.users, args.requests, args.clients, args.backend))
+    report = {
+        "benchmark": "routes", "backend": args.backend, "users": args.users, "requests": args.requests, "clients": args.clients,
+        "scales": results, "skipped": SKIPPED,
+    }
+    if args.baseline:
+        with open(args.baseline) as fh:
+            report["regressions"] = regressions(results, json.load(fh), args.max_regression)
+    emit(report, args.output)
+    return 1 if report.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
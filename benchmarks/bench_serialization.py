@@ -0,0 +1,103 @@
+"""Trade-list serialization throughput: TradeRead models vs tuples encoded with orjson.
+
+For each size, one user's trades are read as ORM instances (the old path:
+validate each through TradeRead, encode with the standard JSON encoder) and as
+column tuples (the fast path: `rows_json` and `columnar_json`). Fetch and encode
+are timed separately, along with payload size and the time a client takes to
+parse the payload. An end-to-end pass then requests `GET /api/v1/trades/` in
+both formats through the ASGI app.
+
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000 --output serialization.json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, latency_summary, emit
+
+def best_of(fn, repeat: int):
+    """(fastest duration in seconds, result) of `repeat` calls to `fn`."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def measure_size(session, user_id: int, limit: int, repeat: int) -> dict:
+    from typing import List
+    from pydantic import TypeAdapter
+    from app.crud.trade import TRADE_COLUMNS, get_trades, get_trade_rows
+    from app.schemas.trade import TradeRead
+    from app.utils.serialization import rows_json, columnar_json
+
+    adapter = TypeAdapter(List[TradeRead])
+    columns = list(TRADE_COLUMNS)
+
+    def fetch_models():
+        session.expunge_all()
+        return get_trades(session, user_id, limit=limit)
+
+    def encode_models(trades):
+        models = [TradeRead.model_validate(trade, from_attributes=True) for trade in trades]
+        return json.dumps(adapter.dump_python(models, mode="json")).encode()
+
+    fetch_model_s, trades = best_of(fetch_models, repeat)
+    fetch_rows_s, rows = best_of(lambda: get_trade_rows(session, user_id, limit=limit), repeat)
+    results = {"trades": len(rows)}
+    for name, fetch_s, encode in (
+        ("model", fetch_model_s, lambda: encode_models(trades)),
+        ("rows", fetch_rows_s, lambda: rows_json(columns, rows)),
+        ("columnar", fetch_rows_s, lambda: columnar_json(columns, rows)),
+    ):
+        encode_s, payload = best_of(encode, repeat)
+        parse_s, _ = best_of(lambda: json.loads(payload), repeat)
+        results[name] = {
+            "fetch_ms": round(fetch_s * 1000, 2),
+            "encode_ms": round(encode_s * 1000, 2),
+            "encode_rows_per_second": round(len(rows) / encode_s) if encode_s else None,
+            "payload_bytes": len(payload),
+            "client_parse_ms": round(parse_s * 1000, 2),
+        }
+    return results
+
+async def end_to_end(limit: int, requests: int) -> dict:
+    import httpx
+    from app.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+        for format in ("rows", "columnar"):
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                (await client.get("/api/v1/trades/", params={"limit": limit, "format": format})).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            results[format] = latency_summary(latencies)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="trades per list")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--e2e-requests", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    use_temp_database()
+    populate(max(args.sizes), args.seed)
+    from sqlmodel import Session
+    from app.db.session import engine
+
+    results = {"benchmark": "serialization", "sizes": {}}
+    with Session(engine) as session:
+        for size in args.sizes:
+            results["sizes"][size] = measure_size(session, 1, size, args.repeat)
+    results["end_to_end"] = {size: asyncio.run(end_to_end(size, args.e2e_requests)) for size in args.sizes}
+    emit(results, args.output)
+
+if __name__ == "__main__":
+    main()
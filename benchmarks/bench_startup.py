@@ -0,0 +1,129 @@
+"""Cold start: import-time breakdown of app.main and time to the first request.
+
+Each run starts a fresh interpreter. `python -X importtime -c "import app.main"`
+gives the self time of every module, summed here per top-level package, plus
+the slowest app modules by cumulative time. A second interpreter imports the
+app, runs its lifespan startup and serves one authenticated
+`GET /api/v1/trades/?limit=1` through the ASGI app; time to first request is
+measured from process spawn to the end of that response. Medians over --runs.
+
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+
+The exit status is 1 when the median time to first request exceeds
+--target-ms (TARGET_MS by default; 0 disables the check).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, emit
+
+FIRST_REQUEST = "/api/v1/trades/?limit=1"
+# Time to first request budget: about 1.2-1.5 s measured on a single-vCPU box after
+# lazy loading, down from 1.55-1.85 s, of which fastapi/sqlalchemy/numpy imports are ~0.9 s.
+TARGET_MS = 1500
+
+def parse_importtime(stderr: str) -> dict:
+    """{module: (self_us, cumulative_us)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def importtime_run(env: dict) -> dict:
+    command = [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import app.main"]
+    stderr = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stderr
+    return parse_importtime(stderr)
+
+def importtime_summary(runs: list, top: int) -> dict:
+    def median_ms(values):
+        return round(statistics.median(values) / 1000, 1)
+
+    packages = {}
+    for modules in runs:
+        totals = {}
+        for name, (self_us, _) in modules.items():
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0) + self_us
+        for package, total in totals.items():
+            packages.setdefault(package, []).append(total)
+    app_modules = {name for modules in runs for name in modules if name.split(".")[0] == "app"}
+    slowest = sorted(app_modules, key=lambda name: -statistics.median(m.get(name, (0, 0))[1] for m in runs))[:top]
+    return {
+        "total_ms": median_ms([modules["app.main"][1] for modules in runs]),
+        "packages_ms": dict(sorted(((p, median_ms(v)) for p, v in packages.items()), key=lambda item: -item[1])[:top]),
+        "app_modules_cumulative_ms": {name: median_ms([m.get(name, (0, 0))[1] for m in runs]) for name in slowest},
+    }
+
+def child():
+    """Import the app, start it and serve one request; prints phase timings as JSON."""
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def serve():
+        import httpx
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                response = await client.get(FIRST_REQUEST, headers=json.loads(os.environ["BENCH_HEADERS"]))
+            response.raise_for_status()
+            return ready, time.perf_counter(), time.time()
+
+    ready, served, served_at = asyncio.run(serve())
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (served - ready) * 1000,
+        "time_to_first_request_ms": (served_at - float(os.environ["BENCH_SPAWNED_AT"])) * 1000,
+    }))
+
+def first_request_run(env: dict) -> dict:
+    env = {**env, "BENCH_SPAWNED_AT": repr(time.time())}
+    command = [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_startup", "--child"]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages and app modules listed")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="fail when the median time to first request exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child()
+        return
+
+    use_temp_database()
+    populate(10)
+    env = {**os.environ, "BENCH_HEADERS": json.dumps(auth_headers())}
+    imports = [importtime_run(env) for _ in range(args.runs)]
+    requests = [first_request_run(env) for _ in range(args.runs)]
+    first_request = {key: round(statistics.median(run[key] for run in requests), 1) for key in requests[0]}
+    results = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "importtime": importtime_summary(imports, args.top),
+        "first_request": first_request,
+    }
+    if args.target_ms:
+        results["target_ms"] = args.target_ms
+        results["within_target"] = first_request["time_to_first_request_ms"] <= args.target_ms
+    emit(results, args.output)
+    if args.target_ms and not results["within_target"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
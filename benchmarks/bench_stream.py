@@ -0,0 +1,130 @@
+"""Fan-out latency and server memory of the SSE stream as open connections grow.
+
+A uvicorn worker is started in a subprocess. For each connection count, that
+many /api/v1/stream clients are connected, trades are created through the API,
+and the time from each write until every client has the event is recorded.
+
+    python -m benchmarks.bench_stream --connections 10 100 1000 --writes 20 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, latency_summary, emit
+
+# Lets the benchmark read the server's /api/v1/system/stream stats.
+DEBUG_TOKEN = "bench-stream"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+async def wait_until_up(client, retries: int = 100):
+    for _ in range(retries):
+        try:
+            await client.get("/api/v1/system/mode")
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+async def run_level(client, pid: int, connections: int, writes: int) -> dict:
+    received = {}  # trade id -> list of receive times
+    ready = 0
+
+    async def listen():
+        nonlocal ready
+        async with client.stream("GET", "/api/v1/stream") as response:
+            response.raise_for_status()
+            ready += 1
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data = json.loads(line[6:])
+                    if data.get("action") == "created":
+                        received.setdefault(data["trade"]["id"], []).append(time.perf_counter())
+
+    started = time.perf_counter()
+    listeners = [asyncio.create_task(listen()) for _ in range(connections)]
+    while ready < connections:
+        await asyncio.sleep(0.01)
+    connect_seconds = time.perf_counter() - started
+    idle_rss = rss_mb(pid)
+
+    fan_out, write_latency = [], []
+    payload = {"pair": "BENCH/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+    for _ in range(writes):
+        sent = time.perf_counter()
+        trade_id = (await client.post("/api/v1/trades/", json=payload)).json()["id"]
+        write_latency.append(time.perf_counter() - sent)
+        while len(received.get(trade_id, ())) < connections:
+            await asyncio.sleep(0.001)
+        fan_out.append(max(received[trade_id]) - sent)
+
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*listeners, return_exceptions=True)
+    return {
+        "connections": connections,
+        "connect_seconds": round(connect_seconds, 3),
+        "server_rss_mb": idle_rss,
+        "write": latency_summary(write_latency),
+        "fan_out_all_clients": latency_summary(fan_out),
+    }
+
+async def run(port: int, pid: int, levels, writes: int) -> list:
+    import httpx
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60, headers=auth_headers()) as client:
+        await wait_until_up(client)
+        results = []
+        for connections in levels:
+            results.append(await run_level(client, pid, connections, writes))
+            # Let the server notice the closed streams before the next level.
+            await asyncio.sleep(0.5)
+        stats = await client.get("/api/v1/system/stream", headers={"X-Debug-Token": DEBUG_TOKEN})
+        results.append({"stream_stats": stats.json()})
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=10_000)
+    parser.add_argument("--connections", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    # Every stream holds a socket on both ends.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    use_temp_database()
+    populate(args.trades)
+    port = free_port()
+    env = dict(os.environ, STREAM_MAX_CLIENTS=str(max(args.connections) + 10), DEBUG_TOKEN=DEBUG_TOKEN)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        results = asyncio.run(run(port, server.pid, args.connections, args.writes))
+    finally:
+        server.terminate()
+        server.wait()
+    emit({"benchmark": "stream", "trades": args.trades, "levels": results}, args.output)
+
+if __name__ == "__main__":
+    main()
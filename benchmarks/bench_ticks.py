@@ -0,0 +1,77 @@
+"""Tick throughput and mark-to-market latency of the open-position book.
+
+A tick file is replayed at full speed through a `ReplayFeed` into a book holding
+`--open-trades` open trades, then the latency of reading the marked totals (as
+/stats/summary and /stats/unrealized do) is sampled.
+
+    python -m benchmarks.bench_ticks --open-trades 1000 100000 --ticks 1000000 --output ticks.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import latency_summary, emit
+from app.utils.pricing import OpenPositionBook
+from app.utils.pricefeed import ReplayFeed, run_feed
+
+PAIRS = [f"P{n:02d}/USD" for n in range(28)]
+
+def write_ticks(path: str, n_ticks: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, "w") as fh:
+        for _ in range(n_ticks):
+            fh.write(f"{rng.choice(PAIRS)},{rng.uniform(0.5, 2.0):.5f}\n")
+
+def run_level(open_trades: int, tick_path: str, n_ticks: int, reads: int) -> dict:
+    rng = random.Random(open_trades)
+    book = OpenPositionBook()
+    book.load(
+        1,
+        ((n, rng.choice(PAIRS), rng.choice(("BUY", "SELL")), rng.uniform(0.5, 2.0), rng.uniform(1, 1000))
+        for n in range(open_trades)),
+    )
+    started = time.perf_counter()
+    asyncio.run(run_feed(ReplayFeed(tick_path), book))
+    replay_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for n in range(n_ticks):
+        book.on_tick(PAIRS[n % len(PAIRS)], 1.0)
+    direct_seconds = time.perf_counter() - started
+
+    totals, per_trade = [], []
+    for _ in range(reads):
+        started = time.perf_counter()
+        book.snapshot(1)
+        totals.append(time.perf_counter() - started)
+    for _ in range(max(1, reads // 10)):
+        started = time.perf_counter()
+        book.snapshot(1, include_trades=True)
+        per_trade.append(time.perf_counter() - started)
+    return {
+        "open_trades": open_trades,
+        "replay_ticks_per_second": round(n_ticks / replay_seconds),
+        "on_tick_per_second": round(n_ticks / direct_seconds),
+        "totals": latency_summary(totals),
+        "per_trade": latency_summary(per_trade),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--open-trades", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tick_path = os.path.join(directory, "ticks.csv")
+        write_ticks(tick_path, args.ticks)
+        results = [run_level(n, tick_path, args.ticks, args.reads) for n in args.open_trades]
+    emit({"benchmark": "ticks", "ticks": args.ticks, "levels": results}, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-user request latency as the number of users (and so the trade table) grows.
+
+Every user owns the same number of trades, so the table grows with the user
+count while each journal stays the same size. For each level, users are added
+until the level is reached and then concurrent clients, each signed in as a
+sampled user, request that user's trade list, summary, breakdown and equity
+curve through the ASGI app. A sample of users is first requested once each
+(cold: rollup, snapshot and open positions are loaded) and then repeatedly
+(warm). With user-leading indexes both should stay flat across levels.
+
+    python -m benchmarks.bench_users --users 10 1000 5000 --trades-per-user 200 --output users.json
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import use_temp_database, populate, auth_headers, latency_summary, emit
+
+ENDPOINTS = {
+    "list": "/api/v1/trades/?limit=50",
+    "summary": "/api/v1/stats/summary",
+    "breakdown": "/api/v1/stats/breakdown?by=pair,direction",
+    "equity_curve": "/api/v1/stats/equity_curve?resolution=day",
+}
+
+async def measure(client, user_ids, clients: int, requests: int, rng) -> dict:
+    """Latencies of `requests` user sessions by `clients` concurrent workers, each session for a user drawn from `user_ids`."""
+    latencies = {name: [] for name in ENDPOINTS}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            headers = auth_headers(rng.choice(user_ids))
+            for name, path in ENDPOINTS.items():
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies[name].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": round(requests * len(ENDPOINTS) / elapsed, 1),
+        **{name: latency_summary(samples) for name, samples in latencies.items()},
+    }
+
+async def run_level(app, n_users: int, sample: int, clients: int, requests: int, seed: int) -> dict:
+    import httpx
+
+    rng = random.Random(seed)
+    user_ids = rng.sample(range(1, n_users + 1), min(sample, n_users))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # First request per user loads their rollup, snapshot and open positions.
+        cold = await measure(client, user_ids, 1, len(user_ids), random.Random(seed))
+        warm = await measure(client, user_ids, clients, requests, rng)
+    return {"users": n_users, "sampled_users": len(user_ids), "cold": cold, "warm": warm}
+
+async def run(levels, trades_per_user: int, sample: int, clients: int, requests: int) -> list:
+    # One event loop for every level: the app's async engine pool is bound to it.
+    from app.main import app
+
+    results, existing = [], 0
+    for n_users in levels:
+        new_users = list(range(existing + 1, n_users + 1))
+        populate(len(new_users) * trades_per_user, seed=n_users, user_ids=new_users)
+        existing = n_users
+        results.append(await run_level(app, n_users, sample, clients, requests, n_users))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 1000, 5000])
+    parser.add_argument("--trades-per-user", type=int, default=200)
+    parser.add_argument("--sample-users", type=int, default=100, help="users measured per level")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="warm user sessions per level, each requesting every endpoint")
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    use_temp_database()
+    results = asyncio.run(run(sorted(args.users), args.trades_per_user, args.sample_users, args.clients, args.requests))
+    emit({"benchmark": "users", "trades_per_user": args.trades_per_user, "levels": results}, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database, so `use_temp_database` must be
+called before anything from `app` is imported.
+"""
+import json
+import os
+import tempfile
+
+def use_temp_database() -> str:
+    directory = tempfile.mkdtemp(prefix="trading_journal_bench_")
+    path = os.path.join(directory, "bench.db")
+    os.environ["SQLITE_DB"] = f"sqlite:///{path}"
+    os.environ["SNAPSHOT_DIR"] = os.path.join(directory, "snapshots")
+    os.environ.setdefault("DATA_MODE", "real")
+    return path
+
+BENCH_EMAIL_PATTERN = "bench{n}@example.com"
+
+def bench_email(user_id: int) -> str:
+    return BENCH_EMAIL_PATTERN.format(n=user_id)
+
+def auth_headers(user_id: int = 1) -> dict:
+    """Bearer token for a user created by `create_users`."""
+    from app.utils.security import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': bench_email(user_id)})}"}
+
+def create_users(n_users: int) -> list:
+    """Create the schema and users 1..n_users (ids match `bench_email` on a fresh database)."""
+    from app.utils.generate import ensure_users
+    return ensure_users(n_users, BENCH_EMAIL_PATTERN)
+
+def populate(n_trades: int, seed: int = 0, user_ids=(1,), **options):
+    """Insert `n_trades` synthetic trades spread evenly over `user_ids`; `options` go to `generate_trades`."""
+    from app.utils.generate import generate_trades
+
+    create_users(max(user_ids))
+    return generate_trades(n_trades, list(user_ids), seed=seed, **options)
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(samples) -> dict:
+    """p50/p99/max in milliseconds for a list of durations in seconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples, default=0) * 1000, 2),
+    }
+
+def emit(results: dict, output: str = None):
+    text = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
+    print(text)
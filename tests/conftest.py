@@ -0,0 +1,108 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database and snapshot directory before anything imports app.core.config.
+_db_dir = tempfile.mkdtemp(prefix="trading_journal_tests_")
+os.environ["SQLITE_DB"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["SNAPSHOT_DIR"] = os.path.join(_db_dir, "snapshots")
+os.environ.setdefault("DATA_MODE", "real")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from sqlmodel import SQLModel
+from app.db.session import engine
+from app.models import trade, user, stats  # noqa: F401  (register tables)
+
+SQLModel.metadata.create_all(engine)
+
+@pytest.fixture
+def session():
+    from sqlmodel import Session
+    with Session(engine) as session:
+        yield session
+
+def make_user(email: str):
+    """A user row with a bearer token, created directly in the database."""
+    from sqlmodel import Session
+    from app.crud.user import create_user, get_user_by_email
+    from app.schemas.user import UserCreate
+    from app.utils.security import create_access_token
+
+    with Session(engine) as session:
+        account = get_user_by_email(session, email) or create_user(session, UserCreate(name=email.split("@")[0], email=email, password="password123"))
+        session.expunge(account)
+    return account, {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+@pytest.fixture(scope="session")
+def trader():
+    """The account the API tests act as."""
+    return make_user("trader@example.com")[0]
+
+@pytest.fixture(scope="session")
+def other_user():
+    """A second account and its auth headers, for checking that journals stay apart."""
+    return make_user("other@example.com")
+
+BACKENDS = ("sql", "memory")
+
+@pytest.fixture
+def backend(request, monkeypatch, trader, other_user):
+    """Repository the API serves `client` from: the database, or MemoryRepository (DATA_MODE=test).
+
+    The memory backend holds copies of the test accounts, so tokens, ids and
+    the isolation between `trader` and `other_user` are the same on both.
+    """
+    if request.param == "sql":
+        yield request.param
+        return
+    from app.crud.memory import memory_repository
+    from app.utils.pricing import open_book
+
+    monkeypatch.setenv("DATA_MODE", "test")
+    for account in (trader, other_user[0]):
+        memory_repository.add_user(account)
+    # The mark-to-market book is shared by both backends; start each test from an empty one.
+    open_book.reset()
+    yield request.param
+    open_book.reset()
+
+@pytest.fixture
+def client(trader, backend):
+    """TestClient signed in as `trader`, once per backend in BACKENDS."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app, headers=make_user(trader.email)[1])
+
+def pytest_generate_tests(metafunc):
+    # API tests run against every backend; tests that also read the database
+    # directly (or are marked sql_only) run against SQL only.
+    if "client" in metafunc.fixturenames:
+        sql_only = metafunc.definition.get_closest_marker("sql_only") or {"session", "query_budget"} & set(metafunc.fixturenames)
+        metafunc.parametrize("backend", ["sql"] if sql_only else BACKENDS, indirect=True)
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(n): fail the test if it runs more than n SQL statements (with the query_budget fixture)")
+    config.addinivalue_line("markers", "sql_only: run a `client` test against the SQL backend only")
+
+class QueryBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+@pytest.fixture
+def query_budget(request):
+    """Statements run on any engine during the test; fails the test when there are more than
+    ``@pytest.mark.query_budget(n)`` allows. Assign ``query_budget.limit`` to set it inline."""
+    from app.db.session import async_engine, async_read_engine
+    from app.utils.profiler import capture_queries
+
+    marker = request.node.get_closest_marker("query_budget")
+    budget = QueryBudget(marker.args[0] if marker else None)
+    with capture_queries([engine, async_engine.sync_engine, async_read_engine.sync_engine]) as budget.statements:
+        yield budget
+    if budget.limit is not None and len(budget.statements) > budget.limit:
+        listing = "\n".join(f"  {statement}" for statement in budget.statements)
+        pytest.fail(f"{len(budget.statements)} SQL statements exceed the budget of {budget.limit}:\n{listing}", pytrace=False)
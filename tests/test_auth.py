@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlmodel import select
 from app.main import app
 
 client = TestClient(app)
@@ -34,3 +35,92 @@ def test_login_invalid():
     response = client.post("/api/v1/auth/login", json=payload)
     assert response.status_code == 401
     assert response.json()["detail"] == "Invalid credentials"
+
+def test_login_rehashes_outdated_password_hash(session):
+    from passlib.context import CryptContext
+    from app.models.user import User
+
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("rehashme123")
+    session.add(User(name="Old Hash", email="oldhash@example.com", hashed_password=old_hash))
+    session.commit()
+
+    response = client.post("/api/v1/auth/login", json={"email": "oldhash@example.com", "password": "rehashme123"})
+    assert response.status_code == 200
+    session.expire_all()
+    user = session.exec(select(User).where(User.email == "oldhash@example.com")).one()
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith("$2b$04$")
+
+    response = client.post("/api/v1/auth/login", json={"email": "oldhash@example.com", "password": "rehashme123"})
+    assert response.status_code == 200
+
+def test_password_pool_runs_off_loop_and_rejects_overflow():
+    import asyncio
+    import threading
+    from app.utils.security import PasswordWorkerPool, PasswordPoolBusy
+
+    pool = PasswordWorkerPool(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordPoolBusy):
+            await pool.run(threading.get_ident)
+        release.set()
+        await first
+        return await pool.run(threading.get_ident)
+
+    worker_thread = asyncio.run(scenario())
+    assert worker_thread != threading.get_ident()
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["pending"] == 0
+
+def test_password_pool_stats_endpoint(monkeypatch):
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", "s3cret")
+    for path in ("password_pool", "token_cache", "stream", "prices"):
+        assert client.get(f"/api/v1/system/{path}").status_code == 403
+    response = client.get("/api/v1/system/password_pool", headers={"X-Debug-Token": "s3cret"})
+    assert response.status_code == 200
+    assert {"workers", "pending", "completed", "queue_seconds_avg"} <= response.json().keys()
+
+def test_current_user_served_from_token_cache():
+    from app.utils.token_cache import token_cache
+
+    payload = {"name": "Cache User", "email": "cacheuser@example.com", "password": "cachepass123"}
+    token = client.post("/api/v1/auth/signup", json=payload).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    before = token_cache.stats()
+    assert client.get("/api/v1/auth/me", headers=headers).json()["email"] == payload["email"]
+    assert client.get("/api/v1/auth/me", headers=headers).json()["email"] == payload["email"]
+    after = token_cache.stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+    token_cache.invalidate_user(payload["email"])
+    client.get("/api/v1/auth/me", headers=headers)
+    assert token_cache.stats()["misses"] == after["misses"] + 1
+
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    assert client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {tampered}"}).status_code == 401
+
+def test_token_cache_expiry_and_eviction():
+    import time
+    from app.utils.token_cache import TokenCache, UserSnapshot
+
+    cache = TokenCache(max_size=2, ttl=60)
+    user = UserSnapshot(id=1, name="A", email="a@example.com", created_at=None)
+    cache.put("h.p.expired", {"exp": time.time() - 1}, user)
+    assert cache.get("h.p.expired") is None
+    cache.put("h.p.one", {"exp": time.time() + 60}, user)
+    cache.put("h.p.two", {"exp": time.time() + 60}, user)
+    cache.put("h.p.three", {"exp": time.time() + 60}, user)
+    assert cache.get("h.p.one") is None
+    assert cache.get("h.p.three")[1] == user
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("x.y.three") is None
@@ -0,0 +1,22 @@
+from datetime import datetime
+from conftest import make_user
+
+def test_claim_assigns_ownerless_trades(session, capsys):
+    from app.crud.stats import check_rollup, get_data_version
+    from app.models.trade import Trade, TradeDirection, TradeStatus
+    from app.utils.claim import main, orphan_count
+
+    owner, _ = make_user("claimant@example.com")
+    session.add(Trade(pair="EUR/USD", direction=TradeDirection.BUY, entry_price=1.1, exit_price=1.2, position_size=1.0,
+                      result_usd=0.1, status=TradeStatus.CLOSED, opened_at=datetime(2020, 1, 1), closed_at=datetime(2020, 1, 2)))
+    session.commit()
+    assert orphan_count(session) >= 1
+    version = get_data_version(session, owner.id)
+
+    assert main([]) == 0 and "have no owner" in capsys.readouterr().out
+    assert main(["--owner", "987654"]) == 1
+    assert main(["--owner", str(owner.id)]) == 0
+    session.expire_all()
+    assert orphan_count(session) == 0
+    assert get_data_version(session, owner.id) == version + 1
+    assert check_rollup(session, owner.id) == {}
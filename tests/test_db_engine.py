@@ -0,0 +1,70 @@
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+def test_sqlite_connections_get_tuning_pragmas():
+    from app.core.config import get_settings
+    from app.db.session import engine
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == get_settings().SQLITE_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -get_settings().SQLITE_CACHE_SIZE_KB
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 0
+
+def test_read_only_engine_refuses_writes(tmp_path):
+    from app.db.session import create_db_engine
+
+    url = f"sqlite:///{tmp_path / 'ro.db'}"
+    with create_db_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE note (body TEXT)"))
+    with create_db_engine(url, read_only=True).connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM note")).scalar() == 0
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO note VALUES ('x')"))
+
+def test_immediate_writers_wait_for_the_lock(tmp_path, monkeypatch):
+    """Read-then-write transactions from many threads all commit instead of failing with "database is locked"."""
+    from app.core.config import get_settings
+    from app.db.session import create_db_engine
+
+    monkeypatch.setattr(get_settings(), "SQLITE_BEGIN", "IMMEDIATE")
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'rw.db'}")
+    with db_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (value INTEGER)"))
+        conn.execute(text("INSERT INTO counter VALUES (0)"))
+
+    errors = []
+
+    def writer():
+        try:
+            for _ in range(20):
+                with db_engine.begin() as conn:
+                    value = conn.execute(text("SELECT value FROM counter")).scalar()
+                    conn.execute(text("UPDATE counter SET value = :value"), {"value": value + 1})
+        except OperationalError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT value FROM counter")).scalar() == 8 * 20
+
+def test_server_engines_get_pool_settings(monkeypatch):
+    from app.core.config import get_settings
+    from app.db.session import engine_options
+
+    monkeypatch.setattr(get_settings(), "DB_POOL_SIZE", 7)
+    options = engine_options("postgresql://db/journal")
+    assert options["pool_size"] == 7 and options["pool_pre_ping"] is get_settings().DB_POOL_PRE_PING
+    assert options["pool_recycle"] == get_settings().DB_POOL_RECYCLE_SECONDS
+    assert engine_options("postgresql://db/journal", read_only=True, is_async=True)["connect_args"] == {
+        "server_settings": {"default_transaction_read_only": "on"}
+    }
+    assert "pool_size" not in engine_options("sqlite:///journal.db")
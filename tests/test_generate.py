@@ -0,0 +1,32 @@
+import pytest
+from datetime import datetime, timedelta
+
+def test_generated_trades_are_consistent(session):
+    from sqlmodel import select
+    from app.models.trade import Trade, TradeStatus
+    from app.crud.stats import check_rollup
+    from app.utils.generate import ensure_users, generate_trades, refresh_users
+    from app.utils.trading import compute_result_usd, compute_risk_reward
+
+    user_ids = ensure_users(2, "generated{n}@example.com")
+    assert ensure_users(2, "generated{n}@example.com") == user_ids
+    start = datetime(2022, 1, 3)
+    assert generate_trades(3000, user_ids, ["EUR/USD", "XAU/USD"], start, days=60, open_ratio=0.05, seed=1, batch_size=1000) == 3000
+    refresh_users(user_ids)
+
+    trades = session.exec(select(Trade).where(Trade.user_id.in_(user_ids)).order_by(Trade.id)).all()
+    assert len(trades) == 3000 and {t.user_id for t in trades} == set(user_ids)
+    assert {t.pair for t in trades} == {"EUR/USD", "XAU/USD"}
+    assert [t.opened_at for t in trades] == sorted(t.opened_at for t in trades)
+    assert all(start <= t.opened_at <= start + timedelta(days=60) and t.opened_at.weekday() < 5 for t in trades)
+
+    open_trades = [t for t in trades if t.status == TradeStatus.OPEN]
+    assert 100 < len(open_trades) < 200
+    assert all(t.exit_price is None and t.closed_at is None and t.result_usd is None for t in open_trades)
+    assert min(t.opened_at for t in open_trades) >= start + timedelta(days=60 - 7)
+    for trade in trades[:200]:
+        if trade.status == TradeStatus.CLOSED:
+            assert trade.closed_at > trade.opened_at
+            assert trade.result_usd == pytest.approx(compute_result_usd(trade), abs=0.01)
+        assert trade.risk_reward == pytest.approx(compute_risk_reward(trade), abs=0.01)
+    assert all(check_rollup(session, user_id) == {} for user_id in user_ids)
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from conftest import make_user
+
+PAIRS = ["EUR/USD", "GBP/USD", "BTC/USD", "USD/JPY"]
+
+def journal_records(count: int = 60):
+    """The same deterministic journal for both repositories, with fixed timestamps."""
+    start = datetime(2024, 1, 1, 8)
+    records = []
+    for i in range(count):
+        pair = PAIRS[i % len(PAIRS)]
+        entry = 27000.0 if pair == "BTC/USD" else 150.0 if pair == "USD/JPY" else 1.1
+        step = entry * 0.002
+        direction = "BUY" if i % 3 else "SELL"
+        sign = 1 if direction == "BUY" else -1
+        opened_at = start + timedelta(hours=7 * i)
+        record = {
+            "pair": pair, "direction": direction, "entry_price": entry, "position_size": 1.0 + i % 5,
+            "stop_loss": entry - sign * step, "take_profit": entry + sign * 2 * step,
+            "opened_at": opened_at.isoformat(), "notes": f"trade {i}",
+        }
+        if i % 6:
+            record["exit_price"] = entry + sign * step * ((i * 7) % 5 - 2)
+            record["closed_at"] = (opened_at + timedelta(hours=i % 30 + 1)).isoformat()
+        records.append(record)
+    return records
+
+def without_ids(trades: list):
+    return [{k: v for k, v in trade.items() if k not in ("id", "created_at", "updated_at")} for trade in trades]
+
+@pytest.fixture
+def memory_client(monkeypatch):
+    """TestClient for a fresh DATA_MODE=test journal held by the in-memory repository."""
+    from fastapi.testclient import TestClient
+    from app.crud.memory import memory_repository
+    from app.main import app
+    from app.models.user import User
+    from app.utils.pricing import open_book
+    from app.utils.security import create_access_token, get_password_hash
+    from app.utils.token_cache import token_cache
+
+    monkeypatch.setenv("DATA_MODE", "test")
+    memory_repository.clear()
+    # An id no SQL account has, since the mark-to-market book is shared.
+    memory_repository.add_user(User(id=10_000, name="memory", email="memory@example.com", hashed_password=get_password_hash("password123")))
+    yield TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'memory@example.com'})}"})
+    memory_repository.clear()
+    token_cache.clear()
+    open_book.reset(10_000)
+
+@pytest.fixture
+def sql_client():
+    """TestClient for a fresh journal in the database (real mode)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    _, headers = make_user(f"sql-parity-{datetime.utcnow().timestamp()}@example.com")
+    return TestClient(app, headers=headers)
+
+def import_journal(client):
+    body = "\n".join(json.dumps(record) for record in journal_records())
+    report = client.post("/api/v1/trades/import?format=ndjson", content=body).json()
+    assert report == {"imported": 60, "failed": 0, "errors": [], "errors_truncated": False}
+
+def test_memory_mode_runs_no_sql(memory_client, query_budget):
+    query_budget.limit = 0
+    created = memory_client.post("/api/v1/trades/", json={"pair": "EUR/USD", "direction": "BUY", "entry_price": 1.1, "position_size": 1.0})
+    assert created.status_code == 200
+    assert memory_client.get(f"/api/v1/trades/{created.json()['id']}").json()["pair"] == "EUR/USD"
+    assert [t["id"] for t in memory_client.get("/api/v1/trades/").json()] == [created.json()["id"]]
+    assert memory_client.get("/api/v1/stats/summary").json()["open_trades"] == 1
+    assert memory_client.get("/api/v1/auth/me").json()["email"] == "memory@example.com"
+    assert memory_client.get("/api/v1/trades/999").status_code == 404
+
+def test_memory_repository_matches_sql(memory_client, sql_client, monkeypatch):
+    # DATA_MODE picks the repository per request, so set it before each client's calls.
+    backends = {"test": memory_client, "real": sql_client}
+
+    def each_backend():
+        for mode, client in backends.items():
+            monkeypatch.setenv("DATA_MODE", mode)
+            yield client
+
+    for client in each_backend():
+        import_journal(client)
+
+    def responses(client):
+        pages, cursor = [], None
+        while True:
+            page = client.get("/api/v1/trades/", params={"pair": "EUR/USD", "limit": 4, **({"cursor": cursor} if cursor else {})})
+            pages.append(without_ids(page.json()))
+            cursor = page.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        columnar = client.get("/api/v1/trades/", params={"format": "columnar", "status": "CLOSED"}).json()
+        for column in ("id", "created_at", "updated_at"):
+            columnar.pop(column)
+        export = list(csv.DictReader(io.StringIO(client.get("/api/v1/trades/export", params={"start_date": "2024-01-05T00:00:00"}).text)))
+        return {
+            "list": without_ids(client.get("/api/v1/trades/").json()),
+            "pages": pages,
+            "columnar": columnar,
+            # SQLite stores -0.0 as 0.0; the values are equal, only the CSV text differs.
+            "export": without_ids([{k: "0.0" if v == "-0.0" else v for k, v in row.items()} for row in export]),
+            "summary": client.get("/api/v1/stats/summary").json(),
+            "equity": client.get("/api/v1/stats/equity_curve").json(),
+            "equity_daily": client.get("/api/v1/stats/equity_curve", params={"resolution": "day", "from": "2024-01-03T00:00:00"}).json(),
+            "breakdown": client.get("/api/v1/stats/breakdown", params={"by": "pair,weekday"}).json(),
+            "advanced": client.get("/api/v1/stats/advanced").json(),
+            "monte_carlo": client.get("/api/v1/stats/monte_carlo", params={"paths": 50, "seed": 7}).json(),
+        }
+
+    memory, sql = [responses(client) for client in each_backend()]
+    # Rollups are summed in a different order, so totals agree to rounding.
+    assert memory.pop("summary") == pytest.approx(sql.pop("summary"))
+    assert memory == sql
+
+    for client in each_backend():
+        trades = client.get("/api/v1/trades/").json()
+        open_ids = [t["id"] for t in trades if t["status"] == "OPEN"]
+        client.put(f"/api/v1/trades/{trades[1]['id']}", json={"notes": "edited", "exit_price": 1.2})
+        client.delete(f"/api/v1/trades/{trades[2]['id']}")
+        report = client.patch("/api/v1/trades/close", json=[{"id": open_ids[0], "exit_price": 1.12}, {"id": trades[2]["id"], "exit_price": 1.0}]).json()
+        assert report["skipped"] == [trades[2]["id"]]
+        assert len(client.patch("/api/v1/trades/close", json={"BTC/USD": 27100.0}).json()["closed"]) == 5
+        assert client.patch(f"/api/v1/trades/{open_ids[0]}/close", params={"exit_price": 1.3}).status_code == 404
+        assert client.get(f"/api/v1/trades/{trades[2]['id']}").status_code == 404
+
+    # Closing stamps the current time; everything else must still agree.
+    def after(client):
+        result = responses(client)
+        for trade in result["list"]:
+            trade.pop("closed_at")
+        return {key: result[key] for key in ("list", "summary", "breakdown")}
+
+    memory, sql = [after(client) for client in each_backend()]
+    assert memory["list"] == sql["list"]
+    assert memory["summary"] == pytest.approx(sql["summary"])
+    assert [{k: v for k, v in row.items() if k != "weekday"} for row in memory["breakdown"]] == \
+        [{k: v for k, v in row.items() if k != "weekday"} for row in sql["breakdown"]]
+
+def test_set_mode_test_keeps_signed_in_user(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.config import get_settings
+    from app.crud.memory import memory_repository
+    from app.main import app
+
+    monkeypatch.setenv("DATA_MODE", "real")
+    monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", "s3cret")
+    account, headers = make_user("mode-switch@example.com")
+    client = TestClient(app, headers=headers)
+    client.post("/api/v1/trades/", json={"pair": "EUR/USD", "direction": "BUY", "entry_price": 1.1, "position_size": 1.0})
+    operator = {"X-Debug-Token": "s3cret"}
+    try:
+        assert client.post("/api/v1/system/mode", json={"mode": "test"}).status_code == 403
+        assert TestClient(app).post("/api/v1/system/mode", json={"mode": "test"}).status_code == 403
+        assert client.get("/api/v1/system/mode").json() == {"mode": "real"}
+        assert client.post("/api/v1/system/mode", json={"mode": "test"}, headers=operator).json() == {"mode": "test"}
+        assert client.get("/api/v1/auth/me").json()["id"] == account.id
+        assert client.get("/api/v1/trades/").json() == []
+        assert client.post("/api/v1/system/mode", json={"mode": "real"}).status_code == 403
+    finally:
+        client.post("/api/v1/system/mode", json={"mode": "real"}, headers=operator)
+        memory_repository.clear()
+    assert len(client.get("/api/v1/trades/").json()) == 1
+
+@pytest.mark.sql_only
+def test_set_mode_test_is_closed_without_debug_token(client, monkeypatch):
+    from app.core.config import get_settings
+
+    monkeypatch.setenv("DATA_MODE", "real")
+    monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", "")
+    assert client.post("/api/v1/system/mode", json={"mode": "test"}, headers={"X-Debug-Token": ""}).status_code == 404
+    assert client.post("/api/v1/system/mode", json={"mode": "real"}).json() == {"mode": "real"}
+
+def test_repositories_implement_every_method():
+    from app.crud.memory import MemoryRepository
+    from app.crud.repository import Repository, SQLRepository
+
+    assert not MemoryRepository.__abstractmethods__ and not SQLRepository.__abstractmethods__
+
+    class Partial(Repository):
+        async def get_trade(self, user_id, trade_id):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
@@ -0,0 +1,38 @@
+import pytest
+
+def scrape(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    return dict(line.rsplit(" ", 1) for line in response.text.splitlines() if not line.startswith("#"))
+
+@pytest.mark.sql_only
+def test_metrics_report_route_latency_size_and_db_cost(client):
+    payload = {"pair": "METRIC/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+    trade_id = client.post("/api/v1/trades/", json=payload).json()["id"]
+    labels = 'method="GET",route="/api/v1/trades/{trade_id}",status="200"'
+    before = float(scrape(client).get(f"http_request_duration_seconds_count{{{labels}}}", 0))
+
+    client.get(f"/api/v1/trades/{trade_id}")
+    client.get(f"/api/v1/trades/{trade_id + 1000}")
+    series = scrape(client)
+    assert float(series[f"http_request_duration_seconds_count{{{labels}}}"]) == before + 1
+    assert float(series[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}']) == before + 1
+    assert float(series[f"http_request_db_queries_sum{{{labels}}}"]) >= 1
+    assert float(series[f"http_request_db_seconds_sum{{{labels}}}"]) > 0
+    assert float(series[f"http_response_size_bytes_sum{{{labels}}}"]) > 0
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/trades/{trade_id}",status="404"}' in series
+    assert float(series['http_requests_in_flight{method="GET"}']) >= 1  # the scrape itself
+
+def test_histogram_renders_cumulative_buckets():
+    from app.utils.metrics import Histogram
+
+    histogram = Histogram("job_seconds", "Job time.", ("queue",), buckets=(1, 2))
+    for value in (0.5, 1.5, 5, 1):
+        histogram.observe(value, 'a"b')
+    assert histogram.render() == [
+        'job_seconds_bucket{queue="a\\"b",le="1"} 2',
+        'job_seconds_bucket{queue="a\\"b",le="2"} 3',
+        'job_seconds_bucket{queue="a\\"b",le="+Inf"} 4',
+        'job_seconds_sum{queue="a\\"b"} 8.0',
+        'job_seconds_count{queue="a\\"b"} 4',
+    ]
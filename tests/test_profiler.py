@@ -0,0 +1,58 @@
+import pytest
+
+NEW_TRADE = {"pair": "PROF/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+
+def test_repeated_lookups_in_one_request_are_flagged(client, session, trader):
+    from app.crud.trade import get_trade
+    from app.utils.profiler import query_profiler
+
+    query_profiler.clear()
+    with query_profiler.request("GET /loop"):
+        for trade_id in range(10_000, 10_000 + query_profiler.repeat_threshold + 2):
+            get_trade(session, trader.id, trade_id)
+    with query_profiler.request("GET /once"):
+        get_trade(session, trader.id, 20_000)
+
+    [entry] = query_profiler.report()["repeated_statements"]
+    assert entry["request"] == "GET /loop"
+    assert entry["count"] == query_profiler.repeat_threshold + 2
+    assert entry["caller"].startswith("app.crud.trade.get_trade:")
+    assert "FROM trade WHERE trade.id = ?" in entry["statement"]
+
+def test_slow_statements_are_logged_with_caller_and_plan(client, session, trader, monkeypatch):
+    from app.crud.trade import get_trades
+    from app.utils.profiler import query_profiler
+
+    query_profiler.clear()
+    monkeypatch.setattr(query_profiler, "slow_ms", 0)
+    get_trades(session, trader.id, pair="EUR/USD", limit=5)
+    monkeypatch.undo()
+
+    entry = next(e for e in query_profiler.report()["slow_queries"] if e["caller"] and "get_trades" in e["caller"])
+    assert entry["statement"].startswith("SELECT") and str(trader.id) in entry["parameters"]
+    assert any("ix_trade_user_pair_opened_at_id" in step for step in entry["plan"])
+
+def test_debug_endpoint_requires_token(client, monkeypatch):
+    from app.core.config import get_settings
+
+    assert client.get("/api/v1/system/queries").status_code == 404
+    monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", "s3cret")
+    assert client.get("/api/v1/system/queries").status_code == 403
+    assert client.get("/api/v1/system/queries", headers={"X-Debug-Token": "wrong"}).status_code == 403
+    report = client.get("/api/v1/system/queries", headers={"X-Debug-Token": "s3cret"}).json()
+    assert set(report) >= {"slow_queries", "repeated_statements", "slow_query_ms", "repeat_threshold"}
+    cleared = client.delete("/api/v1/system/queries", headers={"X-Debug-Token": "s3cret"}).json()
+    assert cleared["slow_queries"] == [] and cleared["repeated_statements"] == []
+
+@pytest.mark.query_budget(3)
+def test_trade_read_stays_within_query_budget(client, query_budget):
+    query_budget.limit = None
+    trade_id = client.post("/api/v1/trades/", json=NEW_TRADE).json()["id"]
+    query_budget.statements.clear()
+    query_budget.limit = 3
+    # Data-version check and the trade itself.
+    assert client.get(f"/api/v1/trades/{trade_id}").status_code == 200
+
+@pytest.mark.query_budget(4)
+def test_trade_list_stays_within_query_budget(client, query_budget):
+    assert client.get("/api/v1/trades/?limit=20").status_code == 200
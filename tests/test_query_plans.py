@@ -0,0 +1,70 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from app.db.session import engine
+from app.crud.trade import get_trade, get_trades, close_trades
+from app.crud.stats import compute_rollup, get_breakdown, get_equity_curve, get_summary_stats, load_closed_trade_columns
+from app.models.trade import TradeStatus
+
+# Any SCAN of trade, even over an index, reads every user's rows; queries must SEARCH on user_id.
+TRADE_SCAN = re.compile(r"^SCAN trade\b")
+USER_ID = 1
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+def query_plan(statement, parameters):
+    raw = engine.raw_connection()
+    try:
+        rows = raw.cursor().execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    finally:
+        raw.close()
+    return [row[-1] for row in rows]
+
+CRUD_QUERIES = {
+    "get_trade": lambda s: get_trade(s, USER_ID, 1),
+    "get_trades": lambda s: get_trades(s, USER_ID, limit=50),
+    "get_trades_real_mode": lambda s: get_trades(s, USER_ID, limit=50, mode="real"),
+    "get_trades_by_pair": lambda s: get_trades(s, USER_ID, pair="EUR/USD", limit=50),
+    "get_trades_by_status": lambda s: get_trades(s, USER_ID, status=TradeStatus.OPEN, limit=50),
+    "get_trades_by_date": lambda s: get_trades(s, USER_ID, start_date=datetime(2020, 1, 1), end_date=datetime(2030, 1, 1)),
+    "get_trades_after_cursor": lambda s: get_trades(s, USER_ID, limit=50, after=(datetime(2020, 1, 1), 10)),
+    "get_summary_stats": lambda s: get_summary_stats(s, USER_ID),
+    "compute_rollup": lambda s: compute_rollup(s, USER_ID),
+    "get_equity_curve": lambda s: get_equity_curve(s, USER_ID),
+    "get_equity_curve_range": lambda s: get_equity_curve(s, USER_ID, start=datetime(2001, 1, 2), end=datetime(2030, 1, 1)),
+    "get_equity_curve_weekly": lambda s: get_equity_curve(s, USER_ID, resolution="week", max_points=10),
+    "get_breakdown": lambda s: get_breakdown(s, USER_ID, ["pair", "direction", "month"]),
+    "load_closed_trade_columns": lambda s: load_closed_trade_columns(s, USER_ID),
+    "close_trades": lambda s: close_trades(s, USER_ID, exits={10**9: 1.0}, prices={"NONE/USD": 1.0}),
+}
+
+@pytest.mark.parametrize("name", sorted(CRUD_QUERIES))
+def test_crud_query_seeks_on_user_id(session, name):
+    with captured_statements() as statements:
+        CRUD_QUERIES[name](session)
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(statement, parameters)
+        scans = [detail for detail in plan if TRADE_SCAN.match(detail)]
+        assert not scans, f"{name} scans trade across users:\n{statement}\n{plan}"
+
+def test_keyset_page_seeks_instead_of_scanning(session):
+    with captured_statements() as statements:
+        get_trades(session, USER_ID, limit=50, after=(datetime(2020, 1, 1), 10))
+    (statement, parameters), = statements
+    assert any(detail.startswith("SEARCH trade USING INDEX ix_trade_user_opened_at_id (user_id=?") for detail in query_plan(statement, parameters))
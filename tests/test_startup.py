@@ -0,0 +1,24 @@
+import subprocess
+import sys
+import pytest
+
+def test_importing_app_defers_engines_seed_and_crypto():
+    """Cold start: these are loaded on first use (or in the lifespan), not by `import app.main`."""
+    script = (
+        "import sys, app.main, app.db.session as db\n"
+        "print([name for name in ('passlib', 'jose', 'app.utils.seed') if name in sys.modules], 'engine' in vars(db))"
+    )
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", script], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[] False"
+
+@pytest.mark.sql_only
+def test_engines_are_created_once_and_instrumented(client):
+    from app.db import session as db
+    from app.utils.profiler import query_profiler
+
+    first = db.init_engines()
+    assert db.init_engines() == first and db.engine is first["engine"]
+    seen = []
+    db.on_engine_created(seen.append)
+    db._engine_hooks.remove(seen.append)
+    assert seen == [db.engine, db.async_engine.sync_engine, db.async_read_engine.sync_engine]
@@ -1,11 +1,7 @@
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-
-client = TestClient(app)
 
 # ---------- STATS ENDPOINTS ----------
-def test_stats_summary():
+def test_stats_summary(client):
     response = client.get("/api/v1/stats/summary")
     assert response.status_code == 200
     data = response.json()
@@ -14,7 +10,7 @@ def test_stats_summary():
     assert "avg_risk_reward" in data
     assert "total_profit" in data
 
-def test_stats_equity_curve():
+def test_stats_equity_curve(client):
     response = client.get("/api/v1/stats/equity_curve")
     assert response.status_code == 200
     curve = response.json()
@@ -22,3 +18,349 @@ def test_stats_equity_curve():
     if curve:
         assert "date" in curve[0]
         assert "equity" in curve[0]
+
+@pytest.mark.sql_only
+def test_stats_rollup_tracks_trade_writes(client, trader):
+    from sqlmodel import Session
+    from app.db.session import engine
+    from app.crud.stats import check_rollup, compute_rollup
+
+    before = client.get("/api/v1/stats/summary").json()
+    trade = {
+        "pair": "EUR/USD",
+        "direction": "BUY",
+        "entry_price": 1.1000,
+        "stop_loss": 1.0950,
+        "take_profit": 1.1100,
+        "position_size": 1000.0,
+    }
+    winner = client.post("/api/v1/trades/", json=trade).json()["id"]
+    loser = client.post("/api/v1/trades/", json=trade).json()["id"]
+    client.patch(f"/api/v1/trades/{winner}/close?exit_price=1.1050")
+    client.patch(f"/api/v1/trades/{loser}/close?exit_price=1.0980")
+
+    data = client.get("/api/v1/stats/summary").json()
+    assert data["total_trades"] == before["total_trades"] + 2
+    assert data["winning_trades"] == before["winning_trades"] + 1
+    assert data["losing_trades"] == before["losing_trades"] + 1
+    assert data["total_profit"] == pytest.approx(before["total_profit"] + 5.0 - 2.0)
+
+    client.put(f"/api/v1/trades/{loser}", json={"status": "OPEN"})
+    client.delete(f"/api/v1/trades/{winner}")
+    data = client.get("/api/v1/stats/summary").json()
+    assert data["total_trades"] == before["total_trades"]
+    assert data["total_profit"] == pytest.approx(before["total_profit"])
+
+    with Session(engine) as session:
+        assert check_rollup(session, trader.id) == {}
+        assert data["total_trades"] == compute_rollup(session, trader.id)["total_trades"]
+
+def test_stats_rollup_rebuild(session, trader):
+    from app.crud.stats import rebuild_rollup, check_rollup, get_summary_stats
+    from app.models.stats import StatsRollup
+
+    session.delete(session.get(StatsRollup, trader.id))
+    session.commit()
+    assert check_rollup(session, trader.id)
+    rollup = rebuild_rollup(session, trader.id)
+    assert check_rollup(session, trader.id) == {}
+    assert get_summary_stats(session, trader.id)["total_trades"] == rollup.total_trades
+
+def test_overall_rollup_tracks_every_users_writes(session, client, other_user):
+    from app.crud.stats import OVERALL_ROLLUP, check_rollup, get_overall_rollup, rebuild_rollup
+    from app.utils.rollup import main
+
+    before = rebuild_rollup(session, OVERALL_ROLLUP).total_trades
+    _, other_headers = other_user
+    trade = {"pair": "NZD/USD", "direction": "BUY", "entry_price": 0.6, "stop_loss": 0.59, "take_profit": 0.62, "position_size": 100.0}
+    for headers in ({}, other_headers):
+        created = client.post("/api/v1/trades/", json=trade, headers=headers).json()
+        client.patch(f"/api/v1/trades/{created['id']}/close", params={"exit_price": 0.61}, headers=headers)
+    deleted = client.post("/api/v1/trades/", json=trade).json()
+    client.patch(f"/api/v1/trades/{deleted['id']}/close", params={"exit_price": 0.59})
+    client.delete(f"/api/v1/trades/{deleted['id']}")
+
+    session.expire_all()
+    assert get_overall_rollup(session).total_trades == before + 2
+    assert check_rollup(session, OVERALL_ROLLUP) == {}
+    assert main(["check", "--user", str(OVERALL_ROLLUP)]) == 0
+
+def test_stats_breakdown(client):
+    trade = {
+        "pair": "AUD/USD",
+        "direction": "SELL",
+        "entry_price": 0.6600,
+        "stop_loss": 0.6650,
+        "take_profit": 0.6500,
+        "position_size": 1000.0,
+    }
+    for exit_price in (0.6550, 0.6620):
+        trade_id = client.post("/api/v1/trades/", json=trade).json()["id"]
+        client.patch(f"/api/v1/trades/{trade_id}/close?exit_price={exit_price}")
+    response = client.get("/api/v1/stats/breakdown?by=pair,direction,weekday")
+    assert response.status_code == 200
+    rows = [r for r in response.json() if r["pair"] == "AUD/USD"]
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["direction"] == "SELL"
+    assert 0 <= row["weekday"] <= 6
+    assert row["total_trades"] == 2
+    assert row["winning_trades"] == 1
+    assert row["win_rate"] == pytest.approx(50.0)
+    assert row["total_profit"] == pytest.approx(5.0 - 2.0)
+    assert row["expectancy"] == pytest.approx(1.5)
+
+def test_stats_breakdown_invalid_dimension(client):
+    response = client.get("/api/v1/stats/breakdown?by=pair,colour")
+    assert response.status_code == 400
+
+def test_breakdown_and_upserts_compile_for_postgresql():
+    from sqlalchemy.dialects import postgresql
+    from sqlmodel import select
+    from app.crud.stats import BREAKDOWN_DIMENSIONS, UPSERT_INSERTS
+    from app.models.stats import DataVersion
+
+    sql = str(select(*(expr.label(dim) for dim, expr in BREAKDOWN_DIMENSIONS.items())).compile(dialect=postgresql.dialect()))
+    assert "strftime" not in sql.lower() and "EXTRACT(dow" in sql and "to_char(" in sql
+    upsert = UPSERT_INSERTS["postgresql"](DataVersion).values(user_id=1, version=1)
+    assert "ON CONFLICT (user_id)" in str(upsert.on_conflict_do_update(index_elements=["user_id"], set_={"version": 2}).compile(dialect=postgresql.dialect()))
+
+def test_stats_equity_curve_range_resolution_and_drawdown(client, session, trader):
+    from datetime import datetime, timedelta
+    from app.models.trade import Trade, TradeStatus
+    from app.crud.stats import rebuild_rollup
+
+    start = datetime(2001, 1, 1, 12)
+    for day, pnl in enumerate([100.0, -50.0, -80.0, 200.0, 10.0]):
+        session.add(Trade(
+            user_id=trader.id, pair="NZD/USD", direction="BUY", entry_price=1.0, position_size=1.0,
+            result_usd=pnl, status=TradeStatus.CLOSED,
+            opened_at=start + timedelta(days=day), closed_at=start + timedelta(days=day, hours=1),
+        ))
+    session.commit()
+    rebuild_rollup(session, trader.id)
+
+    params = {"from": "2001-01-02T00:00:00", "to": "2001-01-31T00:00:00"}
+    curve = client.get("/api/v1/stats/equity_curve", params=params).json()
+    assert [p["balance"] for p in curve] == [50.0, -30.0, 170.0, 180.0]
+    assert [p["peak"] for p in curve] == [100.0, 100.0, 170.0, 180.0]
+    assert [p["drawdown"] for p in curve] == [-50.0, -130.0, 0.0, 0.0]
+
+    weekly = client.get("/api/v1/stats/equity_curve", params={**params, "resolution": "week"}).json()
+    assert [p["date"] for p in weekly] == ["2001-01-01"]
+    assert weekly[0]["balance"] == 180.0
+
+    sampled = client.get("/api/v1/stats/equity_curve", params={**params, "max_points": 3}).json()
+    assert [p["balance"] for p in sampled] == [50.0, -30.0, 180.0]
+
+    assert client.get("/api/v1/stats/equity_curve?resolution=hourly").status_code == 400
+
+def test_closed_columns_put_null_close_times_first_on_every_dialect(session, monkeypatch):
+    from datetime import datetime
+    from conftest import make_user
+    from sqlalchemy.dialects import postgresql
+    from app.models.trade import Trade, TradeStatus
+    from app.crud.stats import equity_curve, load_closed_trade_columns
+
+    owner, _ = make_user(f"null-close-{datetime.utcnow().timestamp()}@example.com")
+    for closed_at, pnl in [(datetime(2001, 1, 2), 10.0), (None, 5.0), (datetime(2001, 1, 1), 20.0)]:
+        session.add(Trade(
+            user_id=owner.id, pair="NZD/USD", direction="BUY", entry_price=1.0, position_size=1.0,
+            result_usd=pnl, status=TradeStatus.CLOSED, opened_at=datetime(2000, 12, 31), closed_at=closed_at,
+        ))
+    session.commit()
+
+    statements, exec_ = [], session.exec
+    monkeypatch.setattr(session, "exec", lambda statement, **kw: statements.append(statement) or exec_(statement, **kw))
+    columns, _, _ = load_closed_trade_columns(session, owner.id)
+    assert "ORDER BY trade.closed_at ASC NULLS FIRST" in str(statements[0].compile(dialect=postgresql.dialect()))
+    assert columns["result_usd"].tolist() == [5.0, 20.0, 10.0]
+    curve = equity_curve(columns, start=datetime(2001, 1, 1, 12))
+    assert [p["balance"] for p in curve] == [30.0]
+
+def test_lttb_keeps_endpoints_and_extremes():
+    import numpy as np
+    from app.utils.timeseries import lttb_indices
+
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50.0)
+    y[500] = 5.0
+    kept = lttb_indices(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 500 in kept
+    assert np.all(np.diff(kept) > 0)
+
+def test_advanced_stats_vectorized_metrics():
+    import numpy as np
+    from app.utils.analytics import advanced_stats
+
+    closed_at = np.array(["2024-01-01T10", "2024-01-01T15", "2024-01-02T10", "2024-01-05T10", "2024-01-06T10", "2024-01-08T10"], dtype="datetime64[us]")
+    pnl = np.array([100.0, -50.0, -60.0, 30.0, 200.0, -20.0])
+    risk = np.array([50.0, 50.0, 60.0, np.nan, 100.0, 20.0])
+    stats = advanced_stats(closed_at, pnl, risk)
+
+    assert stats["total_trades"] == 6
+    assert stats["expectancy"] == pytest.approx(200.0 / 6)
+    assert stats["profit_factor"] == pytest.approx(330.0 / 130.0)
+    assert stats["trading_days"] == 5
+    assert stats["max_drawdown"] == pytest.approx(-110.0)
+    # Under water from the 2024-01-01 10:00 peak until the 2024-01-06 recovery.
+    assert stats["max_drawdown_duration_days"] == pytest.approx(5.0)
+    assert stats["max_drawdown_duration_trades"] == 3
+    assert stats["longest_win_streak"] == 2
+    assert stats["longest_loss_streak"] == 2
+    daily = np.array([50.0, -60.0, 30.0, 200.0, -20.0])
+    assert stats["sharpe_ratio"] == pytest.approx(daily.mean() / daily.std(ddof=1) * np.sqrt(252))
+    assert stats["r_multiple"]["count"] == 5
+    assert stats["r_multiple"]["mean"] == pytest.approx(np.mean([2.0, -1.0, -1.0, 2.0, -1.0]))
+    assert sum(stats["r_multiple"]["counts"]) == 5
+
+def test_stats_advanced_endpoint(client):
+    response = client.get("/api/v1/stats/advanced")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_trades"] == client.get("/api/v1/stats/summary").json()["total_trades"]
+    assert {"sharpe_ratio", "sortino_ratio", "max_drawdown", "longest_win_streak", "r_multiple"} <= data.keys()
+
+def test_monte_carlo_is_seeded_and_chunk_parallel_safe():
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+    from app.utils.montecarlo import simulate
+
+    samples = np.array([120.0, -80.0, -60.0, 250.0, -100.0, 40.0])
+    args = (samples, 300, 40, 7, 1000.0)
+    inline = simulate(*args, chunk_elements=40 * 64)
+    assert simulate(*args, chunk_elements=40 * 64) == inline
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert simulate(*args, chunk_elements=40 * 64, executor=executor) == inline
+    assert simulate(*args[:3], 8, 1000.0, chunk_elements=40 * 64) != inline
+
+    band = inline["bands"][-1]
+    assert inline["bands"][0]["trade"] == 0 and band["trade"] == 40
+    assert band["p5"] <= band["p50"] <= band["p95"]
+    assert inline["final_balance"]["p50"] == band["p50"]
+    assert inline["drawdown_at_confidence"]["max_drawdown"] <= inline["median_max_drawdown"] <= 0
+
+def test_monte_carlo_risk_of_ruin():
+    import numpy as np
+    from app.utils.montecarlo import simulate
+
+    losing = simulate(np.array([-100.0]), 50, 10, 1, 1000.0, ruin_fraction=0.5)
+    assert losing["risk_of_ruin"] == 1.0
+    assert losing["drawdown_at_confidence"]["max_drawdown"] == pytest.approx(-1000.0)
+    assert simulate(np.array([100.0]), 50, 10, 1, 1000.0)["risk_of_ruin"] == 0.0
+
+def test_stats_monte_carlo_endpoint(client):
+    params = {"paths": 200, "horizon": 30, "seed": 42}
+    response = client.get("/api/v1/stats/monte_carlo", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["paths"] == 200 and data["horizon"] == 30 and data["seed"] == 42
+    assert 0.0 <= data["risk_of_ruin"] <= 1.0
+    assert client.get("/api/v1/stats/monte_carlo", params=params).json() == data
+    assert client.get("/api/v1/stats/monte_carlo", params={"basis": "kelly"}).status_code == 400
+
+def test_snapshot_appends_on_close_and_invalidates_on_update(client, session, trader):
+    from app.crud.stats import closed_trade_columns
+    from app.utils.snapshot import trade_snapshot
+
+    count = len(closed_trade_columns(session, trader.id)["id"])
+    payload = {"pair": "CAD/JPY", "direction": "BUY", "entry_price": 100.0, "stop_loss": 99.0, "position_size": 2.0}
+    trade_id = client.post("/api/v1/trades/", json=payload).json()["id"]
+    client.patch(f"/api/v1/trades/{trade_id}/close?exit_price=101.5")
+
+    columns, meta = trade_snapshot.read(trader.id)
+    assert meta["count"] == count + 1
+    assert columns["id"][-1] == trade_id
+    assert meta["pairs"][columns["pair"][-1]] == "CAD/JPY"
+    assert columns["risk"][-1] == pytest.approx(2.0)
+
+    client.put(f"/api/v1/trades/{trade_id}", json={"notes": "edited"})
+    assert trade_snapshot.read(trader.id) is None
+    assert closed_trade_columns(session, trader.id)["id"][-1] == trade_id
+
+def test_snapshot_drops_out_of_order_append(tmp_path):
+    import numpy as np
+    from datetime import datetime
+    from app.utils.snapshot import ColumnarSnapshot, SNAPSHOT_COLUMNS
+
+    snapshot = ColumnarSnapshot(str(tmp_path))
+    assert not snapshot.append(1, {"id": [], "closed_at": []}, 1)
+    columns = {name: np.zeros(1, dtype=dtype) for name, dtype in SNAPSHOT_COLUMNS.items()}
+    columns["closed_at"][0] = np.datetime64("2024-01-02")
+    snapshot.write(1, columns, ["EUR/USD"], ["BUY"], 5)
+    row = {**dict.fromkeys(SNAPSHOT_COLUMNS, [1.0]), "id": [2], "pair": ["GBP/USD"], "direction": ["SELL"], "result_usd": [None]}
+    assert snapshot.append(1, {**row, "closed_at": [datetime(2024, 1, 3)]}, 6)
+    assert snapshot.advance(1, 7)
+    appended, meta = snapshot.read(1)
+    assert meta["count"] == 2 and meta["pairs"] == ["EUR/USD", "GBP/USD"] and meta["data_version"] == 7
+    assert np.isnan(appended["result_usd"][1]) and appended["direction"][1] == 1
+    assert not snapshot.append(1, {**row, "id": [3], "closed_at": [datetime(2024, 1, 1)]}, 8)
+    assert snapshot.read(1) is None
+
+    # Skipping a version means a write was never applied.
+    snapshot.write(1, columns, ["EUR/USD"], ["BUY"], 5)
+    assert not snapshot.append(1, {**row, "closed_at": [datetime(2024, 1, 3)]}, 7)
+    assert snapshot.read(1) is None
+
+def test_snapshot_rebuilds_after_write_with_same_row_count(client, session, trader):
+    from sqlmodel import update
+    from app.crud.stats import bump_data_version, closed_trade_columns
+    from app.models.trade import Trade
+
+    payload = {"pair": "NZD/CAD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+    trade_id = client.post("/api/v1/trades/", json=payload).json()["id"]
+    client.patch(f"/api/v1/trades/{trade_id}/close?exit_price=1.5")
+    assert closed_trade_columns(session, trader.id)["result_usd"][-1] == pytest.approx(0.5)
+
+    # A write outside app.crud that keeps the row count but bumps the version.
+    session.exec(update(Trade).where(Trade.id == trade_id).values(result_usd=9.0))
+    bump_data_version(session, trader.id)
+    session.commit()
+    assert closed_trade_columns(session, trader.id)["result_usd"][-1] == pytest.approx(9.0)
+
+def test_equity_curve_reads_snapshot_not_trade_table(session, trader):
+    from sqlalchemy import event
+    from app.db.session import engine
+    from app.crud.stats import get_advanced_stats, get_equity_curve
+
+    get_equity_curve(session, trader.id)
+    statements = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        get_equity_curve(session, trader.id, resolution="week")
+        get_advanced_stats(session, trader.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert statements and not any("FROM trade" in statement for statement in statements)
+
+@pytest.mark.sql_only
+def test_read_endpoints_revalidate_with_etag(client):
+    from sqlalchemy import event
+    from app.db.session import async_engine, async_read_engine
+
+    response = client.get("/api/v1/stats/summary")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get("/api/v1/stats/equity_curve", params={"resolution": "day"}).headers["ETag"] != etag
+
+    statements = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)
+    engines = [async_engine.sync_engine, async_read_engine.sync_engine]
+    for db_engine in engines:
+        event.listen(db_engine, "before_cursor_execute", capture)
+    try:
+        cached = client.get("/api/v1/stats/summary", headers={"If-None-Match": etag})
+    finally:
+        for db_engine in engines:
+            event.remove(db_engine, "before_cursor_execute", capture)
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert statements and not any("trade" in statement.lower() for statement in statements)
+
+    payload = {"pair": "ETAG/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+    client.post("/api/v1/trades/", json=payload)
+    refreshed = client.get("/api/v1/stats/summary", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.headers["ETag"] != etag
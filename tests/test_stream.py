@@ -0,0 +1,81 @@
+import asyncio
+import json
+import pytest
+from sqlmodel import Session
+from app.api.v1.routes.stream import stream_events
+from app.crud.trade import create_trade, close_trade, delete_trade
+from app.db.session import engine
+from app.schemas.trade import TradeCreate
+from app.utils.events import EventHub, StreamFull, event_hub
+
+def parse_event(chunk: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return {"id": int(fields["id"]), "type": fields["event"], "data": json.loads(fields["data"])}
+
+def test_hub_replaces_backlog_of_slow_subscriber_with_resync():
+    async def scenario():
+        hub = EventHub(max_queue=2, max_subscribers=1)
+        subscription = hub.subscribe()
+        with pytest.raises(StreamFull):
+            hub.subscribe()
+        for n in range(5):
+            hub.publish("trade", {"n": n})
+        assert subscription.queue.qsize() == 1
+        assert (await subscription.get()) == {"id": 5, "type": "resync", "data": {"reason": "overflow"}}
+        assert subscription.overflows == 2
+        hub.unsubscribe(subscription)
+        assert hub.stats()["subscribers"] == 0 and hub.stats()["overflows"] == 2
+
+    asyncio.run(scenario())
+
+def test_stream_pushes_committed_trade_changes(trader, other_user):
+    other = other_user[0]
+
+    def write_trades():
+        with Session(engine) as session:
+            # Another user's write must not reach this stream.
+            create_trade(session, other.id, TradeCreate(pair="SSE/USD", direction="SELL", entry_price=1.0, position_size=1.0))
+            trade = create_trade(session, trader.id, TradeCreate(pair="SSE/USD", direction="BUY", entry_price=1.0, position_size=10.0))
+            close_trade(session, trader.id, trade.id, 2.0)
+            delete_trade(session, trader.id, trade.id)
+            return trade.id
+
+    async def scenario():
+        response = await stream_events(trader)
+        body = response.body_iterator
+        assert (await body.__anext__()).startswith("retry:")
+        # Written from a worker thread, like the sync crud behind run_in_threadpool.
+        trade_id = await asyncio.to_thread(write_trades)
+        events = [parse_event(await asyncio.wait_for(body.__anext__(), 5)) for _ in range(3)]
+        await body.aclose()
+        return trade_id, events
+
+    trade_id, (created, closed, deleted) = asyncio.run(scenario())
+    assert [e["data"]["action"] for e in (created, closed, deleted)] == ["created", "closed", "deleted"]
+    assert created["id"] < closed["id"] < deleted["id"]
+    assert created["data"]["trade"]["id"] == trade_id and created["data"]["trade"]["status"] == "OPEN"
+    assert closed["data"]["trade"]["result_usd"] == 10.0
+    assert closed["data"]["equity_point"]["balance"] == closed["data"]["summary"]["total_profit"]
+    assert deleted["data"]["summary"]["total_trades"] == closed["data"]["summary"]["total_trades"] - 1
+    assert event_hub.stats()["subscribers"] == 0
+
+def test_stream_takes_only_stream_tokens_in_the_query(client, trader):
+    from fastapi.testclient import TestClient
+    from app.api.v1.deps import get_stream_user
+    from app.crud.repository import get_repository
+    from app.main import app
+
+    async def stream_user(stream_token):
+        async for repository in get_repository():
+            return await get_stream_user(None, stream_token, repository)
+
+    access_token = client.headers["Authorization"].removeprefix("Bearer ")
+    assert TestClient(app).get("/api/v1/stream", params={"access_token": access_token}).status_code == 401
+    assert TestClient(app).get("/api/v1/stream", params={"stream_token": access_token}).status_code == 401
+
+    issued = client.post("/api/v1/stream/token").json()
+    assert issued["expires_in"] == 60
+    assert asyncio.run(stream_user(issued["stream_token"])).id == trader.id
+    # A stream token is not a bearer token for the rest of the API.
+    headers = {"Authorization": f"Bearer {issued['stream_token']}"}
+    assert TestClient(app).get("/api/v1/auth/me", headers=headers).status_code == 401
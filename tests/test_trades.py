@@ -1,10 +1,6 @@
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
 
-client = TestClient(app)
-
-def test_create_trade():
+def test_create_trade(client):
     trade = {
         "pair": "EUR/USD",
         "direction": "BUY",
@@ -20,7 +16,259 @@ def test_create_trade():
     assert data["pair"] == "EUR/USD"
     assert data["direction"] == "BUY"
 
-def test_list_trades():
+def test_list_trades(client):
     response = client.get("/api/v1/trades/")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+def test_list_trades_cursor_pagination(client):
+    base = {"direction": "BUY", "entry_price": 1.0, "position_size": 1.0}
+    created = []
+    for pair in ["CAD/CHF", "XAU/USD", "CAD/CHF", "TEST/USD", "CAD/CHF", "CAD/CHF", "CAD/CHF"]:
+        resp = client.post("/api/v1/trades/", json={**base, "pair": pair})
+        if pair == "CAD/CHF":
+            created.append(resp.json()["id"])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"pair": "CAD/CHF", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/trades/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen += [t["id"] for t in page]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        assert len(page) == 2
+    assert seen == created
+    assert pages == 3
+
+@pytest.mark.sql_only
+def test_list_trades_real_mode_fills_page(client):
+    response = client.get("/api/v1/trades/", params={"limit": 3})
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page) == 3
+    assert all("XAU" not in t["pair"] and "TEST" not in t["pair"] for t in page)
+
+def test_list_trades_invalid_cursor(client):
+    response = client.get("/api/v1/trades/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_import_trades_csv_reports_bad_rows(client):
+    body = (
+        "pair,direction,entry_price,exit_price,stop_loss,take_profit,position_size,notes,opened_at\n"
+        'CHF/JPY,BUY,1.2000,1.2100,1.1900,1.2300,1000,"multi\nline note",2024-03-01T10:00:00\n'
+        "CHF/JPY,SELL,1.2000,,1.2100,1.1800,500,,\n"
+        "CHF/JPY,SIDEWAYS,1.2000,,,,1000,,\n"
+        "CHF/JPY,BUY,-1,,,,1000,,\n"
+    )
+    before = client.get("/api/v1/stats/summary").json()
+    response = client.post("/api/v1/trades/import", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 2
+    assert report["failed"] == 2
+    assert [e["row"] for e in report["errors"]] == [3, 4]
+
+    trades = client.get("/api/v1/trades/", params={"pair": "CHF/JPY"}).json()
+    closed = next(t for t in trades if t["status"] == "CLOSED")
+    assert closed["notes"] == "multi\nline note"
+    assert closed["result_usd"] == 10.0
+    assert closed["result_pips"] == 1.0
+    assert closed["risk_reward"] == 3.0
+    after = client.get("/api/v1/stats/summary").json()
+    assert after["total_trades"] == before["total_trades"] + 1
+    assert after["total_profit"] == pytest.approx(before["total_profit"] + 10.0)
+
+def test_import_trades_ndjson(client):
+    lines = [
+        '{"pair": "SGD/USD", "direction": "SELL", "entry_price": 0.74, "position_size": 100}',
+        "",
+        "{not json",
+        '{"pair": "SGD/USD", "direction": "BUY", "entry_price": 0.74, "exit_price": 0.75, "position_size": 100}',
+    ]
+    response = client.post("/api/v1/trades/import?format=ndjson", content="\n".join(lines))
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 2
+    assert report["errors"][0]["row"] == 2
+
+def test_import_trades_checks_times(client):
+    lines = [
+        '{"pair": "TZ/USD", "direction": "BUY", "entry_price": 1.0, "exit_price": 1.1, "position_size": 1, "opened_at": "2024-03-01T10:00:00+02:00", "closed_at": "2024-03-01T09:30:00+00:00"}',
+        '{"pair": "TZ/USD", "direction": "BUY", "entry_price": 1.0, "exit_price": 1.1, "position_size": 1, "closed_at": "2024-03-02T12:00:00"}',
+        '{"pair": "TZ/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1, "closed_at": "2024-03-02T12:00:00"}',
+        '{"pair": "TZ/USD", "direction": "BUY", "entry_price": 1.0, "exit_price": 1.1, "position_size": 1, "opened_at": "2024-03-03T12:00:00", "closed_at": "2024-03-03T11:00:00"}',
+    ]
+    report = client.post("/api/v1/trades/import?format=ndjson", content="\n".join(lines)).json()
+    assert report["imported"] == 2
+    assert [(e["row"], e["errors"]) for e in report["errors"]] == [
+        (3, ["closed_at: Value error, closed_at requires exit_price"]),
+        (4, ["closed_at: Value error, closed_at is before opened_at"]),
+    ]
+    trades = client.get("/api/v1/trades/", params={"pair": "TZ/USD"}).json()
+    assert [(t["opened_at"], t["closed_at"]) for t in trades] == [
+        ("2024-03-01T08:00:00", "2024-03-01T09:30:00"),
+        ("2024-03-02T12:00:00", "2024-03-02T12:00:00"),
+    ]
+
+def test_compute_results_batch_matches_scalar_helpers():
+    from types import SimpleNamespace
+    from app.utils.trading import compute_results_batch, compute_risk_reward, compute_result_pips, compute_result_usd
+
+    trades = [
+        SimpleNamespace(pair="EUR/USD", direction="BUY", entry_price=1.1, exit_price=1.1050, stop_loss=1.095, take_profit=1.11, position_size=1000),
+        SimpleNamespace(pair="BTC/USD", direction="SELL", entry_price=27000, exit_price=26500, stop_loss=27200, take_profit=26000, position_size=0.5),
+        SimpleNamespace(pair="EUR/USD", direction="BUY", entry_price=1.1, exit_price=None, stop_loss=None, take_profit=1.2, position_size=1),
+        SimpleNamespace(pair="EUR/USD", direction="SELL", entry_price=1.1, exit_price=1.2, stop_loss=1.1, take_profit=1.0, position_size=2),
+        # 665.175 is stored as 665.1749999...; both paths must give 665.18.
+        SimpleNamespace(pair="EUR/USD", direction="BUY", entry_price=1.357, exit_price=1.482, stop_loss=None, take_profit=None, position_size=5321.4),
+    ]
+    columns = [[getattr(t, f) for t in trades] for f in ("direction", "entry_price", "exit_price", "stop_loss", "take_profit", "position_size")]
+    for values, scalar in zip(compute_results_batch(*columns), (compute_risk_reward, compute_result_pips, compute_result_usd)):
+        assert [None if v != v else v for v in values.tolist()] == [scalar(t) for t in trades]
+
+def test_round_cents_halves_away_from_zero():
+    import numpy as np
+    from app.utils.trading import round_cents
+
+    values = [665.175, -665.175, 0.125, 2.675, 1.004999, 1.005, (1.482 - 1.357) * 5321.4, 123456789.125, 123456789.1245]
+    expected = [665.18, -665.18, 0.13, 2.68, 1.0, 1.01, 665.18, 123456789.13, 123456789.12]
+    assert round_cents(np.array(values)).tolist() == expected
+    assert [float(round_cents(v)) for v in values] == expected
+    assert np.isnan(round_cents(np.array([np.nan]))).all()
+
+def test_export_trades_csv_and_ndjson(client):
+    import csv
+    import io
+    import json
+
+    base = {"pair": "NOK/SEK", "direction": "BUY", "entry_price": 1.0, "position_size": 10.0, "notes": 'comma, "quote"'}
+    ids = [client.post("/api/v1/trades/", json=base).json()["id"] for _ in range(3)]
+    client.patch(f"/api/v1/trades/{ids[0]}/close?exit_price=1.5")
+
+    response = client.get("/api/v1/trades/export", params={"format": "csv", "pair": "NOK/SEK"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(r["id"]) for r in rows] == ids
+    assert rows[0]["status"] == "CLOSED" and rows[0]["direction"] == "BUY"
+    assert rows[0]["notes"] == base["notes"]
+    assert float(rows[0]["result_usd"]) == 5.0
+
+    response = client.get("/api/v1/trades/export", params={"format": "ndjson", "pair": "NOK/SEK", "status": "OPEN"})
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in records] == ids[1:]
+    listed = client.get("/api/v1/trades/", params={"pair": "NOK/SEK", "status": "OPEN"}).json()
+    assert records == listed
+
+def test_export_trades_invalid_format(client):
+    assert client.get("/api/v1/trades/export?format=xlsx").status_code == 400
+
+def test_close_trades_batch_by_id_and_by_pair(client):
+    def open_trade(pair, direction, entry, stop=None):
+        payload = {"pair": pair, "direction": direction, "entry_price": entry, "stop_loss": stop, "take_profit": None, "position_size": 100.0}
+        return client.post("/api/v1/trades/", json=payload).json()["id"]
+
+    summary = client.get("/api/v1/stats/summary").json()
+    first, second = open_trade("SEK/DKK", "BUY", 1.0, 0.9), open_trade("SEK/DKK", "SELL", 2.0)
+    response = client.patch("/api/v1/trades/close", json=[{"id": first, "exit_price": 1.5}, {"id": 10**9, "exit_price": 1.0}])
+    assert response.status_code == 200
+    report = response.json()
+    assert report["skipped"] == [10**9]
+    assert report["closed"] == [{"id": first, "exit_price": 1.5, "risk_reward": None, "result_pips": 50.0, "result_usd": 50.0}]
+
+    by_pair = client.patch("/api/v1/trades/close", json={"SEK/DKK": 1.5}).json()
+    assert [r["id"] for r in by_pair["closed"]] == [second]
+    assert by_pair["closed"][0]["result_usd"] == 50.0
+
+    closed = client.get(f"/api/v1/trades/{second}").json()
+    assert closed["status"] == "CLOSED" and closed["exit_price"] == 1.5 and closed["closed_at"]
+    after = client.get("/api/v1/stats/summary").json()
+    assert after["total_trades"] == summary["total_trades"] + 2
+    assert after["total_profit"] == pytest.approx(summary["total_profit"] + 100.0)
+    assert client.patch("/api/v1/trades/close", json={"SEK/DKK": -1}).status_code == 422
+
+def test_close_trades_counts_only_the_rows_it_closed(session, trader, monkeypatch):
+    from sqlmodel import Session
+    import app.crud.trade as crud
+    from app.crud.stats import check_rollup, closed_trade_columns, rebuild_rollup
+    from app.db.session import engine
+    from app.schemas.trade import TradeCreate
+
+    rebuild_rollup(session, trader.id)
+    opened = TradeCreate(pair="RACE2/USD", direction="BUY", entry_price=1.0, position_size=1.0)
+    raced, kept = (crud.create_trade(session, trader.id, opened).id for _ in range(2))
+    compute = crud.compute_results_batch
+
+    def close_raced_first(*args):
+        # Another request closes one of the trades between the lookup and the UPDATE.
+        with Session(engine) as other:
+            crud.close_trade(other, trader.id, raced, 3.0)
+        return compute(*args)
+
+    monkeypatch.setattr(crud, "compute_results_batch", close_raced_first)
+    results, skipped = crud.close_trades(session, trader.id, exits={raced: 2.0, kept: 2.0})
+    assert [r["id"] for r in results] == [kept] and skipped == [raced]
+    assert crud.get_trade(session, trader.id, raced).exit_price == 3.0
+    assert check_rollup(session, trader.id) == {}
+    assert closed_trade_columns(session, trader.id)["id"].tolist().count(raced) == 1
+
+def test_trades_and_stats_are_scoped_to_the_signed_in_user(client, other_user):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    anonymous = TestClient(app)
+    assert anonymous.get("/api/v1/trades/").status_code == 401
+    assert anonymous.get("/api/v1/stats/summary").status_code == 401
+    assert anonymous.post("/api/v1/trades/", json={"pair": "EUR/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}).status_code == 401
+
+    other = TestClient(app, headers=other_user[1])
+    before = other.get("/api/v1/stats/summary").json()
+    trade_id = client.post("/api/v1/trades/", json={"pair": "OWN/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0}).json()["id"]
+    client.patch(f"/api/v1/trades/{trade_id}/close?exit_price=2.0")
+    assert other.get(f"/api/v1/trades/{trade_id}").status_code == 404
+    assert other.put(f"/api/v1/trades/{trade_id}", json={"notes": "mine now"}).status_code == 404
+    assert other.delete(f"/api/v1/trades/{trade_id}").status_code == 404
+    assert other.patch("/api/v1/trades/close", json=[{"id": trade_id, "exit_price": 3.0}]).json()["skipped"] == [trade_id]
+    assert other.get("/api/v1/trades/", params={"pair": "OWN/USD"}).json() == []
+    assert other.get("/api/v1/stats/summary").json() == before
+    assert client.get(f"/api/v1/trades/{trade_id}").json()["exit_price"] == 2.0
+
+def test_list_trades_fast_path_matches_trade_read(client, session, trader):
+    from app.crud.trade import get_trades
+    from app.schemas.trade import TradeRead
+
+    client.post("/api/v1/trades/", json={"pair": "SER/USD", "direction": "SELL", "entry_price": 1.25, "position_size": 2.0, "notes": "é"})
+    expected = [TradeRead.model_validate(t, from_attributes=True).model_dump(mode="json") for t in get_trades(session, trader.id, pair="SER/USD")]
+    response = client.get("/api/v1/trades/", params={"pair": "SER/USD"})
+    assert response.headers["content-type"] == "application/json" and "ETag" in response.headers
+    assert response.json() == expected
+
+def test_list_trades_columnar(client):
+    rows = client.get("/api/v1/trades/", params={"limit": 3}).json()
+    response = client.get("/api/v1/trades/", params={"limit": 3, "format": "columnar"})
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] and response.headers["ETag"] != client.get("/api/v1/trades/?limit=3").headers["ETag"]
+    columns = response.json()
+    assert list(columns) == list(rows[0])
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+    assert client.get("/api/v1/trades/", params={"pair": "NONE/USD", "format": "columnar"}).json()["id"] == []
+    assert client.get("/api/v1/trades/", params={"format": "xml"}).status_code == 400
+
+def test_data_mode_filter_ignores_pair_case_on_every_dialect():
+    from sqlalchemy.dialects import postgresql
+    from sqlmodel import select
+    from app.crud.trade import filter_data_mode, pair_visible
+    from app.models.trade import Trade
+
+    for mode in ("real", "seed"):
+        sql = str(filter_data_mode(select(Trade.pair), mode).compile(dialect=postgresql.dialect()))
+        assert sql.count("LIKE") == sql.count("upper(trade.pair)") > 0
+    pairs = ["XAU/USD", "xau/usd", "EUR/USD", "test/usd"]
+    assert [pair for pair in pairs if pair_visible(pair, "real")] == ["EUR/USD"]
+    assert [pair for pair in pairs if pair_visible(pair, "seed")] == ["XAU/USD", "xau/usd"]
@@ -1,11 +1,7 @@
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-
-client = TestClient(app)
 
 # ---------- TRADE ENDPOINTS ----------
-def test_create_trade():
+def test_create_trade(client):
     trade = {
         "pair": "EUR/USD",
         "direction": "BUY",
@@ -23,12 +19,12 @@ def test_create_trade():
     assert data["status"] == "OPEN"
     return data["id"]
 
-def test_list_trades():
+def test_list_trades(client):
     response = client.get("/api/v1/trades/")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_get_trade():
+def test_get_trade(client):
     trade = {
         "pair": "GBP/USD",
         "direction": "SELL",
@@ -46,7 +42,7 @@ def test_get_trade():
     assert data["id"] == trade_id
     assert data["pair"] == "GBP/USD"
 
-def test_update_trade():
+def test_update_trade(client):
     trade = {
         "pair": "USD/JPY",
         "direction": "BUY",
@@ -71,7 +67,7 @@ def test_update_trade():
     assert data["exit_price"] == 111.00
     assert data["notes"] == "Updated trade"
 
-def test_close_trade():
+def test_close_trade(client):
     trade = {
         "pair": "BTC/USD",
         "direction": "SELL",
@@ -89,7 +85,7 @@ def test_close_trade():
     assert data["status"] == "CLOSED"
     assert data["exit_price"] == 26500.0
 
-def test_delete_trade():
+def test_delete_trade(client):
     trade = {
         "pair": "XAU/USD",
         "direction": "BUY",
@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from app.utils.pricing import OpenPositionBook, open_book
+from app.utils.pricefeed import PriceFeed, ReplayFeed, Tick, feed_from_url, parse_tick, run_feed
+
+def test_book_marks_open_trades_from_pair_aggregates():
+    book = OpenPositionBook()
+    book.open_trade(7, 99, "EUR/USD", "BUY", 1.0, 1.0)  # ignored until the user is loaded
+    book.load(7, [(1, "EUR/USD", "BUY", 1.10, 1000.0), (2, "eur/usd", "SELL", 1.20, 500.0), (3, "GBP/USD", "BUY", 1.30, 10.0)])
+    book.load(8, [(4, "EUR/USD", "BUY", 1.00, 1.0)])
+    assert book.snapshot(7)["unrealized_usd"] == 0.0 and book.snapshot(7)["priced_trades"] == 0
+
+    book.on_tick("EUR/USD", 1.15)
+    assert book.snapshot(8)["unrealized_usd"] == pytest.approx(0.15)
+    result = book.snapshot(7, include_trades=True)
+    assert result["open_trades"] == 3 and result["priced_trades"] == 2
+    assert result["unrealized_usd"] == pytest.approx(0.05 * 1000 + 0.05 * 500)
+    assert result["unrealized_pips"] == pytest.approx(5 + 5)
+    by_id = {trade["id"]: trade for trade in result["trades"]}
+    assert by_id[2]["unrealized_usd"] == pytest.approx(25.0) and by_id[3]["price"] is None
+
+    book.close_trades(7, [1, 1, 4, 42])
+    book.open_trade(7, 2, "EUR/USD", "SELL", 1.20, 1000.0)
+    assert book.snapshot(7)["unrealized_usd"] == pytest.approx(50.0)
+    assert book.snapshot(8)["open_trades"] == 1
+    book.close_trades(7, [2, 3])
+    assert book.snapshot(7) == {"open_trades": 0, "priced_trades": 0, "unrealized_usd": 0.0, "unrealized_pips": 0.0, "ticks": 0, "pairs": []}
+
+def test_replay_feed_applies_ticks(tmp_path):
+    path = tmp_path / "ticks.csv"
+    path.write_text('# pair,price\nEUR/USD,1.1\nbad line\n{"pair": "GBP/USD", "price": 1.3}\nEUR/USD,1.2\n')
+    assert parse_tick("EUR/USD,-1") is None and parse_tick("EUR/USD, 1.5") == Tick("EUR/USD", 1.5)
+    feed = feed_from_url(f"replay://{path}")
+    assert isinstance(feed, ReplayFeed) and not feed.loop
+    book = OpenPositionBook()
+    asyncio.run(run_feed(feed, book))
+    assert book.ticks == 3 and book._prices["EUR/USD"][0] == 1.2
+    with pytest.raises(ValueError):
+        feed_from_url("ftp://example.com")
+    with pytest.raises(TypeError):
+        PriceFeed()
+
+def test_unrealized_follows_trades_and_ticks(client):
+    trade = client.post("/api/v1/trades/", json={"pair": "MTM/USD", "direction": "SELL", "entry_price": 2.0, "position_size": 100.0}).json()
+    first = client.get("/api/v1/stats/unrealized")
+    assert first.status_code == 200
+    assert "MTM/USD" in [pair["pair"] for pair in first.json()["pairs"]]
+
+    open_book.on_tick("MTM/USD", 1.5)
+    assert client.get("/api/v1/stats/unrealized", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+    data = client.get("/api/v1/stats/unrealized", params={"trades": True}).json()
+    marked = next(row for row in data["trades"] if row["id"] == trade["id"])
+    assert marked["unrealized_usd"] == pytest.approx(50.0) and marked["unrealized_pips"] == pytest.approx(50.0)
+    summary = client.get("/api/v1/stats/summary").json()
+    assert summary["open_trades"] == data["open_trades"] and summary["unrealized_usd"] == pytest.approx(data["unrealized_usd"])
+
+    client.patch(f"/api/v1/trades/{trade['id']}/close", params={"exit_price": 1.5})
+    pairs = client.get("/api/v1/stats/unrealized").json()["pairs"]
+    assert "MTM/USD" not in [pair["pair"] for pair in pairs]
+
+def test_unrealized_etag_ignores_ticks_on_pairs_not_held(client, other_user):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client.post("/api/v1/trades/", json={"pair": "HELD/USD", "direction": "BUY", "entry_price": 1.0, "position_size": 1.0})
+    idle = TestClient(app, headers=other_user[1])
+    tags = {name: c.get("/api/v1/stats/summary").headers["ETag"] for name, c in (("trader", client), ("idle", idle))}
+
+    open_book.on_tick("OTHER/USD", 2.0)
+    for name, c in (("trader", client), ("idle", idle)):
+        assert c.get("/api/v1/stats/summary", headers={"If-None-Match": tags[name]}).status_code == 304
+    open_book.on_tick("held/usd", 1.1)
+    assert client.get("/api/v1/stats/summary", headers={"If-None-Match": tags["trader"]}).status_code == 200
+    assert idle.get("/api/v1/stats/summary", headers={"If-None-Match": tags["idle"]}).status_code == 304
+
+def test_open_positions_reloads_after_close_during_load(trader, monkeypatch):
+    from sqlmodel import Session
+    from app.crud.stats import open_positions
+    from app.crud.trade import create_trade, close_trade
+    from app.db.session import engine
+    from app.schemas.trade import TradeCreate
+
+    with Session(engine) as session:
+        trade = create_trade(session, trader.id, TradeCreate(pair="RACE/USD", direction="BUY", entry_price=1.0, position_size=1.0))
+    open_book.reset(trader.id)
+    load = open_book.load
+
+    def close_between_select_and_load(user_id, rows, version=None):
+        # Another request (or worker) closes the trade after the SELECT returned it.
+        monkeypatch.setattr(open_book, "load", load)
+        with Session(engine) as other:
+            close_trade(other, trader.id, trade.id, 1.5)
+        load(user_id, rows, version)
+
+    monkeypatch.setattr(open_book, "load", close_between_select_and_load)
+    with Session(engine) as session:
+        assert trade.id in open_positions(session, trader.id)._trades[trader.id]
+    with Session(engine) as session:
+        assert trade.id not in open_positions(session, trader.id)._trades[trader.id]
+
+def test_open_positions_sees_writes_from_another_worker(trader):
+    from sqlmodel import Session
+    from app.crud.stats import bump_data_version, open_positions
+    from app.db.session import engine
+    from app.models.trade import Trade
+
+    with Session(engine) as session:
+        open_positions(session, trader.id)
+    # A second process writes the trade; this process's book is never told about it.
+    with Session(engine) as session:
+        trade = Trade(user_id=trader.id, pair="WORKER/USD", direction="BUY", entry_price=1.0, position_size=1.0)
+        session.add(trade)
+        bump_data_version(session, trader.id)
+        session.commit()
+        session.refresh(trade)
+    with Session(engine) as session:
+        assert trade.id in open_positions(session, trader.id)._trades[trader.id]
+
+def test_open_positions_follow_own_writes_without_reloading(trader, monkeypatch):
+    from sqlmodel import Session
+    from app.crud.stats import open_positions
+    from app.crud.trade import create_trade, close_trade, close_trades, delete_trade
+    from app.db.session import engine
+    from app.schemas.trade import TradeCreate
+
+    with Session(engine) as session:
+        open_positions(session, trader.id)
+    loads = []
+    monkeypatch.setattr(open_book, "load", lambda *args: loads.append(args))
+    opened = TradeCreate(pair="OWN/USD", direction="BUY", entry_price=1.0, position_size=1.0)
+    with Session(engine) as session:
+        first, second, third = (create_trade(session, trader.id, opened).id for _ in range(3))
+        delete_trade(session, trader.id, first)
+        close_trade(session, trader.id, second, 1.5)
+        close_trades(session, trader.id, exits={third: 1.5})
+        fourth = create_trade(session, trader.id, opened).id
+        book = open_positions(session, trader.id)._trades[trader.id]
+    assert fourth in book and not {first, second, third} & set(book)
+    assert loads == []